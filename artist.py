@@ -9,6 +9,12 @@ import requests
 import sys
 from urllib.parse import urlparse
 import random
+import statistics
+import numpy as np
+import variants
+import tracing
+import deadline
+import check_models
 
 # 1. 설정 및 초기화
 load_dotenv()
@@ -35,6 +41,12 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(ASSETS_DIR, exist_ok=True)
 
 MODEL_NAME = "gemini-2.0-flash" 
+# 이미지 생성 모델: main()에서 check_models.py 측정 결과(없으면 working_model.txt)로 결정.
+# None이면 측정상 이미지를 만들 수 있는 모델이 없으므로 AI 생성을 시도하지 않음
+IMAGE_MODEL_NAME = MODEL_NAME
+
+# 남은 장면마다 대체 이미지를 만들 시간(초)은 남겨둠 - 예산이 이보다 적으면 검색/생성 없이 바로 대체 이미지
+FALLBACK_RESERVE_SEC = 2.0
 
 MAJOR_NEWS_SITES = [
     "cnn.com", "foxnews.com", "usatoday.com", "reuters.com", "apnews.com",
@@ -49,6 +61,49 @@ def crop_center(pil_img, crop_width, crop_height):
                          (img_width + crop_width) // 2,
                          (img_height + crop_height) // 2))
 
+# 스마트 크롭: 축소본에서 기울기 에너지 + 피부색 + 약한 중앙 가중치로 주목도(saliency) 맵을 만들고
+# 적분 영상으로 모든 크롭 창의 합을 한 번에 계산해 가장 주목도가 높은 창을 선택 (모델/GPU 없음, 이미지당 수 ms)
+SALIENCY_SIZE = 256     # 축소본 긴 변
+SKIN_WEIGHT = 1.5
+CENTER_WEIGHT = 0.3
+
+def saliency_map(pil_img):
+    """(주목도 맵, 원본/축소본 배율). 원본 크기 그대로 변환하지 않고 먼저 축소한 뒤 변환/계산"""
+    img_w, img_h = pil_img.size
+    factor = min(1.0, SALIENCY_SIZE / max(img_w, img_h))
+    small = pil_img
+    if factor < 1.0:
+        size = (max(1, int(round(img_w * factor))), max(1, int(round(img_h * factor))))
+        small = pil_img.resize(size, Image.BILINEAR, reducing_gap=2.0)
+    small = small.convert("RGB")
+    rgb = np.asarray(small, dtype=np.float32) / 255.0
+    gray = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    energy = np.abs(np.diff(gray, axis=1, prepend=gray[:, :1])) + np.abs(np.diff(gray, axis=0, prepend=gray[:1]))
+    energy /= energy.mean() + 1e-6
+    # 피부색 (YCbCr 범위 규칙) - 인물 얼굴/손이 잘리지 않도록
+    ycbcr = np.asarray(small.convert("YCbCr"), dtype=np.float32)
+    cb, cr = ycbcr[..., 1], ycbcr[..., 2]
+    skin = ((cb >= 77) & (cb <= 127) & (cr >= 133) & (cr <= 173)).astype(np.float32)
+    h, w = gray.shape
+    yy, xx = np.mgrid[0:h, 0:w]
+    center = np.exp(-(((xx - w / 2) / (w / 2)) ** 2 + ((yy - h / 2) / (h / 2)) ** 2))
+    return energy + SKIN_WEIGHT * skin + CENTER_WEIGHT * center, pil_img.size[0] / w
+
+def smart_crop(pil_img, crop_width, crop_height):
+    """주목도 합이 최대인 crop_width x crop_height 창으로 자르기"""
+    img_width, img_height = pil_img.size
+    if crop_width >= img_width and crop_height >= img_height: return pil_img
+    sal, scale = saliency_map(pil_img)
+    h, w = sal.shape
+    sw = min(w, max(1, int(round(crop_width / scale)))); sh = min(h, max(1, int(round(crop_height / scale))))
+    # 적분 영상: 모든 창의 합을 벡터 연산 한 번으로
+    ii = np.pad(sal.cumsum(axis=0).cumsum(axis=1), ((1, 0), (1, 0)))
+    sums = ii[sh:, sw:] - ii[:-sh, sw:] - ii[sh:, :-sw] + ii[:-sh, :-sw]
+    y, x = np.unravel_index(int(np.argmax(sums)), sums.shape)
+    left = min(max(0, int(round(x * scale))), img_width - crop_width)
+    top = min(max(0, int(round(y * scale))), img_height - crop_height)
+    return pil_img.crop((left, top, left + crop_width, top + crop_height))
+
 def crop_to_aspect_ratio(pil_img, target_ratio):
     img_width, img_height = pil_img.size
     img_ratio = img_width / img_height
@@ -58,9 +113,22 @@ def crop_to_aspect_ratio(pil_img, target_ratio):
     else:
         new_width = img_width
         new_height = int(img_width / target_ratio)
-    return crop_center(pil_img, new_width, new_height)
+    try:
+        return smart_crop(pil_img, new_width, new_height)
+    except Exception as e:
+        print(f"   ⚠️ 스마트 크롭 실패, 중앙 크롭 사용: {e}")
+        return crop_center(pil_img, new_width, new_height)
+
+# 멀티 변형 작업에서 추가로 만들 (비율, 저장 폴더) 목록 - 같은 원본에서 비율별로 각각 크롭
+EXTRA_OUTPUTS = []
 
 def process_and_save_image(pil_img, save_path, target_ratio):
+    ok = save_cropped_image(pil_img, save_path, target_ratio)
+    for extra_ratio, extra_dir in EXTRA_OUTPUTS:
+        save_cropped_image(pil_img, os.path.join(extra_dir, os.path.basename(save_path)), extra_ratio)
+    return ok
+
+def save_cropped_image(pil_img, save_path, target_ratio):
     try:
         cropped_img = crop_to_aspect_ratio(pil_img, target_ratio)
         min_dim = 1080 
@@ -94,6 +162,7 @@ def is_blacklisted(url):
     return False
 
 def create_fallback_image(file_name, target_ratio):
+    tracing.event("artist.fallback_image", file=file_name)
     save_path = os.path.join(OUTPUT_DIR, file_name)
     default_img_path = os.path.join(ASSETS_DIR, "default_news.png")
     
@@ -114,12 +183,87 @@ def create_fallback_image(file_name, target_ratio):
     draw.line([(0, h*0.8), (w, h*0.8)], fill=(40, 50, 80), width=10)
     process_and_save_image(img, save_path, target_ratio)
 
+# ---------------------------
+# 도메인별 다운로드 통계 (성공률 / 지연 시간 / 해상도) - 후보 정렬과 site: 연산자 선택에 사용
+# ---------------------------
+DOMAIN_STATS_PATH = os.path.join(".cache", "domain_stats.json")
+DOMAIN_STATS_WINDOW = 20   # 지연 시간/해상도는 최근 N회만 보관
+DOMAIN_MIN_SAMPLES = 2     # 성공 표본이 이보다 적으면 지연 시간은 기본값(2초)으로 봄
+DOMAIN_MIN_RATE = 0.5      # 성공률이 이보다 낮은 도메인은 성공률을 한 번 더 곱해 강하게 감점
+DOMAIN_STATS = {}
+
+def load_domain_stats():
+    global DOMAIN_STATS
+    try:
+        with open(DOMAIN_STATS_PATH, "r", encoding="utf-8") as f: DOMAIN_STATS = json.load(f)
+    except (OSError, ValueError): DOMAIN_STATS = {}
+
+def save_domain_stats():
+    try:
+        os.makedirs(os.path.dirname(DOMAIN_STATS_PATH), exist_ok=True)
+        tmp_path = f"{DOMAIN_STATS_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f: json.dump(DOMAIN_STATS, f, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, DOMAIN_STATS_PATH)
+    except OSError: pass
+
+def url_domain(url):
+    netloc = urlparse(url).netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+def record_download(url, ok, latency, size=None, reason=None):
+    stats = DOMAIN_STATS.setdefault(url_domain(url), {"attempts": 0, "successes": 0, "pixels": []})
+    stats["attempts"] += 1
+    if ok:
+        stats["successes"] += 1
+        # 지연 시간은 성공한 다운로드만 (빨리 실패하는 도메인이 빠른 도메인으로 보이지 않도록)
+        stats["ok_latencies"] = (stats.get("ok_latencies", []) + [round(latency, 3)])[-DOMAIN_STATS_WINDOW:]
+    if size: stats["pixels"] = (stats["pixels"] + [size[0] * size[1]])[-DOMAIN_STATS_WINDOW:]
+    if reason: stats["last_error"] = reason[:120]
+    stats["updated"] = int(time.time())
+
+def domain_summary(stats):
+    """성공률(라플라스 보정), 성공한 다운로드의 지연 시간 중앙값(표본 부족 시 None), 해상도 중앙값"""
+    rate = (stats["successes"] + 1) / (stats["attempts"] + 2)
+    latencies = stats.get("ok_latencies", [])
+    latency = statistics.median(latencies) if len(latencies) >= DOMAIN_MIN_SAMPLES else None
+    pixels = statistics.median(stats["pixels"]) if stats["pixels"] else None
+    return rate, latency, pixels
+
+def domain_score(domain):
+    """기대 효용: 성공 확률 / 예상 소요 시간. 통계가 없는 도메인은 중간값(탐색 기회 보장)"""
+    stats = DOMAIN_STATS.get(domain)
+    if not stats: return 0.5 / 2.0
+    rate, latency, pixels = domain_summary(stats)
+    score = rate / max(latency or 2.0, 0.2)
+    if rate < DOMAIN_MIN_RATE: score *= rate   # 자주 실패하는 도메인은 빨라도 후순위
+    if pixels and pixels < 800 * 800: score *= 0.5   # 주로 썸네일급 이미지를 주는 도메인
+    return score
+
+def rank_candidates(urls):
+    """다운로드 후보 URL을 도메인 통계 기준으로 재정렬 (같은 점수면 Serper 순서 유지)"""
+    return sorted(urls, key=lambda u: -domain_score(url_domain(u)))
+
+def site_score(site):
+    matched = [stats for domain, stats in DOMAIN_STATS.items() if domain == site or domain.endswith("." + site)]
+    if not matched: return 0.5
+    attempts = sum(m["attempts"] for m in matched); successes = sum(m["successes"] for m in matched)
+    return (successes + 1) / (attempts + 2)
+
+def pick_news_sites(k=6):
+    """site: 연산자용 언론사 선택 - 성공률 가중 무작위 추출(Efraimidis-Spirakis)로 탐색과 활용을 병행"""
+    keyed = [(random.random() ** (1.0 / (site_score(site) + 0.05)), site) for site in MAJOR_NEWS_SITES]
+    return [site for _, site in sorted(keyed, reverse=True)[:k]]
+
 def search_google_images(query, num=30): 
     url = "https://google.serper.dev/images"
     headers = {'X-API-KEY': SERPER_API_KEY, 'Content-Type': 'application/json'}
     payload = json.dumps({"q": query, "num": num, "gl": "us", "hl": "en"})
+    def post(attempt):
+        return requests.request("POST", url, headers=headers, data=payload, timeout=deadline.timeout(10))
     try:
-        response = requests.request("POST", url, headers=headers, data=payload)
+        with tracing.span("http.serper_images", query=query[:80]) as sp:
+            response = deadline.hedged("serper", post)
+            sp.set(http_status=response.status_code, bytes=len(response.content))
         if response.status_code != 200: return []
         return response.json().get('images', [])
     except: return []
@@ -132,18 +276,30 @@ def download_and_process_image(image_url, file_name, target_ratio):
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
         ]
         headers = {'User-Agent': random.choice(user_agents)}
-        response = requests.get(image_url, headers=headers, timeout=8)
-        response.raise_for_status()
-        if len(response.content) < 20000: raise Exception("File too small")
-        img = Image.open(io.BytesIO(response.content))
-        w, h = img.size
-        if w < 800 and h < 800: raise Exception(f"Low Resolution ({w}x{h} < 800px)")
+        # 남은 예산이 부족하면 요청 자체를 하지 않음 (도메인 통계에도 기록하지 않음)
+        req_timeout = deadline.timeout(8)
+        t0 = time.time(); size = None
+        try:
+            with tracing.span("http.download", domain=urlparse(image_url).netloc) as sp:
+                response = requests.get(image_url, headers=headers, timeout=req_timeout)
+                sp.set(http_status=response.status_code, bytes=len(response.content))
+                response.raise_for_status()
+                if len(response.content) < 20000: raise Exception("File too small")
+                img = Image.open(io.BytesIO(response.content))
+                w, h = img.size
+                size = (w, h)
+                sp.set(width=w, height=h)
+                if w < 800 and h < 800: raise Exception(f"Low Resolution ({w}x{h} < 800px)")
+        except Exception as e:
+            record_download(image_url, False, time.time() - t0, size, str(e))
+            raise
+        record_download(image_url, True, time.time() - t0, size)
         if img.mode in ("RGBA", "P"): img = img.convert("RGB")
         return process_and_save_image(img, save_path, target_ratio)
     except Exception as e: return False
 
 def search_with_fallback(base_prompt, idx):
-    selected_sites = random.sample(MAJOR_NEWS_SITES, 6)
+    selected_sites = pick_news_sites(6)
     site_operators = " OR ".join([f"site:{site}" for site in selected_sites])
     forced_query = f"{base_prompt} {site_operators}"
     print(f"   🔍 [Scene {idx}] 1차 검색: '{forced_query[:60]}...'")
@@ -154,50 +310,70 @@ def search_with_fallback(base_prompt, idx):
     results = search_google_images(base_prompt, num=30)
     return results
 
-def download_best_available_image(results, file_name, target_ratio):
-    for item in results:
-        url = item.get('imageUrl')
-        if not url or is_blacklisted(url): continue
+def download_best_available_image(results, file_name, target_ratio, reserve=0.0):
+    urls = [item.get('imageUrl') for item in results if item.get('imageUrl') and not is_blacklisted(item.get('imageUrl'))]
+    for url in rank_candidates(urls):
+        if deadline.expired(reserve): return None
         if download_and_process_image(url, file_name, target_ratio):
             print(f"      ✅ 원본 다운로드 성공")
             return url
     for item in results:
         thumb = item.get('thumbnailUrl')
         if not thumb: continue
+        if deadline.expired(reserve): return None
         if download_and_process_image(thumb, file_name, target_ratio):
             print(f"      ✅ 썸네일 다운로드 성공")
             return thumb
     return None
 
-def generate_image(prompt, file_name):
+def generate_image(prompt, file_name, reserve=0.0):
     global current_key_index
+    if not IMAGE_MODEL_NAME:
+        print(f"   ⏩ 이미지 생성 가능한 모델 없음 (python check_models.py 결과) - AI 생성 생략")
+        return False
     print(f"🎨 AI 그리기 시도... ({prompt[:20]}...)")
     attempts = 0
     max_attempts = len(GEMINI_KEYS) * 3 
     
     while attempts < max_attempts:
+        if deadline.expired(reserve):
+            print(f"      ⏰ 시간 예산 부족 - AI 생성 중단")
+            return False
         current_key = GEMINI_KEYS[current_key_index]
         try:
-            genai.configure(api_key=current_key) 
-            model = genai.GenerativeModel(MODEL_NAME)
-            response = model.generate_content(prompt) 
-            if hasattr(response, 'parts') and response.parts and response.parts[0].inline_data:
-                 image_data = response.parts[0].inline_data.data
-                 img = Image.open(io.BytesIO(image_data))
-                 save_path = os.path.join(OUTPUT_DIR, file_name)
-                 img.save(save_path)
-                 return True
+            with tracing.span("api.gemini_image", model=IMAGE_MODEL_NAME, key_index=current_key_index, attempt=attempts) as sp:
+                genai.configure(api_key=current_key) 
+                model = genai.GenerativeModel(IMAGE_MODEL_NAME)
+                response = model.generate_content(prompt, request_options={"timeout": deadline.timeout(60)})
+                if hasattr(response, 'parts') and response.parts and response.parts[0].inline_data:
+                     image_data = response.parts[0].inline_data.data
+                     sp.set(bytes=len(image_data))
+                     img = Image.open(io.BytesIO(image_data))
+                     save_path = os.path.join(OUTPUT_DIR, file_name)
+                     img.save(save_path)
+                     return True
+                sp.set(no_image=True)
             return False 
+        except deadline.DeadlineExceeded:
+            return False
         except Exception as e:
             error_msg = str(e)
             if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
                 print(f"      ⚠️ [Key #{current_key_index+1}] 쿼터 초과! 10초 대기...")
-                time.sleep(10)
+                tracing.event("gemini.quota_429", key_index=current_key_index)
+                tracing.event("gemini.key_rotate", from_key=current_key_index, to_key=(current_key_index + 1) % len(GEMINI_KEYS))
+                deadline.sleep(10)
                 current_key_index = (current_key_index + 1) % len(GEMINI_KEYS)
                 attempts += 1
                 continue
+            elif check_models.classify_error(error_msg) == "unsupported":
+                # 모델이 이미지 출력을 지원하지 않으면 키를 바꿔도 같은 결과 - 바로 포기
+                print(f"      ❌ {IMAGE_MODEL_NAME} 모델은 이미지 생성을 지원하지 않음: {e}")
+                tracing.event("gemini.unsupported", model=IMAGE_MODEL_NAME)
+                return False
             else:
                 print(f"      ❌ 그리기 오류: {e}")
+                tracing.event("gemini.retry", reason=error_msg[:200], key_index=current_key_index)
                 attempts += 1
                 current_key_index = (current_key_index + 1) % len(GEMINI_KEYS)
                 continue
@@ -215,6 +391,24 @@ def main():
     target_ratio = (9/16) if is_shorts else (16/9)
     if is_news and is_shorts: target_ratio = 4/3 
 
+    # 멀티 변형: 이미지는 장면당 한 번만 받고, 비율별로 크롭해 각 폴더에 저장
+    # (상주 워커에서 여러 작업을 처리하므로 이전 작업의 설정은 비움)
+    EXTRA_OUTPUTS.clear()
+    VARIANTS = variants.get_variants_flag(sys.argv)
+    skip_intro_outro = is_shorts and is_news
+    if VARIANTS:
+        mode = VARIANTS[0]["mode"]
+        is_shorts = "shorts" in mode
+        is_news = "news" in mode
+        target_ratio = variants.target_ratio(mode)
+        # Intro/Outro 장면은 모든 변형이 뉴스 쇼츠일 때만 건너뜀
+        skip_intro_outro = all("shorts" in v["mode"] and "news" in v["mode"] for v in VARIANTS)
+        for ratio in variants.ratios(VARIANTS)[1:]:
+            extra_dir = os.path.join(OUTPUT_DIR, variants.ratio_tag(ratio))
+            os.makedirs(extra_dir, exist_ok=True)
+            EXTRA_OUTPUTS.append((ratio, extra_dir))
+        print(f"🖼️ 멀티 변형 비율: {', '.join(variants.ratio_tag(r) for r in variants.ratios(VARIANTS))}")
+
     story_path = "story.json"
     if not os.path.exists(story_path):
         print(f"오류: {story_path} 없음.")
@@ -245,6 +439,10 @@ def main():
         return
 
     print(f"=== 화가 에이전트 시작 (High Persistence Mode) ===")
+    global IMAGE_MODEL_NAME
+    IMAGE_MODEL_NAME = check_models.pick_model("image", check_models.manual_model() or MODEL_NAME)
+    print(f"   🎨 이미지 생성 모델: {IMAGE_MODEL_NAME or '없음'}")
+    load_domain_stats()
     
     image_sources = {}
     article_images = []
@@ -259,10 +457,10 @@ def main():
         idx = i + 1
         base_prompt = scene.get("image_prompt")
         
-        if is_shorts and is_news and i == 0 and os.path.exists("assets/intro.mp4"):
+        if skip_intro_outro and i == 0 and os.path.exists("assets/intro.mp4"):
             print(f"   ⏩ Scene {idx} (Intro): Skip")
             continue
-        if is_shorts and is_news and i == len(scenes) - 1 and os.path.exists("assets/outro.mp4"):
+        if skip_intro_outro and i == len(scenes) - 1 and os.path.exists("assets/outro.mp4"):
             print(f"   ⏩ Scene {idx} (Outro): Skip")
             continue
 
@@ -270,52 +468,61 @@ def main():
         
         file_name = f"image_{idx}.png"
         success = False
+        # 이 장면 이후 남은 장면들의 대체 이미지 시간은 확보
+        reserve = FALLBACK_RESERVE_SEC * (len(scenes) - i)
         
-        if is_news:
-            if mode == "url_news_shorts" and article_images and i < len(article_images):
-                img_url = article_images[i]
-                if not is_blacklisted(img_url):
-                    print(f"   [기사 사진 시도] Scene {idx}")
-                    if download_and_process_image(img_url, file_name, target_ratio):
-                        if is_valid_image(os.path.join(OUTPUT_DIR, file_name)):
-                            image_sources[file_name] = urlparse(img_url).netloc
-                            success = True
+        with tracing.span("scene", idx=idx) as scene_span:
+            if deadline.expired(reserve):
+                print(f"   ⏰ [Scene {idx}] 시간 예산 부족 - 검색/생성 생략")
+            elif is_news:
+                if mode == "url_news_shorts" and article_images and i < len(article_images):
+                    img_url = article_images[i]
+                    if not is_blacklisted(img_url):
+                        print(f"   [기사 사진 시도] Scene {idx}")
+                        if download_and_process_image(img_url, file_name, target_ratio):
+                            if is_valid_image(os.path.join(OUTPUT_DIR, file_name)):
+                                image_sources[file_name] = urlparse(img_url).netloc
+                                success = True
             
-            if not success:
-                search_results = search_with_fallback(base_prompt, idx)
-                if search_results:
-                    final_url = download_best_available_image(search_results, file_name, target_ratio)
-                    if final_url:
-                        image_sources[file_name] = urlparse(final_url).netloc
-                        success = True
+                if not success:
+                    search_results = search_with_fallback(base_prompt, idx)
+                    if search_results:
+                        final_url = download_best_available_image(search_results, file_name, target_ratio, reserve)
+                        if final_url:
+                            image_sources[file_name] = urlparse(final_url).netloc
+                            success = True
             
-            if not success:
-                print(f"   ⚠️ 검색 전멸. AI 생성 시도.")
-                if generate_image(f"News photo of {base_prompt}, realistic, 4k", file_name):
+                if not success:
+                    print(f"   ⚠️ 검색 전멸. AI 생성 시도.")
+                    if generate_image(f"News photo of {base_prompt}, realistic, 4k", file_name, reserve):
+                        try:
+                            with Image.open(os.path.join(OUTPUT_DIR, file_name)) as img:
+                                process_and_save_image(img, os.path.join(OUTPUT_DIR, file_name), target_ratio)
+                            success = True
+                        except: pass
+            else: 
+                prompt = f"{base_prompt}, cinematic lighting, high quality, 4k, detailed"
+                if generate_image(prompt, file_name, reserve):
                     try:
                         with Image.open(os.path.join(OUTPUT_DIR, file_name)) as img:
                             process_and_save_image(img, os.path.join(OUTPUT_DIR, file_name), target_ratio)
                         success = True
                     except: pass
-        else: 
-            prompt = f"{base_prompt}, cinematic lighting, high quality, 4k, detailed"
-            if generate_image(prompt, file_name):
-                try:
-                    with Image.open(os.path.join(OUTPUT_DIR, file_name)) as img:
-                        process_and_save_image(img, os.path.join(OUTPUT_DIR, file_name), target_ratio)
-                    success = True
-                except: pass
-
-        if not success:
-            create_fallback_image(file_name, target_ratio)
-        
-        time.sleep(1) 
+
+            if not success:
+                create_fallback_image(file_name, target_ratio)
+            scene_span.set(source=image_sources.get(file_name, "ai" if success else "fallback"))
+        save_domain_stats()
+
+        deadline.sleep(1)
 
     if image_sources:
-        with open(os.path.join(OUTPUT_DIR, "sources.json"), "w", encoding="utf-8") as f:
-            json.dump(image_sources, f, indent=2, ensure_ascii=False)
+        for out_dir in [OUTPUT_DIR] + [d for _, d in EXTRA_OUTPUTS]:
+            with open(os.path.join(out_dir, "sources.json"), "w", encoding="utf-8") as f:
+                json.dump(image_sources, f, indent=2, ensure_ascii=False)
 
     print("\n=== 모든 작업 완료 ===")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with tracing.span("artist.main"):
+        main()
\ No newline at end of file
@@ -1,34 +1,189 @@
 import os
+import sys
+import json
+import time
 import google.generativeai as genai
 from dotenv import load_dotenv
 
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
+# 모델 벤치마크: 후보 모델 x API 키마다 작은 텍스트/이미지 생성 요청을 보내 지연 시간 분포, 오류율, 이미지 지원 여부를 측정하고
+# .cache/model_probe.json 에 만료 시간과 함께 저장. writer.py / artist.py는 pick_model()로 작업별 가장 빠른 정상 모델을 고름.
+#
+#   python check_models.py                        # generateContent 지원 gemini 모델 전체 측정
+#   python check_models.py --models=gemini-2.0-flash,gemini-2.0-flash-exp-image-generation --rounds=3 --ttl=12
 
-if not api_key:
-    print("API Key not found in .env")
-    exit()
+PROBE_PATH = os.path.join(".cache", "model_probe.json")
+PROBE_VERSION = 2           # 측정 방식이 바뀌면 올림 (이전 결과는 만료 처리)
+DEFAULT_TTL_HOURS = 24
+MAX_ERROR_RATE = 0.5          # 이보다 자주 실패하는 모델은 선택하지 않음
+TEXT_PROMPT = 'Reply with the JSON object {"ok": true}.'
+# 텍스트 측정은 writer.py와 같은 설정(JSON 모드 + 안전 필터 해제)으로 호출 -> JSON 모드를 거부하는 모델은 선택되지 않음
+TEXT_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
+IMAGE_PROMPT = "A simple flat illustration of a red circle on a white background."
+SKIP_PATTERNS = ("embedding", "tts", "aqa", "gecko")
 
-genai.configure(api_key=api_key)
+def load_keys():
+    load_dotenv()
+    keys = []
+    for name in ["GEMINI_API_KEY"] + [f"GEMINI_API_KEY_{i}" for i in range(2, 6)]:
+        if os.environ.get(name): keys.append(os.environ.get(name))
+    return keys
 
-print("Fetching available models...")
-try:
-    models = genai.list_models()
-    found_image_model = False
-    
-    with open("models_list.txt", "w", encoding="utf-8") as f:
+def short_name(name):
+    return name[len("models/"):] if name.startswith("models/") else name
+
+def list_models(path="models_list.txt"):
+    """사용 가능한 모델 목록을 models_list.txt로 저장하고 generateContent 지원 모델 이름 반환"""
+    candidates = []
+    with open(path, "w", encoding="utf-8") as f:
         f.write(f"{'Model Name':<40} | {'Supported Methods'}\n")
         f.write("-" * 80 + "\n")
-        
-        for m in models:
+        for m in genai.list_models():
             methods = ", ".join(m.supported_generation_methods)
             f.write(f"{m.name:<40} | {methods}\n")
+            name = short_name(m.name)
+            if "generateContent" in m.supported_generation_methods and name.startswith("gemini") \
+                    and not any(p in name for p in SKIP_PATTERNS):
+                candidates.append(name)
+    print(f"Model list saved to {path}")
+    return candidates
+
+def classify_error(message):
+    if "429" in message or "RESOURCE_EXHAUSTED" in message: return "quota"
+    if "deadline" in message.lower() or "timeout" in message.lower() or "504" in message: return "timeout"
+    if "400" in message or "not supported" in message.lower() or "INVALID_ARGUMENT" in message: return "unsupported"
+    return "error"
+
+def timed_request(model_name, prompt, timeout, **model_kwargs):
+    """(성공 여부, 지연 시간, 이미지 포함 여부, 오류 종류). model_kwargs는 GenerativeModel 설정(generation_config 등)"""
+    t0 = time.time()
+    try:
+        response = genai.GenerativeModel(model_name, **model_kwargs).generate_content(prompt, request_options={"timeout": timeout})
+        latency = time.time() - t0
+        has_image = any(getattr(part, "inline_data", None) and part.inline_data.data and
+                        str(part.inline_data.mime_type).startswith("image/") for part in getattr(response, "parts", []))
+        has_text = False
+        try: has_text = bool(response.text.strip())
+        except Exception: pass
+        return (has_text or has_image), latency, has_image, None
+    except Exception as e:
+        return False, time.time() - t0, False, classify_error(str(e))
+
+def percentile(values, q):
+    if not values: return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * q))], 3)
+
+def summarize(samples):
+    latencies = [s["latency"] for s in samples if s["ok"]]
+    errors = [s["error"] for s in samples if not s["ok"]]
+    return {
+        "samples": len(samples),
+        "errors": len(errors),
+        "error_rate": round(len(errors) / len(samples), 3) if samples else 1.0,
+        "error_kinds": {kind: errors.count(kind) for kind in set(errors) if kind},
+        "p50": percentile(latencies, 0.5),
+        "p90": percentile(latencies, 0.9),
+        "p99": percentile(latencies, 0.99),
+    }
+
+def probe(models, keys, rounds=2, timeout=60):
+    """모델 x 키 측정. 텍스트는 rounds회, 이미지는 키마다 1회"""
+    results = {}
+    for name in models:
+        text_samples = []; image_samples = []; per_key = {}
+        for k, key in enumerate(keys):
+            genai.configure(api_key=key)
+            key_samples = []
+            for _ in range(rounds):
+                ok, latency, _, error = timed_request(name, TEXT_PROMPT, timeout, generation_config=TEXT_GENERATION_CONFIG,
+                                                      safety_settings=SAFETY_SETTINGS)
+                key_samples.append({"ok": ok, "latency": latency, "error": error})
+                if error == "quota": break   # 이 키는 쿼터 소진 - 같은 키로 반복하지 않음
+            ok, latency, has_image, error = timed_request(name, IMAGE_PROMPT, timeout)
+            image_samples.append({"ok": has_image, "latency": latency, "error": error if error else (None if has_image else "no_image")})
+            text_samples += key_samples
+            per_key[str(k)] = summarize(key_samples)
+        text = summarize(text_samples)
+        image = summarize(image_samples)
+        image["supported"] = any(s["ok"] for s in image_samples)
+        results[name] = {"text": text, "image": image, "keys": per_key}
+        print(f"   {name:<42} text p50={text['p50']}s p90={text['p90']}s err={text['error_rate']:.0%} | "
+              f"image={'yes' if image['supported'] else 'no'} p50={image['p50']}s")
+    return results
 
-    print("Model list saved to models_list.txt")
+def save_probe(results, ttl_hours=DEFAULT_TTL_HOURS):
+    data = {"version": PROBE_VERSION, "updated": int(time.time()), "ttl": int(ttl_hours * 3600), "models": results}
+    os.makedirs(os.path.dirname(PROBE_PATH), exist_ok=True)
+    tmp_path = f"{PROBE_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f: json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, PROBE_PATH)
+    return data
 
+def load_probe():
+    """만료되지 않은 측정 결과 (없거나 만료되면 None)"""
+    try:
+        with open(PROBE_PATH, "r", encoding="utf-8") as f: data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != PROBE_VERSION or time.time() > data.get("updated", 0) + data.get("ttl", 0): return None
+    return data
+
+def manual_model(path="working_model.txt"):
+    """수동으로 지정한 이미지 모델 (working_model.txt)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f: return f.read().strip() or None
+    except OSError:
+        return None
+
+def pick_model(task, default=None):
+    """task("text"/"image")별로 오류율이 낮은 모델 중 지연 시간 중앙값이 가장 짧은 모델.
+    측정 결과가 없거나 만료되면 default. 측정 결과상 이미지 지원 모델이 하나도 없으면 None"""
+    data = load_probe()
+    if not data: return default
+    healthy = []
+    for name, stats in data["models"].items():
+        s = stats.get(task)
+        if not s or s["p50"] is None or s["error_rate"] > MAX_ERROR_RATE: continue
+        if task == "image" and not s.get("supported"): continue
+        healthy.append((s["p50"] * (1 + s["error_rate"]), name))
+    if healthy: return min(healthy)[1]
+    return None if task == "image" else default
+
+def main():
+    args = sys.argv[1:]
+    flags = dict(a[2:].split("=", 1) for a in args if a.startswith("--") and "=" in a)
+    keys = load_keys()
+    if not keys:
+        print("API Key not found in .env")
+        return
+
+    genai.configure(api_key=keys[0])
+    print("Fetching available models...")
+    try:
+        candidates = list_models()
+    except Exception as e:
+        print(f"Error listing models: {e}")
+        return
+    if flags.get("models"): candidates = [m.strip() for m in flags["models"].split(",") if m.strip()]
+
+    rounds = int(flags.get("rounds", 2))
+    ttl = float(flags.get("ttl", DEFAULT_TTL_HOURS))
+    print(f"Probing {len(candidates)} models x {len(keys)} keys ({rounds} text rounds + 1 image request per key)...")
+    results = probe(candidates, keys, rounds=rounds, timeout=float(flags.get("timeout", 60)))
+    save_probe(results, ttl)
     print("-" * 80)
-    print("Note: 'generateContent' method is typically used for text/chat.")
-    print("      For image generation, look for models that might support it explicitly or check documentation.")
-    
-except Exception as e:
-    print(f"Error listing models: {e}")
+    text_model = pick_model("text"); image_model = pick_model("image")
+    print(f"Fastest healthy text model : {text_model}")
+    print(f"Fastest healthy image model: {image_model}")
+    print(f"Results saved to {PROBE_PATH} (valid for {ttl:g}h)")
+    if image_model:
+        with open("working_model.txt", "w", encoding="utf-8") as f: f.write(image_model)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import tracing
+
+# 작업별 시간 예산(deadline) 전파: main.py(또는 worker.py)가 작업 시작 시 VF_DEADLINE(절대 시각)을 정하고,
+# 단계마다 남은 시간을 가중치대로 나눠 VF_STAGE_DEADLINE을 설정 -> 하위 단계 프로세스가 환경 변수로 이어받음.
+# 각 외부 요청은 timeout()으로 남은 예산에서 타임아웃을 계산하고, 꼬리 지연이 길면 hedged()로 중복 요청을 보냄.
+# VF_DEADLINE이 없으면(단독 실행) 기존처럼 고정 타임아웃만 적용.
+
+JOB_BUDGET = float(os.environ.get("VF_JOB_BUDGET", "900"))   # 작업 하나당 기본 15분
+# 단계별 가중치: 남은 예산을 (현재 단계 가중치 / 남은 단계 가중치 합) 비율로 배분
+STAGE_WEIGHTS = {"writer": 1.0, "artist": 2.0, "narrator": 1.0, "editor": 3.0}
+STAGE_ORDER = ["writer", "artist", "narrator", "editor"]
+
+class DeadlineExceeded(Exception):
+    pass
+
+def start_job(budget=None):
+    """작업 예산 시작 (이전 작업의 단계 마감 시각은 지움)"""
+    os.environ["VF_DEADLINE"] = f"{time.time() + (budget or JOB_BUDGET):.3f}"
+    os.environ.pop("VF_STAGE_DEADLINE", None)
+
+def enter_stage(name):
+    """단계 시작: 남은 작업 예산 중 이 단계 몫을 VF_STAGE_DEADLINE으로 설정"""
+    job_deadline = _env_time("VF_DEADLINE")
+    if job_deadline is None: return None
+    left = STAGE_ORDER[STAGE_ORDER.index(name):] if name in STAGE_ORDER else [name]
+    share = STAGE_WEIGHTS.get(name, 1.0) / sum(STAGE_WEIGHTS.get(s, 1.0) for s in left)
+    stage_deadline = time.time() + max(0.0, job_deadline - time.time()) * share
+    os.environ["VF_STAGE_DEADLINE"] = f"{stage_deadline:.3f}"
+    return stage_deadline
+
+def _env_time(key):
+    value = os.environ.get(key)
+    try: return float(value) if value else None
+    except ValueError: return None
+
+def remaining():
+    """현재 단계(없으면 작업)에 남은 시간(초). 예산이 없으면 무한대"""
+    deadlines = [d for d in (_env_time("VF_STAGE_DEADLINE"), _env_time("VF_DEADLINE")) if d is not None]
+    if not deadlines: return float("inf")
+    return min(deadlines) - time.time()
+
+def expired(reserve=0.0):
+    """남은 시간이 reserve(대체 경로에 필요한 시간) 이하인지"""
+    return remaining() <= reserve
+
+def timeout(cap, minimum=0.5):
+    """요청 타임아웃 = min(cap, 남은 예산). 남은 시간이 minimum보다 적으면 요청하지 않고 DeadlineExceeded"""
+    left = remaining()
+    if left < minimum:
+        tracing.event("deadline.exceeded", cap=cap, remaining=round(left, 2))
+        raise DeadlineExceeded(f"deadline exceeded ({left:.1f}s left)")
+    return min(cap, left)
+
+def sleep(seconds):
+    """재시도 대기: 남은 예산을 넘기지 않도록 잘라서 대기"""
+    time.sleep(max(0.0, min(seconds, remaining() - 0.5)))
+
+# --- 지연 시간 통계 (요청 종류별 최근 값) -> 헤지 시점 결정 ---
+# 단계 프로세스는 수명이 짧으므로 .cache/latency_stats.json에 누적해 다음 실행에서도 p90을 쓸 수 있게 함
+LATENCY_PATH = os.path.join(".cache", "latency_stats.json")
+LATENCY_WINDOW = 50
+_latencies = {}
+_loaded = False
+_lock = threading.Lock()
+
+def _load_latencies():
+    global _loaded
+    if _loaded: return
+    _loaded = True
+    try:
+        with open(LATENCY_PATH, "r", encoding="utf-8") as f: data = json.load(f)
+    except (OSError, ValueError): return
+    for name, values in data.items():
+        _latencies[name] = deque(values[-LATENCY_WINDOW:], maxlen=LATENCY_WINDOW)
+
+def _save_latencies():
+    try:
+        os.makedirs(os.path.dirname(LATENCY_PATH), exist_ok=True)
+        tmp_path = f"{LATENCY_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({name: [round(v, 3) for v in values] for name, values in _latencies.items()}, f)
+        os.replace(tmp_path, LATENCY_PATH)
+    except OSError: pass
+
+def record(name, seconds):
+    with _lock:
+        _load_latencies()
+        _latencies.setdefault(name, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+        _save_latencies()
+
+def hedge_delay(name, default, quantile=0.9):
+    """최근 지연 시간의 p90 이후에도 응답이 없으면 중복 요청 (표본이 적으면 default)"""
+    with _lock:
+        _load_latencies()
+        samples = sorted(_latencies.get(name, ()))
+    if len(samples) < 5: return default
+    return samples[min(len(samples) - 1, int(len(samples) * quantile))]
+
+def hedged(name, fn, hedge_after=None, max_hedges=1):
+    """fn(attempt)을 실행하고, hedge_after초 안에 끝나지 않으면 같은 요청을 한 번 더 보내 먼저 성공한 결과를 사용.
+    전체 대기 시간은 남은 예산으로 제한. 모두 실패하면 마지막 예외를 그대로 전달.
+    중복 요청은 비용이 그대로 두 배가 되므로 값싸고 멱등인 요청(검색 등)에만 사용"""
+    delay = hedge_after if hedge_after is not None else hedge_delay(name, 3.0)
+    pool = ThreadPoolExecutor(max_workers=max_hedges + 1)
+    started = {}
+    try:
+        def launch(attempt):
+            t0 = time.time()
+            fut = pool.submit(fn, attempt)
+            started[fut] = (attempt, t0)
+            return fut
+
+        pending = {launch(0)}
+        hedges = 0
+        last_error = None
+        while pending:
+            left = remaining()
+            if left <= 0: raise DeadlineExceeded(f"{name}: deadline exceeded")
+            wait_for = min(delay, left) if hedges < max_hedges else left
+            done, pending = wait(pending, timeout=None if wait_for == float("inf") else wait_for, return_when=FIRST_COMPLETED)
+            for fut in done:
+                attempt, t0 = started[fut]
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                record(name, time.time() - t0)
+                if attempt > 0: tracing.event("hedge.win", request=name, attempt=attempt)
+                return result
+            if hedges < max_hedges and (not done or not pending):
+                # 응답이 늦거나 첫 요청이 실패하면 중복 요청 발사
+                hedges += 1
+                tracing.event("hedge.fire", request=name, after=round(delay, 2), failed=bool(done))
+                pending.add(launch(hedges))
+        raise last_error or DeadlineExceeded(f"{name}: no result")
+    finally:
+        # 늦은 요청은 기다리지 않음 (결과는 버려짐)
+        pool.shutdown(wait=False)
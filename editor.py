@@ -4,8 +4,16 @@ import sys
 import re
 import numpy as np
 from PIL import Image, ImageFont, ImageDraw
+import fontindex
+import variants
+import tracing
 import shutil
+import subprocess
+import hashlib
+import gc
+import threading
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Pillow 호환성 패치
 if not hasattr(Image, 'ANTIALIAS'): Image.ANTIALIAS = Image.LANCZOS
@@ -15,108 +23,210 @@ try:
 except ImportError:
     print("❌ moviepy 설치 필요: pip install moviepy"); sys.exit(1)
 
-# 폰트 경로 설정 (한국어 폰트 필수)
-FONT_EN = "C:/Windows/Fonts/arialbd.ttf"
-FONT_KO = "C:/Windows/Fonts/malgunbd.ttf" # 맑은 고딕 볼드
+# 폰트 경로 설정: 시스템 폰트 인덱스(fontindex.py)에서 한글/라틴 지원 폰트를 조회
 FONT_DEFAULT = "arial.ttf"
 
 def get_font_path(text):
-    # 텍스트에 한글이 포함되어 있으면 무조건 한글 폰트 사용
-    if re.search("[가-힣]", text):
-        if os.path.exists(FONT_KO): return FONT_KO
-        if os.path.exists("C:/Windows/Fonts/malgun.ttf"): return "C:/Windows/Fonts/malgun.ttf"
-        if os.path.exists("C:/Windows/Fonts/gulim.ttc"): return "C:/Windows/Fonts/gulim.ttc"
-    if os.path.exists(FONT_EN): return FONT_EN
-    return FONT_DEFAULT
+    # 텍스트에 한글이 포함되어 있으면 한글 cmap을 가진 폰트를 사용
+    try: return fontindex.resolve_font(text, FONT_DEFAULT)
+    except Exception: return FONT_DEFAULT
 
-def create_highlighted_text_clip(text, fontsize, color='white', highlight_color='yellow', 
-                               stroke_color='black', stroke_width=2, max_width=680, align='center', is_title=False):
-    tokens = []
-    
-    # [핵심 수정] 이 부분이 한글을 지워버리는 원인이었습니다. 삭제했습니다!
-    # try:
-    #     if sys.platform == 'win32': text = text.encode('gbk', 'ignore').decode('gbk')
-    # except: pass
+# 폰트 객체 / 단어 폭 / 완성된 캡션 래스터 캐시 (같은 프로세스 안에서 재사용)
+_FONT_CACHE = {}
+_WORD_WIDTH_CACHE = {}
+_RASTER_CACHE = {}
+
+def load_font(font_path, fontsize):
+    key = (font_path, fontsize)
+    font = _FONT_CACHE.get(key)
+    if font is None:
+        try: font = ImageFont.truetype(font_path, fontsize)
+        except: font = ImageFont.load_default()
+        _FONT_CACHE[key] = font
+    return font
+
+def clear_render_caches():
+    """단어 폭 / 캡션 래스터 메모리 캐시 비우기 (디스크 캐시는 유지되므로 다시 필요하면 파일에서 읽음). 비운 래스터 바이트 수 반환"""
+    freed = sum(arr.nbytes for arr in _RASTER_CACHE.values())
+    _RASTER_CACHE.clear()
+    _WORD_WIDTH_CACHE.clear()
+    return freed
+
+_MEASURE_DRAW = None
+
+def word_width(font_path, fontsize, word):
+    global _MEASURE_DRAW
+    key = (font_path, fontsize, word)
+    w = _WORD_WIDTH_CACHE.get(key)
+    if w is None:
+        if _MEASURE_DRAW is None: _MEASURE_DRAW = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+        bbox = _MEASURE_DRAW.textbbox((0, 0), word, font=load_font(font_path, fontsize))
+        w = bbox[2] - bbox[0]
+        _WORD_WIDTH_CACHE[key] = w
+    return w
 
+def layout_highlighted_text(text, fontsize, color='white', highlight_color='yellow', max_width=680, align='center'):
+    """'*강조*' 구간을 색으로 구분해 줄바꿈한 뒤 단어별 위치를 계산"""
+    tokens = []
     parts = text.split('*')
     for i, part in enumerate(parts):
         c = highlight_color if i % 2 == 1 else color
-        words = part.split()
-        for word in words: tokens.append({'text': word, 'color': c})
-
-    font_path = get_font_path(text)
-    try: font = ImageFont.truetype(font_path, fontsize)
-    except: font = ImageFont.load_default()
+        for word in part.split(): tokens.append({'text': word, 'color': c})
+    return layout_tokens(tokens, get_font_path(text), fontsize, max_width, align)
 
-    dummy_draw = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
-    space_w = dummy_draw.textbbox((0, 0), " ", font=font)[2]
-    
+def layout_tokens(tokens, font_path, fontsize, max_width=680, align='center'):
+    """단어 토큰({'text', 'color'}) 목록을 max_width 안에서 줄바꿈하고 위치(x, y, w) 계산"""
+    tokens = [dict(t) for t in tokens]
+    space_w = word_width(font_path, fontsize, " ")
     lines = []; current_line = []; current_w = 0
     for token in tokens:
-        bbox = dummy_draw.textbbox((0, 0), token['text'], font=font)
-        word_w = bbox[2] - bbox[0]
-        if current_line and (current_w + word_w > max_width):
-            lines.append(current_line); current_line = [token]; current_w = word_w + space_w
+        token['w'] = word_width(font_path, fontsize, token['text'])
+        if current_line and (current_w + token['w'] > max_width):
+            lines.append(current_line); current_line = [token]; current_w = token['w'] + space_w
         else:
-            current_line.append(token); current_w += word_w + space_w
+            current_line.append(token); current_w += token['w'] + space_w
     if current_line: lines.append(current_line)
 
     line_height = int(fontsize * 1.4)
-    total_height = len(lines) * line_height + 20
     canvas_w = max_width + 40
-    img = Image.new('RGBA', (canvas_w, total_height), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    
+    placed = []
     y = 10
     for line_tokens in lines:
-        line_w = 0
-        for t in line_tokens:
-            w = draw.textbbox((0, 0), t['text'], font=font)[2] - draw.textbbox((0, 0), t['text'], font=font)[0]
-            line_w += w + space_w
-        line_w -= space_w
+        line_w = sum(t['w'] for t in line_tokens) + space_w * (len(line_tokens) - 1)
         x = (canvas_w - line_w) // 2 if align == 'center' else 10
         for t in line_tokens:
-            txt = t['text']; col = t['color']
-            for dx in range(-stroke_width, stroke_width+1):
-                for dy in range(-stroke_width, stroke_width+1):
-                    if dx!=0 or dy!=0: draw.text((x+dx, y+dy), txt, font=font, fill=stroke_color)
-            draw.text((x, y), txt, font=font, fill=col)
-            w = draw.textbbox((0, 0), txt, font=font)[2] - draw.textbbox((0, 0), txt, font=font)[0]
-            x += w + space_w
+            placed.append({'text': t['text'], 'color': t['color'], 'x': x, 'y': y, 'w': t['w']})
+            x += t['w'] + space_w
         y += line_height
-    return ImageClip(np.array(img))
-
-def create_source_label(text, font_path):
-    try: font = ImageFont.truetype(font_path, 20)
-    except: font = ImageFont.load_default()
-    dummy_draw = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
-    bbox = dummy_draw.textbbox((0, 0), text, font=font)
-    w = bbox[2] - bbox[0] + 20; h = bbox[3] - bbox[1] + 10
-    img = Image.new('RGBA', (w, h), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    x, y = 10, 0
-    for dx in range(-2, 3):
-        for dy in range(-2, 3): draw.text((x+dx, y+dy), text, font=font, fill='black')
-    draw.text((x, y), text, font=font, fill='white')
-    return ImageClip(np.array(img))
+    return {'font_path': font_path, 'fontsize': fontsize, 'size': (canvas_w, len(lines) * line_height + 20), 'tokens': placed}
 
-def create_video():
-    mode = "video"
-    if len(sys.argv) > 1: mode = sys.argv[1]
-    
-    is_shorts = "shorts" in mode
-    is_news = "news" in mode 
-    
-    story_path = "story.json"
-    image_dir = "images"; audio_dir = "audio"
-    intro_path = "assets/intro.mp4"; outro_path = "assets/outro.mp4"
-    
-    if not os.path.exists(story_path): print("❌ 오류: story.json 없음"); return
+CAPTION_CACHE_DIR = os.path.join(".cache", "captions")
 
-    try:
-        with open(story_path, "r", encoding="utf-8") as f: data = json.load(f)
-    except: print("❌ JSON 로드 실패"); return
-    
+def cached_raster(key, render, scale=1.0):
+    """메모리 -> 디스크 순으로 래스터 조회. 디스크에는 설계 해상도 원본을 저장해 두어
+    draft 렌더링에서 만든 캡션을 final 승격 시 그대로 재사용"""
+    arr = _RASTER_CACHE.get(key)
+    if arr is None:
+        path = os.path.join(CAPTION_CACHE_DIR, hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + ".png")
+        if os.path.exists(path):
+            try: arr = np.array(Image.open(path).convert("RGBA"))
+            except: arr = None
+        if arr is None:
+            arr = render()
+            try:
+                os.makedirs(CAPTION_CACHE_DIR, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp.png"
+                Image.fromarray(arr).save(tmp_path)
+                os.replace(tmp_path, path)
+            except: pass
+        _RASTER_CACHE[key] = arr
+    if scale == 1.0: return arr
+
+    scaled_key = key + ('scale', scale)
+    scaled = _RASTER_CACHE.get(scaled_key)
+    if scaled is None:
+        h, w = arr.shape[:2]
+        size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+        scaled = np.array(Image.fromarray(arr).resize(size, Image.LANCZOS))
+        _RASTER_CACHE[scaled_key] = scaled
+    return scaled
+
+def render_highlighted_text(text, fontsize, color='white', highlight_color='yellow',
+                            stroke_color='black', stroke_width=2, max_width=680, align='center', scale=1.0):
+    """캡션을 RGBA 배열로 한 번만 래스터화 (외곽선은 Pillow 기본 stroke로 1회 draw)"""
+    def render():
+        layout = layout_highlighted_text(text, fontsize, color, highlight_color, max_width, align)
+        font = load_font(layout['font_path'], fontsize)
+        img = Image.new('RGBA', layout['size'], (0, 0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        for t in layout['tokens']:
+            draw.text((t['x'], t['y']), t['text'], font=font, fill=t['color'], stroke_width=stroke_width, stroke_fill=stroke_color)
+        return np.array(img)
+
+    key = ('caption', text, get_font_path(text), fontsize, color, highlight_color, stroke_color, stroke_width, max_width, align)
+    return cached_raster(key, render, scale)
+
+def create_highlighted_text_clip(text, fontsize, color='white', highlight_color='yellow', 
+                               stroke_color='black', stroke_width=2, max_width=680, align='center', is_title=False, scale=1.0):
+    # [핵심 수정] 한글을 지워버리던 gbk 인코딩 변환은 삭제했습니다!
+    return ImageClip(render_highlighted_text(text, fontsize, color, highlight_color, stroke_color, stroke_width, max_width, align, scale))
+
+def render_source_label(text, font_path, fontsize=20, stroke_width=2, scale=1.0):
+    def render():
+        font = load_font(font_path, fontsize)
+        dummy_draw = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+        bbox = dummy_draw.textbbox((0, 0), text, font=font)
+        w = bbox[2] - bbox[0] + 20; h = bbox[3] - bbox[1] + 10
+        img = Image.new('RGBA', (w, h), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        draw.text((10, 0), text, font=font, fill='white', stroke_width=stroke_width, stroke_fill='black')
+        return np.array(img)
+
+    return cached_raster(('label', text, font_path, fontsize, stroke_width), render, scale)
+
+def create_source_label(text, font_path, scale=1.0):
+    return ImageClip(render_source_label(text, font_path, scale=scale))
+
+RENDER_FPS = 24
+# 출력 프로필: scale은 설계 해상도(720x1280 / 1280x720) 대비 배율
+OUTPUT_PROFILES = {
+    "final": {"scale": 1.0, "fps": RENDER_FPS, "preset": "medium", "crf": 23},
+    "draft": {"scale": 0.5, "fps": 12, "preset": "ultrafast", "crf": 32},
+}
+VIDEO_CODEC = "libx264"
+AUDIO_CODEC = "aac"
+AUDIO_FPS = 44100
+# 세그먼트 concat(-c copy)이 가능하도록 모든 세그먼트를 같은 파라미터로 인코딩
+SEGMENT_FFMPEG_PARAMS = ["-pix_fmt", "yuv420p", "-profile:v", "high"]
+# 최종 파일은 moov를 앞에 두어(fast start) 다운로드 중에도 바로 재생
+FASTSTART_MOVFLAGS = ["-movflags", "+faststart"]
+# --progressive: 렌더링 중에도 재생 가능한 fragmented MP4
+FRAGMENTED_MOVFLAGS = ["-movflags", "+frag_keyframe+empty_moov+default_base_moof"]
+
+FFMPEG_EXE = None
+
+def get_ffmpeg_exe():
+    global FFMPEG_EXE
+    if FFMPEG_EXE is None:
+        try:
+            import imageio_ffmpeg
+            FFMPEG_EXE = imageio_ffmpeg.get_ffmpeg_exe()
+        except ImportError:
+            FFMPEG_EXE = "ffmpeg"
+    return FFMPEG_EXE
+
+def run_ffmpeg(args, input=None, capture=False):
+    """ffmpeg 실행. input은 stdin으로 보낼 바이트, capture=True면 stdout 바이트 반환"""
+    cmd = [get_ffmpeg_exe(), "-y", "-loglevel", "error"] + args
+    startupinfo = None
+    if sys.platform == 'win32':
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    with tracing.span("ffmpeg", args=" ".join(str(a) for a in args)[:300]):
+        result = subprocess.run(cmd, check=True, input=input, stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+                                stderr=subprocess.PIPE, startupinfo=startupinfo)
+    return result.stdout if capture else None
+
+def scaled(ctx, value):
+    """설계 해상도 기준 좌표/크기를 현재 출력 프로필 배율로 변환"""
+    return int(round(value * ctx["scale"]))
+
+def encode_params(ctx):
+    return SEGMENT_FFMPEG_PARAMS + ["-crf", str(ctx["crf"])]
+
+def parse_flags(argv):
+    """`--key=value` / `--flag` 형태의 옵션과 나머지 위치 인자를 분리"""
+    positional = []; flags = {}
+    for arg in argv:
+        if arg.startswith("--"):
+            key, _, value = arg[2:].partition("=")
+            flags[key] = value if value else True
+        else:
+            positional.append(arg)
+    return positional, flags
+
+def load_story(story_path):
+    with open(story_path, "r", encoding="utf-8") as f: data = json.load(f)
     scenes = []
     title_text = "News Briefing"
     if isinstance(data, list) and len(data) > 0 and isinstance(data[0], dict) and "scenes" in data[0]:
@@ -128,135 +238,1162 @@ def create_video():
     elif isinstance(data, list):
         scenes = data
         if len(scenes) > 0: title_text = scenes[0].get("title", "News Briefing")
+    return scenes, title_text
 
-    print(f"✅ 편집할 Scene 개수: {len(scenes)}")
-    
-    image_sources = {}
-    sources_path = os.path.join(image_dir, "sources.json")
-    if os.path.exists(sources_path):
-        try:
-            with open(sources_path, "r", encoding="utf-8") as f: image_sources = json.load(f)
-        except: pass
-
-    print(f"=== 편집(Editor) 시작 (Mode: {mode}) ===")
-    
-    intro_clip_final = None
-    outro_clip_final = None
-    body_clips = []
-
-    final_size = (720, 1280) if is_shorts else (1280, 720)
-
+def plan_scenes(scenes, ctx, image_dir="images", audio_dir="audio"):
+    """장면별 렌더링 작업 명세(pickle 가능한 dict) 목록 생성"""
+    intro_path = "assets/intro.mp4"; outro_path = "assets/outro.mp4"
+    specs = []
     for i, scene in enumerate(scenes):
         idx = i + 1
-        img_path = os.path.join(image_dir, f"image_{idx}.png")
         aud_path = os.path.join(audio_dir, f"audio_{idx}.mp3")
-        
         if not os.path.exists(aud_path):
             print(f"⚠️ 오디오 누락 (Scene {idx}), 건너뜀.")
             continue
 
-        print(f"🎬 Scene {idx} 합성 중...")
-        audio_clip = AudioFileClip(aud_path)
-        duration = audio_clip.duration
-        
-        visual_clip = None
-        is_video_asset = False
-        is_intro_scene = (i == 0 and is_shorts and is_news)
-        is_outro_scene = (i == len(scenes) - 1 and is_shorts and is_news)
-
-        # Intro/Outro 로직 (Play + Freeze)
-        if is_intro_scene and os.path.exists(intro_path):
-            try:
-                print(f"   👉 Intro 적용 시도...")
-                base_vid = VideoFileClip(intro_path).without_audio()
-                if is_shorts: base_vid = base_vid.resize(width=720)
-                else: base_vid = base_vid.resize(width=1280)
-
-                if duration > base_vid.duration:
-                    freeze_duration = duration - base_vid.duration
-                    last_frame = base_vid.to_ImageClip(t=base_vid.duration - 0.01).set_duration(freeze_duration)
-                    visual_clip = concatenate_videoclips([base_vid, last_frame])
-                else:
-                    visual_clip = base_vid.subclip(0, duration)
-                is_video_asset = True
-            except: is_video_asset = False
-
-        elif is_outro_scene and os.path.exists(outro_path):
-            try:
-                print(f"   👉 Outro 적용 시도...")
-                base_vid = VideoFileClip(outro_path).without_audio()
-                if is_shorts: base_vid = base_vid.resize(width=720)
-                else: base_vid = base_vid.resize(width=1280)
-
-                if duration > base_vid.duration:
-                    freeze_duration = duration - base_vid.duration
-                    last_frame = base_vid.to_ImageClip(t=base_vid.duration - 0.01).set_duration(freeze_duration)
-                    visual_clip = concatenate_videoclips([base_vid, last_frame])
-                else:
-                    visual_clip = base_vid.subclip(0, duration)
-                is_video_asset = True
-            except: is_video_asset = False
-        
-        if not is_video_asset:
-            if os.path.exists(img_path):
-                visual_clip = ImageClip(img_path).set_duration(duration)
-                if is_shorts: visual_clip = visual_clip.resize(width=720)
-                else: visual_clip = visual_clip.resize(width=1280)
-            else:
-                visual_clip = ColorClip(size=final_size, color=(0,0,0)).set_duration(duration)
+        asset = None
+        role = "body"
+        if i == 0 and ctx["is_shorts"] and ctx["is_news"]:
+            role = "intro"
+            if os.path.exists(intro_path): asset = intro_path
+        elif i == len(scenes) - 1 and ctx["is_shorts"] and ctx["is_news"]:
+            role = "outro"
+            if os.path.exists(outro_path): asset = outro_path
+
+        img_filename = f"image_{idx}.png"
+        specs.append({
+            "idx": idx,
+            "role": role,
+            "asset": asset,
+            "image": os.path.join(image_dir, img_filename),
+            "audio": aud_path,
+            "words": os.path.join(audio_dir, f"audio_{idx}.words.json"),
+            "source": ctx["image_sources"].get(img_filename),
+            "narration": scene.get("narration", "") if ctx["is_shorts"] else "",
+            "motion": resolve_motion(scene, idx, ctx.get("motion")),
+        })
+    return specs
+
+ASSET_CACHE_DIR = os.path.join(".cache", "assets")
+
+def file_digest(path):
+    """파일 내용 SHA-1 (경로/mtime/크기가 같으면 인덱스에 저장된 값을 재사용)"""
+    index_path = os.path.join(ASSET_CACHE_DIR, "digests.json")
+    st = os.stat(path)
+    stamp = f"{os.path.abspath(path)}|{int(st.st_mtime)}|{st.st_size}"
+    index = {}
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, "r", encoding="utf-8") as f: index = json.load(f)
+        except: index = {}
+    if stamp in index: return index[stamp]
+
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""): h.update(chunk)
+    index[stamp] = h.hexdigest()
+    os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f: json.dump(index, f, indent=2)
+    os.replace(tmp_path, index_path)
+    return index[stamp]
+
+def asset_profile(ctx):
+    return {"width": ctx["final_size"][0], "height": ctx["final_size"][1], "fps": ctx["fps"], "codec": VIDEO_CODEC, "pix_fmt": "yuv420p",
+            "preset": ctx["preset"], "crf": ctx["crf"]}
+
+def conform_asset(asset_path, ctx):
+    """Intro/Outro를 출력 프로필에 맞게 한 번만 변환해 캐시. (영상 경로, freeze 프레임 경로) 반환.
+    레이어 합성과 같은 배치(폭 맞춤, 쇼츠는 세로 중앙)로 출력 크기 전체 프레임을 만들어 두므로 세그먼트에 그대로(-c:v copy) 이어붙일 수 있음"""
+    profile = asset_profile(ctx)
+    tag = "{}_{width}x{height}_{fps}fps_{codec}_{pix_fmt}_{preset}_crf{crf}".format(file_digest(asset_path)[:16], **profile)
+    video_path = os.path.join(ASSET_CACHE_DIR, f"{tag}.mp4")
+    freeze_path = os.path.join(ASSET_CACHE_DIR, f"{tag}_freeze.png")
+    if os.path.exists(video_path) and os.path.exists(freeze_path):
+        return video_path, freeze_path
+
+    os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+    print(f"   🧰 에셋 변환 캐시 생성: {os.path.basename(asset_path)} -> {tag}")
+    tmp_video = video_path + ".part.mp4"
+    W, H = profile["width"], profile["height"]
+    y = "(ih-oh)/2" if ctx["is_shorts"] else "0"
+    pad_y = "(oh-ih)/2" if ctx["is_shorts"] else "0"
+    vf = f"scale={W}:-2:flags=lanczos,crop={W}:'min(ih,{H})':0:{y},pad={W}:{H}:0:{pad_y}:black,fps={profile['fps']}"
+    # 세그먼트와 같은 인코더 설정이어야 concat(-c copy) 시 SPS/PPS(엔트로피 코딩, 참조 프레임 수)가 맞음
+    run_ffmpeg(["-i", asset_path, "-an", "-vf", vf, "-c:v", profile["codec"], "-preset", profile["preset"]] + encode_params(ctx) + [tmp_video])
+    # 마지막 프레임을 freeze용 정지 이미지로 저장 (-update 1: 마지막으로 디코딩된 프레임이 남음)
+    tmp_freeze = freeze_path + ".part.png"
+    run_ffmpeg(["-sseof", "-1", "-i", tmp_video, "-update", "1", tmp_freeze])
+    os.replace(tmp_video, video_path)
+    os.replace(tmp_freeze, freeze_path)
+    return video_path, freeze_path
+
+def asset_play_duration(video_path):
+    """영상 길이 (헤더만 읽음, 디코딩 없음)"""
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    return ffmpeg_parse_infos(video_path)["duration"]
+
+def load_asset_clip(asset_path, duration, ctx):
+    """Intro/Outro 영상 재생 후 마지막 프레임으로 Freeze (변환 캐시가 있으면 리사이즈 없이 사용)"""
+    try:
+        video_path, freeze_path = conform_asset(asset_path, ctx)
+        base_vid = VideoFileClip(video_path, audio=False)
+        last_frame = ImageClip(freeze_path)
+    except Exception as e:
+        print(f"   ⚠️ 에셋 캐시 사용 불가, 원본을 직접 리사이즈합니다: {e}")
+        base_vid = VideoFileClip(asset_path).without_audio()
+        base_vid = base_vid.resize(width=ctx["final_size"][0])
+        last_frame = base_vid.to_ImageClip(t=base_vid.duration - 0.01)
+
+    if duration > base_vid.duration:
+        freeze_duration = duration - base_vid.duration
+        return concatenate_videoclips([base_vid, last_frame.set_duration(freeze_duration)])
+    return base_vid.subclip(0, duration)
+
+def render_asset_segment(spec, ctx, seg_path, duration):
+    """Intro/Outro 세그먼트: 변환 캐시 영상을 moviepy 디코딩/리사이즈 없이 사용하고 freeze 구간만 정지 이미지로 인코딩한 뒤 내레이션을 다중화.
+    자막이 없으면 에셋 구간은 -c:v copy, 자막이 있으면 ffmpeg overlay로 자막을 얹어 다시 인코딩 (레이어 합성과 같은 전체 길이 자막)"""
+    video_path, freeze_path = conform_asset(spec["asset"], ctx)
+    full = asset_play_duration(video_path)
+    play = min(full, duration)
+    tail = duration - play
+    head_path = seg_path + ".head.mp4"; tail_path = seg_path + ".tail.mp4"; caption_path = seg_path + ".caption.png"
+    still_path = seg_path + ".freeze.png"; list_path = seg_path + ".concat.txt"; tmp_path = seg_path + ".part.mp4"
+    encode = ["-c:v", VIDEO_CODEC, "-preset", ctx["preset"], "-r", str(ctx["fps"])] + encode_params(ctx)
+    overlays = overlay_layers(dict(spec, source=None), ctx, include_title=False)
+    try:
+        parts = [video_path]
+        if overlays:
+            # 출력 크기 투명 캔버스에 자막을 배치해 두고 에셋 구간 전체에 overlay
+            layer = np.zeros((ctx["final_size"][1], ctx["final_size"][0], 4), dtype=np.uint8)
+            for rgba, x, y in overlays: blit_over(layer, rgba, x, y)
+            Image.fromarray(layer).save(caption_path)
+            run_ffmpeg(["-i", video_path, "-i", caption_path, "-filter_complex", "[0:v][1:v]overlay=0:0:format=auto",
+                        "-t", f"{play:.3f}", "-an"] + encode + [head_path])
+            parts = [head_path]
+        elif play < full - 1e-3:
+            run_ffmpeg(["-i", video_path, "-t", f"{play:.3f}", "-c", "copy", "-an", head_path])
+            parts = [head_path]
+        if tail >= 1.0 / ctx["fps"]:
+            frame = np.array(Image.open(freeze_path).convert("RGB"))
+            for rgba, x, y in overlays: blit_rgba(frame, rgba, x, y)
+            Image.fromarray(frame).save(still_path)
+            run_ffmpeg(["-loop", "1", "-framerate", str(ctx["fps"]), "-i", still_path, "-t", f"{tail:.3f}"] + encode + [tail_path])
+            parts.append(tail_path)
+        write_concat_list(parts, list_path)
+        run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_path, "-i", spec["audio"], "-map", "0:v", "-map", "1:a",
+                    "-c:v", "copy", "-c:a", AUDIO_CODEC, "-ar", str(AUDIO_FPS), "-ac", "2", "-t", f"{duration:.3f}", tmp_path])
+        os.replace(tmp_path, seg_path)
+    finally:
+        for p in (head_path, tail_path, caption_path, still_path, list_path, tmp_path):
+            if os.path.exists(p): os.remove(p)
+    return play
+
+def blit_rgba(canvas, rgba, x, y):
+    """RGBA 오버레이를 RGB 캔버스에 알파 블렌딩 (화면 밖 영역은 잘라냄)"""
+    H, W = canvas.shape[:2]
+    h, w = rgba.shape[:2]
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(W, x + w), min(H, y + h)
+    if x0 >= x1 or y0 >= y1: return canvas
+    src = rgba[y0 - y:y1 - y, x0 - x:x1 - x]
+    alpha = src[..., 3:4].astype(np.float32) / 255.0
+    dst = canvas[y0:y1, x0:x1].astype(np.float32)
+    canvas[y0:y1, x0:x1] = (src[..., :3] * alpha + dst * (1.0 - alpha)).astype(np.uint8)
+    return canvas
+
+def load_still_image(path, width, fast=False):
+    """장면 이미지를 출력 폭에 맞춰 읽기 (moviepy resize(width=...)와 동일한 비율).
+    fast=True(draft)면 디코딩 단계 축소(draft/reduce) 후 리사이즈"""
+    with Image.open(path) as img:
+        if fast:
+            img.draft("RGB", (width, max(1, img.height * width // img.width)))
+            factor = img.width // width
+            if factor >= 2: img = img.reduce(factor)
+        img = img.convert("RGB")
+        height = int(round(img.height * width / img.width))
+        if img.size != (width, height): img = img.resize((width, height), Image.LANCZOS)
+        return np.array(img)
+
+def overlay_layers(spec, ctx, include_title, include_caption=True):
+    """정지 장면 위에 올라가는 오버레이 (RGBA 배열, x, y) 목록 - moviepy 레이어 순서와 동일"""
+    W, H = ctx["final_size"]
+    overlays = []
+    if spec["source"]:
+        label = render_source_label(f"Source: {spec['source']}", get_font_path("Source"), scale=ctx["scale"])
+        overlays.append((label, W - label.shape[1], scaled(ctx, 50 if ctx["is_shorts"] else 20)))
+    if spec["narration"] and include_caption:
+        caption = render_highlighted_text(spec["narration"], fontsize=45, max_width=650, scale=ctx["scale"])
+        overlays.append((caption, (W - caption.shape[1]) // 2, scaled(ctx, 950)))
+    if include_title:
+        title = render_highlighted_text(ctx["title"], fontsize=50, highlight_color='#00ff00', scale=ctx["scale"])
+        overlays.append((title, (W - title.shape[1]) // 2, scaled(ctx, 100)))
+    return overlays
+
+def compose_still_background(spec, ctx, scale=1.0):
+    """배경(검정) + 장면 이미지만 합성. scale > 1이면 Ken Burns용으로 확대된 버퍼를 만듦"""
+    W, H = ctx["final_size"]
+    W, H = int(round(W * scale)), int(round(H * scale))
+    canvas = np.zeros((H, W, 3), dtype=np.uint8)
+    if os.path.exists(spec["image"]):
+        img = load_still_image(spec["image"], W, fast=ctx["scale"] < 1.0)
+        # 쇼츠는 중앙 정렬, 일반 영상은 좌상단 기준 (기존 레이어 배치와 동일)
+        y = (H - img.shape[0]) // 2 if ctx["is_shorts"] else 0
+        src_y0 = max(0, -y); dst_y0 = max(0, y)
+        rows = min(img.shape[0] - src_y0, H - dst_y0)
+        canvas[dst_y0:dst_y0 + rows] = img[src_y0:src_y0 + rows]
+    return canvas
+
+def compose_still_frame(spec, ctx, include_title, include_caption=True):
+    """정지 장면의 모든 레이어(배경/이미지/출처/자막/타이틀)를 RGB 프레임 하나로 미리 합성"""
+    canvas = compose_still_background(spec, ctx)
+    for rgba, x, y in overlay_layers(spec, ctx, include_title, include_caption):
+        blit_rgba(canvas, rgba, x, y)
+    return canvas
+
+# --- 단어 동기화 자막 (karaoke: 전체 문장에서 현재 단어 강조 / groups: 몇 단어씩 끊어서 표시) ---
+CAPTION_STYLES = ("static", "karaoke", "groups")
+CAPTION_ACTIVE_COLOR = '#00e5ff'
+CAPTION_GROUP_WORDS = 3
+ATLAS_PAD = 8   # 스프라이트 슬롯 좌우 여백 (외곽선 + 리사이즈 번짐 방지)
+
+def render_word_atlas(tokens, font_path, fontsize, active_color=CAPTION_ACTIVE_COLOR,
+                      stroke_color='black', stroke_width=2, scale=1.0):
+    """단어마다 스타일(0행: 기본 색, 1행: 활성 색)별로 한 번씩만 래스터화한 스프라이트 시트.
+    (시트, 슬롯 x 목록, 슬롯 폭 목록, 슬롯 안 글자 시작 여백) 반환 - 좌표는 설계 해상도 기준"""
+    line_h = int(fontsize * 1.4)
+    pad = ATLAS_PAD + stroke_width
+    xs = []; widths = []; x = 0
+    for t in tokens:
+        xs.append(x); widths.append(t['w'] + 2 * pad); x += widths[-1]
+
+    def render():
+        font = load_font(font_path, fontsize)
+        img = Image.new('RGBA', (max(1, x), line_h * 2), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        for x0, t in zip(xs, tokens):
+            draw.text((x0 + pad, 0), t['text'], font=font, fill=t['color'], stroke_width=stroke_width, stroke_fill=stroke_color)
+            draw.text((x0 + pad, line_h), t['text'], font=font, fill=active_color, stroke_width=stroke_width, stroke_fill=stroke_color)
+        return np.array(img)
+
+    key = ('atlas', tuple((t['text'], t['color']) for t in tokens), font_path, fontsize, active_color, stroke_color, stroke_width)
+    return cached_raster(key, render, scale), xs, widths, pad
+
+def blit_over(canvas, rgba, x, y):
+    """RGBA 캔버스 위에 RGBA 스프라이트를 알파 합성 (source-over)"""
+    H, W = canvas.shape[:2]
+    h, w = rgba.shape[:2]
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(W, x + w), min(H, y + h)
+    if x0 >= x1 or y0 >= y1: return canvas
+    src = rgba[y0 - y:y1 - y, x0 - x:x1 - x].astype(np.float32) / 255.0
+    dst = canvas[y0:y1, x0:x1].astype(np.float32) / 255.0
+    sa = src[..., 3:4]; da = dst[..., 3:4]
+    out_a = sa + da * (1.0 - sa)
+    out_rgb = (src[..., :3] * sa + dst[..., :3] * da * (1.0 - sa)) / np.maximum(out_a, 1e-6)
+    canvas[y0:y1, x0:x1] = (np.concatenate([out_rgb, out_a], axis=2) * 255.0 + 0.5).astype(np.uint8)
+    return canvas
+
+def load_word_timings(path):
+    """narrator.py가 저장한 단어 경계 [{'text', 'start', 'end'}] (초, 속도 보정 완료)"""
+    if not path or not os.path.exists(path): return []
+    try:
+        with open(path, "r", encoding="utf-8") as f: return json.load(f)
+    except: return []
+
+def _norm_word(text):
+    return re.sub(r"\W", "", text.lower())
+
+def align_word_timings(tokens, words, duration):
+    """TTS 단어 경계를 자막 토큰에 순서대로 매칭해 토큰별 시작 시간 배열 반환.
+    매칭되지 않은 토큰은 앞뒤 시간으로 보간하고, 경계 정보가 부족하면 글자 수 비례로 배분"""
+    n = len(tokens)
+    starts = np.full(n, np.nan)
+    j = 0
+    for w in words:
+        wt = _norm_word(w.get("text", ""))
+        if not wt: continue
+        # 구두점/기호만 있는 토큰이나 TTS가 합친 단어를 건너뛰도록 몇 토큰 앞까지만 탐색
+        for k in range(j, min(n, j + 3)):
+            tt = _norm_word(tokens[k]['text'])
+            if tt and (wt in tt or tt in wt):
+                starts[k] = float(w["start"]); j = k + 1
+                break
+    known = np.nonzero(~np.isnan(starts))[0]
+    if len(known) < max(1, n // 2):
+        chars = np.array([max(1, len(t['text'])) for t in tokens], dtype=float)
+        return np.concatenate([[0.0], np.cumsum(chars)[:-1]]) / chars.sum() * duration
+    starts = np.interp(np.arange(n), known, starts[known])
+    return np.maximum.accumulate(starts)
+
+class CaptionTrack:
+    """단어 타이밍에 맞춰 현재 단어를 강조하는 애니메이션 자막.
+    단어는 스타일별로 한 번만 래스터화(atlas)하고, 활성 단어 인덱스별 자막 이미지를 한 번만 조립해 캐시하므로
+    프레임마다 텍스트를 다시 그리지 않음 (모든 이미지는 같은 크기 -> 위치 고정)"""
+
+    def __init__(self, spec, ctx, duration, style="karaoke", fontsize=45, max_width=650):
+        self.scale = ctx["scale"]
+        layout = layout_highlighted_text(spec["narration"], fontsize, max_width=max_width)
+        self.tokens = layout['tokens']
+        self.font_path = layout['font_path']
+        self.sheet, self.slot_x, self.slot_w, self.pad = render_word_atlas(self.tokens, self.font_path, fontsize, scale=self.scale)
+        self.starts = align_word_timings(self.tokens, load_word_timings(spec.get("words")), duration)
+
+        if style == "groups":
+            self.groups = []
+            for g in range(0, len(self.tokens), CAPTION_GROUP_WORDS):
+                members = list(range(g, min(g + CAPTION_GROUP_WORDS, len(self.tokens))))
+                placed = layout_tokens([self.tokens[k] for k in members], self.font_path, fontsize, max_width)
+                self.groups.append((members, placed['tokens']))
+            size = (layout['size'][0], max(len({t['y'] for t in placed}) for _, placed in self.groups) * int(fontsize * 1.4) + 20)
+        else:
+            self.groups = [(list(range(len(self.tokens))), self.tokens)]
+            size = layout['size']
+        self.group_of = {k: gi for gi, (members, _) in enumerate(self.groups) for k in members}
+        self.size = (max(1, int(round(size[0] * self.scale))), max(1, int(round(size[1] * self.scale))))
+        self._base = {}
+        self._cache = {}
+
+    def sprite(self, k, active):
+        """스프라이트 시트에서 k번째 단어 슬롯 잘라내기 (배율 적용 좌표)"""
+        x0 = int(round(self.slot_x[k] * self.scale)); x1 = int(round((self.slot_x[k] + self.slot_w[k]) * self.scale))
+        row_h = self.sheet.shape[0] // 2
+        y0 = row_h if active else 0
+        return self.sheet[y0:y0 + row_h, x0:x1]
+
+    def _place(self, canvas, k, token, active):
+        x = int(round((token['x'] - self.pad) * self.scale)); y = int(round(token['y'] * self.scale))
+        blit_over(canvas, self.sprite(k, active), x, y)
+
+    def index_at(self, t):
+        return int(min(max(np.searchsorted(self.starts, t, side="right") - 1, 0), len(self.tokens) - 1))
+
+    def image_at(self, t):
+        """활성 단어가 바뀔 때만 조립 (그룹 기본 이미지 + 활성 단어 스프라이트 1개)"""
+        if not self.tokens: return None
+        k = self.index_at(t)
+        img = self._cache.get(k)
+        if img is None:
+            gi = self.group_of[k]
+            members, placed = self.groups[gi]
+            base = self._base.get(gi)
+            if base is None:
+                base = np.zeros((self.size[1], self.size[0], 4), dtype=np.uint8)
+                for m, token in zip(members, placed): self._place(base, m, token, False)
+                self._base[gi] = base
+            img = base.copy()
+            self._place(img, k, placed[members.index(k)], True)
+            self._cache[k] = img
+        return img
+
+    def position(self, ctx):
+        return (ctx["final_size"][0] - self.size[0]) // 2, scaled(ctx, 950)
+
+    def to_clip(self, ctx, duration):
+        """non-flatten(moviepy 레이어) 경로용 RGB + 마스크 클립"""
+        clip = VideoClip(lambda t: self.image_at(t)[..., :3], duration=duration)
+        mask = VideoClip(lambda t: self.image_at(t)[..., 3] / 255.0, ismask=True, duration=duration)
+        return clip.set_mask(mask).set_position(self.position(ctx))
+
+def caption_track(spec, ctx, duration):
+    """애니메이션 자막 스타일이면 CaptionTrack, 정적 자막이면 None"""
+    if not spec["narration"] or ctx.get("captions", "static") == "static": return None
+    track = CaptionTrack(spec, ctx, duration, ctx["captions"])
+    return track if track.tokens else None
+
+# Ken Burns 모션 프리셋: zoom(시작, 끝), 창 중심(시작, 끝) - 중심은 여유 공간 대비 0~1 비율
+MOTION_MAX_ZOOM = 1.12
+MOTION_PRESETS = {
+    "zoom_in":  {"zoom": (1.0, MOTION_MAX_ZOOM), "center": ((0.5, 0.5), (0.5, 0.5))},
+    "zoom_out": {"zoom": (MOTION_MAX_ZOOM, 1.0), "center": ((0.5, 0.5), (0.5, 0.5))},
+    "pan_left": {"zoom": (MOTION_MAX_ZOOM, MOTION_MAX_ZOOM), "center": ((0.9, 0.5), (0.1, 0.5))},
+    "pan_right": {"zoom": (MOTION_MAX_ZOOM, MOTION_MAX_ZOOM), "center": ((0.1, 0.5), (0.9, 0.5))},
+}
+MOTION_CYCLE = ["zoom_in", "pan_right", "zoom_out", "pan_left"]
+
+EASINGS = {
+    "linear": lambda u: u,
+    "ease_in_out": lambda u: 0.5 - 0.5 * np.cos(np.pi * u),
+    "ease_out": lambda u: 1.0 - (1.0 - u) ** 2,
+}
+
+def resolve_motion(scene, idx, motion_flag):
+    """장면별 모션 결정: story.json의 scene['motion'] > --motion 옵션 (auto는 프리셋 순환)"""
+    motion = scene.get("motion", motion_flag) if isinstance(scene, dict) else motion_flag
+    if not motion or motion == "none": return None
+    if motion == "auto": motion = MOTION_CYCLE[(idx - 1) % len(MOTION_CYCLE)]
+    return motion if motion in MOTION_PRESETS else None
+
+def motion_trajectory(motion, duration, fps, out_size, buf_size, easing="ease_in_out"):
+    """프레임별 크롭 창(행/열 인덱스)을 미리 계산. 창 크기가 출력과 같으면 슬라이스로 처리"""
+    preset = MOTION_PRESETS[motion]
+    W, H = out_size; Wb, Hb = buf_size
+    n = max(1, int(np.ceil(duration * fps)))
+    u = EASINGS[easing](np.linspace(0.0, 1.0, n))
+    zoom = preset["zoom"][0] + (preset["zoom"][1] - preset["zoom"][0]) * u
+    (cx0, cy0), (cx1, cy1) = preset["center"]
+    cx = cx0 + (cx1 - cx0) * u; cy = cy0 + (cy1 - cy0) * u
+    # 버퍼는 MOTION_MAX_ZOOM 배율이므로 zoom 배율에서 보이는 창 = 버퍼 / zoom
+    win_w = Wb / zoom; win_h = Hb / zoom
+    x0 = cx * (Wb - win_w); y0 = cy * (Hb - win_h)
+
+    base_c = np.arange(W) + 0.5; base_r = np.arange(H) + 0.5
+    windows = []
+    for k in range(n):
+        ix, iy = int(round(x0[k])), int(round(y0[k]))
+        if abs(win_w[k] - W) < 0.5 and abs(win_h[k] - H) < 0.5:
+            windows.append((slice(iy, iy + H), slice(ix, ix + W)))
+        else:
+            cols = np.minimum((x0[k] + base_c * (win_w[k] / W)).astype(np.intp), Wb - 1)
+            rows = np.minimum((y0[k] + base_r * (win_h[k] / H)).astype(np.intp), Hb - 1)
+            windows.append((rows, cols))
+    return windows
+
+def make_motion_clip(spec, ctx, duration, include_title, track=None):
+    """확대 버퍼에서 벡터화된 인덱싱으로 프레임을 뽑고, 고정 오버레이는 미리 곱해둔 알파로 합성.
+    track(애니메이션 자막)이 있으면 자막만 프레임마다 캐시된 이미지로 덧그림"""
+    W, H = ctx["final_size"]
+    buf = compose_still_background(spec, ctx, scale=MOTION_MAX_ZOOM)
+    windows = motion_trajectory(spec["motion"], duration, ctx["fps"], (W, H), (buf.shape[1], buf.shape[0]))
+
+    # overlay의 RGB는 검정 위에 합성된 값 = 이미 알파가 곱해진(premultiplied) 색, 알파는 "over" 누적
+    overlay = np.zeros((H, W, 4), dtype=np.uint8)
+    for rgba, x, y in overlay_layers(spec, ctx, include_title, include_caption=track is None):
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(W, x + rgba.shape[1]), min(H, y + rgba.shape[0])
+        if x0 >= x1 or y0 >= y1: continue
+        region = overlay[y0:y1, x0:x1]
+        src = rgba[y0 - y:y1 - y, x0 - x:x1 - x]
+        a = src[..., 3:4].astype(np.float32) / 255.0
+        region[..., :3] = (src[..., :3] * a + region[..., :3] * (1 - a)).astype(np.uint8)
+        region[..., 3:4] = (src[..., 3:4] + region[..., 3:4] * (1 - a)).astype(np.uint8)
+    rows = np.nonzero(overlay[..., 3].any(axis=1))[0]
+    band = slice(rows[0], rows[-1] + 1) if len(rows) else None
+    if band is not None:
+        alpha = overlay[band, :, 3:4].astype(np.uint16)
+        ov_premul = overlay[band, :, :3].astype(np.uint16) * 255
+        inv_alpha = 255 - alpha
+
+    def make_frame(t):
+        k = min(int(t * ctx["fps"]), len(windows) - 1)
+        r, c = windows[k]
+        if isinstance(r, slice): frame = buf[r, c].copy()
+        else: frame = buf.take(r, axis=0).take(c, axis=1)
+        if band is not None:
+            frame[band] = ((ov_premul + frame[band].astype(np.uint16) * inv_alpha) // 255).astype(np.uint8)
+        if track is not None: blit_rgba(frame, track.image_at(t), *track.position(ctx))
+        return frame
+
+    return VideoClip(make_frame, duration=duration)
+
+@tracing.traced("render.build_scene")
+def build_scene_clip(spec, ctx):
+    """장면 하나를 합성. (clip, role) 반환 - Intro/Outro 적용 실패 시 role은 body"""
+    idx = spec["idx"]
+    final_size = ctx["final_size"]
+    is_shorts = ctx["is_shorts"]
+    print(f"🎬 Scene {idx} 합성 중...")
+    audio_clip = AudioFileClip(spec["audio"])
+    duration = audio_clip.duration
+
+    visual_clip = None
+    is_video_asset = False
+    if spec["asset"]:
+        try:
+            print(f"   👉 {spec['role'].capitalize()} 적용 시도...")
+            visual_clip = load_asset_clip(spec["asset"], duration, ctx)
+            is_video_asset = True
+        except: is_video_asset = False
 
-        layers = []
-        
-        if is_shorts:
-            layers.append(ColorClip(size=final_size, color=(0, 0, 0)).set_duration(duration))
-            layers.append(visual_clip.set_position("center"))
+    track = caption_track(spec, ctx, duration) if not is_video_asset else None
+
+    if not is_video_asset and spec.get("motion"):
+        # Ken Burns 모션 (타이틀은 flatten 모드에서만 장면에 포함, 아니면 바깥에서 합성)
+        clip = make_motion_clip(spec, ctx, duration, include_title=ctx["show_title"] and ctx["flatten"], track=track)
+        return clip.set_audio(audio_clip), "body"
+
+    if not is_video_asset and ctx["flatten"] and track is not None:
+        # 정지 장면 + 애니메이션 자막: 자막 없는 프레임을 미리 합성하고 활성 단어가 바뀔 때만 새 프레임 생성
+        still = compose_still_frame(spec, ctx, include_title=ctx["show_title"], include_caption=False)
+        pos = track.position(ctx)
+        last = {}
+        def make_frame(t):
+            k = track.index_at(t)
+            if last.get("k") != k:
+                last["k"] = k
+                last["frame"] = blit_rgba(still.copy(), track.image_at(t), *pos)
+            return last["frame"]
+        return VideoClip(make_frame, duration=duration).set_audio(audio_clip), "body"
+
+    if not is_video_asset and ctx["flatten"]:
+        # 움직임이 없는 장면은 타이틀까지 한 번에 합성해 상수 프레임으로 출력
+        frame = compose_still_frame(spec, ctx, include_title=ctx["show_title"])
+        return ImageClip(frame).set_duration(duration).set_audio(audio_clip), "body"
+
+    if not is_video_asset:
+        if os.path.exists(spec["image"]):
+            visual_clip = ImageClip(spec["image"]).set_duration(duration)
+            visual_clip = visual_clip.resize(width=final_size[0])
         else:
-            layers.append(visual_clip)
+            visual_clip = ColorClip(size=final_size, color=(0,0,0)).set_duration(duration)
+
+    layers = []
+    if is_shorts:
+        layers.append(ColorClip(size=final_size, color=(0, 0, 0)).set_duration(duration))
+        layers.append(visual_clip.set_position("center"))
+    else:
+        layers.append(visual_clip)
+
+    if not is_video_asset and spec["source"]:
+        source_clip = create_source_label(f"Source: {spec['source']}", get_font_path("Source"), scale=ctx["scale"])
+        source_clip = source_clip.set_position(("right", scaled(ctx, 50 if is_shorts else 20))).set_duration(duration)
+        layers.append(source_clip)
 
-        if not is_video_asset:
-            img_filename = f"image_{idx}.png"
-            if img_filename in image_sources:
-                source_clip = create_source_label(f"Source: {image_sources[img_filename]}", FONT_EN)
-                source_clip = source_clip.set_position(("right", 50 if is_shorts else 20)).set_duration(duration)
-                layers.append(source_clip)
+    if track is not None:
+        layers.append(track.to_clip(ctx, duration))
+    elif spec["narration"]:
+        txt_clip = create_highlighted_text_clip(spec["narration"], fontsize=45, max_width=650, scale=ctx["scale"])
+        layers.append(txt_clip.set_position(("center", scaled(ctx, 950))).set_duration(duration))
 
-        if is_shorts:
-            narration = scene.get("narration", "")
-            if narration:
-                txt_clip = create_highlighted_text_clip(narration, fontsize=45, max_width=650)
-                layers.append(txt_clip.set_position(("center", 950)).set_duration(duration))
+    scene_composite = CompositeVideoClip(layers, size=final_size).set_audio(audio_clip)
+    role = spec["role"] if is_video_asset else "body"
+    return scene_composite, role
 
-        scene_composite = CompositeVideoClip(layers, size=final_size).set_audio(audio_clip)
+def create_title_clip(ctx, duration):
+    title_clip = create_highlighted_text_clip(ctx["title"], fontsize=50, highlight_color='#00ff00', is_title=True, scale=ctx["scale"])
+    return title_clip.set_position(("center", scaled(ctx, 100))).set_duration(duration)
 
-        if is_intro_scene and is_video_asset: intro_clip_final = scene_composite
-        elif is_outro_scene and is_video_asset: outro_clip_final = scene_composite
-        else: body_clips.append(scene_composite)
+def render_sequential(specs, ctx, output_path):
+    intro_clip_final = None
+    outro_clip_final = None
+    body_clips = []
+    for spec in specs:
+        clip, role = build_scene_clip(spec, ctx)
+        if role == "intro": intro_clip_final = clip
+        elif role == "outro": outro_clip_final = clip
+        else: body_clips.append(clip)
 
-    if not body_clips: print("❌ 본문 클립 생성 실패"); return
+    if not body_clips: print("❌ 본문 클립 생성 실패"); return False
 
     print("🎞️ 클립 병합 및 타이틀 적용 중...")
-    body_concat = concatenate_videoclips(body_clips, method="compose")
-    
-    if is_shorts and is_news:
-        title_clip = create_highlighted_text_clip(title_text, fontsize=50, highlight_color='#00ff00', is_title=True)
-        title_clip = title_clip.set_position(("center", 100)).set_duration(body_concat.duration)
-        body_concat = CompositeVideoClip([body_concat, title_clip], size=final_size)
-    
+    # 모든 장면이 final_size로 합성되어 있으면 chain으로 이어붙여 프레임마다 재합성하지 않음
+    concat_method = "chain" if ctx["flatten"] else "compose"
+    body_concat = concatenate_videoclips(body_clips, method=concat_method)
+
+    if ctx["show_title"] and not ctx["flatten"]:
+        title_clip = create_title_clip(ctx, body_concat.duration)
+        body_concat = CompositeVideoClip([body_concat, title_clip], size=ctx["final_size"])
+
     final_sequence = []
     if intro_clip_final: final_sequence.append(intro_clip_final)
     final_sequence.append(body_concat)
     if outro_clip_final: final_sequence.append(outro_clip_final)
 
-    final_clip = concatenate_videoclips(final_sequence, method="compose")
-    output_dir = "results"; os.makedirs(output_dir, exist_ok=True)
-    time_tag = datetime.now().strftime("%m%d_%H%M")
-    base_name = "final_shorts" if is_shorts else "final_video"
-    output_path = os.path.join(output_dir, f"{base_name}_{time_tag}.mp4")
-    
+    final_clip = concatenate_videoclips(final_sequence, method=concat_method)
+    print(f"🚀 렌더링 시작: {output_path}")
+    write_final(final_clip, ctx, output_path)
+    return True
+
+def write_final(clip, ctx, output_path, **span_attrs):
+    """최종 영상 쓰기. progressive면 fragmented MP4(.part.mp4)에 써서 렌더링 중에도 앞부분을 재생할 수 있게 하고,
+    끝나면 재인코딩 없이(-c copy) fast-start MP4로 마무리. 아니면 처음부터 +faststart로 씀"""
+    progressive = ctx.get("progressive")
+    target = output_path + ".part.mp4" if progressive else output_path
+    params = ["-crf", str(ctx["crf"])] + (FRAGMENTED_MOVFLAGS if progressive else FASTSTART_MOVFLAGS)
+    if progressive: print(f"   👀 미리보기: {target} (렌더링 중 재생 가능)")
+    with tracing.span("render.write_videofile", output=output_path, duration=clip.duration, fps=ctx["fps"], **span_attrs):
+        clip.write_videofile(target, fps=ctx["fps"], codec=VIDEO_CODEC, audio_codec=AUDIO_CODEC, audio_fps=AUDIO_FPS,
+                             preset=ctx["preset"], threads=4, ffmpeg_params=params, logger="bar")
+    if progressive: finalize_faststart(target, output_path)
+
+def finalize_faststart(src_path, output_path):
+    """fragmented MP4 -> moov가 앞에 있는 일반 MP4 (stream copy)"""
+    with tracing.span("render.faststart", output=output_path):
+        run_ffmpeg(["-i", src_path, "-c", "copy", "-map", "0"] + FASTSTART_MOVFLAGS + [output_path])
+    os.remove(src_path)
+
+def current_rss_mb():
+    """현재 프로세스 RSS (MB). 측정 불가 시 None"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        return None
+
+def peak_rss_mb(children=False):
+    """프로세스(children=True면 종료된 자식 중 가장 큰) 최대 RSS (MB). 프로세스 수명 전체의 최댓값.
+    Linux는 KB, macOS는 byte 단위"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        if children: return None
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except (ImportError, AttributeError):
+            return None
+
+class RssMonitor:
+    """렌더링 한 번 동안의 최대 RSS를 주기적으로 측정 (상주 워커에서도 이번 렌더링만의 값)"""
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss_mb()
+            if rss is not None: self.peak = max(self.peak or 0.0, rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        rss = current_rss_mb()
+        if rss is not None: self.peak = max(self.peak or 0.0, rss)
+
+def probe_duration(audio_path):
+    clip = AudioFileClip(audio_path)
+    try: return clip.duration
+    finally: clip.close()
+
+class StreamingTimeline:
+    """장면이 재생 구간에 들어올 때만 미디어를 열고 지나가면 닫는 타임라인.
+    영상과 오디오는 moviepy가 따로 순차적으로 읽으므로 각자 열린 장면을 관리하고,
+    새 장면을 열 때 RSS가 memory_budget_mb를 넘으면 열린 장면을 모두 닫고 캡션 래스터/단어 폭 캐시를 비움"""
+
+    def __init__(self, specs, ctx, memory_budget_mb=None, max_open=1):
+        self.specs = specs
+        self.ctx = ctx
+        self.memory_budget_mb = memory_budget_mb
+        self.max_open = max_open
+        self.durations = [probe_duration(spec["audio"]) for spec in specs]
+        self.starts = np.concatenate([[0.0], np.cumsum(self.durations)[:-1]])
+        self.duration = float(sum(self.durations))
+        self.open_video = {}   # k -> clip (삽입 순서 = LRU 순서)
+        self.open_audio = {}   # k -> AudioFileClip
+        self.opened = 0
+        self.trims = 0
+
+    def scene_at(self, t):
+        return int(min(max(np.searchsorted(self.starts, t, side="right") - 1, 0), len(self.specs) - 1))
+
+    def _evict(self, cache, keep):
+        while len(cache) > self.max_open:
+            k = next(iter(cache))
+            if k == keep: break
+            cache.pop(k).close()
+
+    def _enforce_budget(self):
+        """새 장면을 열기 직전에 예산 확인 (프레임마다 gc를 돌리지 않도록 장면 단위로만)"""
+        if not self.memory_budget_mb: return
+        rss = current_rss_mb()
+        if rss is None or rss <= self.memory_budget_mb: return
+        # 오디오는 moviepy가 영상보다 먼저 따로 다 읽으므로 닫아도 필요하면 다시 열림
+        for cache in (self.open_video, self.open_audio):
+            for k in list(cache): cache.pop(k).close()
+        freed = clear_render_caches()
+        gc.collect()
+        self.trims += 1
+        tracing.event("render.memory_trim", rss_mb=round(rss, 1), budget_mb=self.memory_budget_mb, raster_mb=round(freed / 2**20, 1))
+
+    def video_clip(self, k):
+        clip = self.open_video.pop(k, None)
+        if clip is None:
+            self._enforce_budget()
+            with tracing.span("render.stream_open", idx=self.specs[k]["idx"]):
+                clip, role = build_scene_clip(self.specs[k], self.ctx)
+                if role == "body" and self.ctx["show_title"] and not self.ctx["flatten"]:
+                    clip = CompositeVideoClip([clip, create_title_clip(self.ctx, clip.duration)], size=self.ctx["final_size"])
+            # 오디오는 별도 리더로 읽으므로 장면 클립의 오디오 리더는 바로 닫음
+            if clip.audio is not None:
+                clip.audio.close(); clip = clip.without_audio()
+            self.opened += 1
+        self.open_video[k] = clip
+        self._evict(self.open_video, k)
+        return clip
+
+    def audio_clip(self, k):
+        clip = self.open_audio.pop(k, None)
+        if clip is None:
+            self._enforce_budget()
+            clip = AudioFileClip(self.specs[k]["audio"], fps=AUDIO_FPS)
+        self.open_audio[k] = clip
+        self._evict(self.open_audio, k)
+        return clip
+
+    def make_frame(self, t):
+        k = self.scene_at(t)
+        local = min(t - self.starts[k], self.durations[k] - 1e-3)
+        return self.video_clip(k).get_frame(max(local, 0))
+
+    def make_audio_frame(self, t):
+        scalar = np.isscalar(t)
+        ts = np.atleast_1d(np.asarray(t, dtype=float))
+        out = np.zeros((len(ts), 2))
+        ks = np.clip(np.searchsorted(self.starts, ts, side="right") - 1, 0, len(self.specs) - 1)
+        for k in np.unique(ks):
+            mask = ks == k
+            local = np.clip(ts[mask] - self.starts[k], 0, self.durations[k] - 1e-3)
+            out[mask] = self.audio_clip(int(k)).get_frame(local)
+        return out[0] if scalar else out
+
+    def close(self):
+        for cache in (self.open_video, self.open_audio):
+            for clip in cache.values(): clip.close()
+            cache.clear()
+
+    def to_clip(self):
+        audio = AudioClip(self.make_audio_frame, duration=self.duration, fps=AUDIO_FPS)
+        return VideoClip(self.make_frame, duration=self.duration).set_audio(audio)
+
+def render_streaming(specs, ctx, output_path, memory_budget_mb=None):
+    """장면을 필요할 때만 열어 메모리/파일 핸들 사용량을 장면 수와 무관하게 유지"""
+    if not specs: print("❌ 본문 클립 생성 실패"); return False
+    timeline = StreamingTimeline(specs, ctx, memory_budget_mb)
+    budget = f"{memory_budget_mb}MB" if memory_budget_mb else "없음"
+    print(f"🌊 스트리밍 타임라인: {len(specs)}개 장면, {timeline.duration:.1f}초 (메모리 예산: {budget})")
     print(f"🚀 렌더링 시작: {output_path}")
-    final_clip.write_videofile(output_path, fps=24, codec="libx264", audio_codec="aac", threads=4, logger="bar")
-    shutil.copy2(output_path, os.path.join(output_dir, f"{base_name}.mp4"))
-    print(f"✨ 편집 완료! (저장: {output_path})")
+    try:
+        write_final(timeline.to_clip(), ctx, output_path, streaming=True)
+    finally:
+        timeline.close()
+    if timeline.trims: print(f"   🧹 메모리 예산 초과로 캐시 정리 {timeline.trims}회")
+    return True
+
+def render_segment(spec, ctx, seg_path):
+    """프로세스 풀 작업자: 장면 하나를 독립 세그먼트로 인코딩"""
+    if spec["asset"]:
+        try:
+            duration = probe_duration(spec["audio"])
+            with tracing.span("render.segment", idx=spec["idx"], role=spec["role"], duration=duration, stream_copy=True):
+                render_asset_segment(spec, ctx, seg_path, duration)
+            return {"idx": spec["idx"], "role": spec["role"], "ok": True, "duration": duration, "peak_rss": peak_rss_mb()}
+        except Exception as e:
+            print(f"   ⚠️ Scene {spec['idx']} 에셋 stream copy 실패, 합성 경로로 렌더링: {e}")
+    try:
+        clip, role = build_scene_clip(spec, ctx)
+        if role == "body" and ctx["show_title"] and not ctx["flatten"]:
+            clip = CompositeVideoClip([clip, create_title_clip(ctx, clip.duration)], size=ctx["final_size"]).set_audio(clip.audio)
+        tmp_path = seg_path + ".part.mp4"
+        # moviepy 기본 임시 오디오는 현재 폴더에 출력 파일 이름으로 생김 -> 변형 간 같은 이름(seg_NNN)끼리 충돌하므로 세그먼트별 경로 지정
+        with tracing.span("render.segment", idx=spec["idx"], role=role, duration=clip.duration):
+            clip.write_videofile(tmp_path, fps=ctx["fps"], codec=VIDEO_CODEC, audio_codec=AUDIO_CODEC, preset=ctx["preset"],
+                                 audio_fps=AUDIO_FPS, threads=1, ffmpeg_params=encode_params(ctx), logger=None,
+                                 temp_audiofile=seg_path + ".snd.m4a")
+        duration = clip.duration
+        clip.close()
+        os.replace(tmp_path, seg_path)
+        # 풀은 렌더링마다 새로 만들므로 작업자 프로세스의 최대 RSS = 이번 렌더링에서의 값
+        return {"idx": spec["idx"], "role": role, "ok": True, "duration": duration, "peak_rss": peak_rss_mb()}
+    except Exception as e:
+        return {"idx": spec["idx"], "role": None, "ok": False, "error": str(e)}
+
+def write_concat_list(paths, list_path):
+    """ffmpeg concat demuxer 입력 목록"""
+    with open(list_path, "w", encoding="utf-8") as f:
+        for p in paths:
+            f.write("file '{}'\n".format(os.path.abspath(p).replace("\\", "/").replace("'", "'\\''")))
+
+def concat_segments(seg_paths, output_path):
+    """ffmpeg concat demuxer로 재인코딩 없이 이어붙이기"""
+    list_path = output_path + ".concat.txt"
+    write_concat_list(seg_paths, list_path)
+    try:
+        run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy"] + FASTSTART_MOVFLAGS + [output_path])
+    finally:
+        if os.path.exists(list_path): os.remove(list_path)
+
+HLS_PLAYLIST = "preview.m3u8"
+
+def hls_dir(job):
+    return os.path.join(job["segment_dir"], "hls")
+
+def publish_hls_segment(job, idx, duration):
+    """완료된 세그먼트를 MPEG-TS로 재다중화(-c copy)하고 미리보기 재생목록 갱신"""
+    ts_path = os.path.join(hls_dir(job), f"seg_{idx:03d}.ts")
+    try:
+        run_ffmpeg(["-i", job["seg_paths"][idx], "-c", "copy", "-bsf:v", "h264_mp4toannexb", "-f", "mpegts", ts_path])
+    except Exception as e:
+        print(f"   ⚠️ [{job['name']}] 미리보기 세그먼트 변환 실패 (Scene {idx}): {e}"); return
+    job["hls_ready"][idx] = duration
+    write_hls_playlist(job)
+
+def write_hls_playlist(job, ended=False):
+    """HLS EVENT 재생목록: 장면 순서상 앞에서부터 연속으로 완료된 세그먼트만 노출 (세그먼트마다 타임스탬프가 0부터라 DISCONTINUITY)"""
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-PLAYLIST-TYPE:EVENT",
+             f"#EXT-X-TARGETDURATION:{job['hls_target']}", "#EXT-X-MEDIA-SEQUENCE:0"]
+    for n, spec in enumerate(job["specs"]):
+        duration = job["hls_ready"].get(spec["idx"])
+        if duration is None: break
+        if n: lines.append("#EXT-X-DISCONTINUITY")
+        lines += [f"#EXTINF:{duration:.3f},", f"seg_{spec['idx']:03d}.ts"]
+    if ended: lines.append("#EXT-X-ENDLIST")
+    path = os.path.join(hls_dir(job), HLS_PLAYLIST)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f: f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+def start_hls_preview(job, rendering):
+    """재생목록 초기화. 이번에 다시 렌더링하지 않는 기존 세그먼트는 바로 노출"""
+    os.makedirs(hls_dir(job), exist_ok=True)
+    durations = {spec["idx"]: probe_duration(spec["audio"]) for spec in job["specs"]}
+    # EVENT 재생목록의 TARGETDURATION은 바뀌면 안 되므로 가장 긴 장면 기준으로 미리 고정
+    job["hls_target"] = int(np.ceil(max(durations.values()))) + 1
+    job["hls_ready"] = {}
+    write_hls_playlist(job)
+    for spec in job["specs"]:
+        if spec["idx"] not in rendering and os.path.exists(job["seg_paths"][spec["idx"]]):
+            publish_hls_segment(job, spec["idx"], durations[spec["idx"]])
+    print(f"   👀 [{job['name']}] 미리보기 재생목록: {os.path.join(hls_dir(job), HLS_PLAYLIST)}")
+
+def render_segments(jobs, workers=None, only=None):
+    """장면별 세그먼트를 하나의 프로세스 풀에서 병렬 인코딩 후 작업(변형)별로 stream copy 병합.
+    only가 주어지면 해당 장면만 다시 렌더링. {작업 이름: 성공 여부} 반환"""
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    tasks = []
+    for job in jobs:
+        os.makedirs(job["segment_dir"], exist_ok=True)
+        job["seg_paths"] = {spec["idx"]: os.path.join(job["segment_dir"], f"seg_{spec['idx']:03d}.mp4") for spec in job["specs"]}
+        # 작업자들이 동시에 변환하지 않도록 Intro/Outro 캐시는 미리 준비
+        for spec in job["specs"]:
+            if spec["asset"]:
+                try: conform_asset(spec["asset"], job["ctx"])
+                except Exception as e: print(f"   ⚠️ 에셋 변환 실패 ({spec['asset']}): {e}")
+        for spec in job["specs"]:
+            if only is None or spec["idx"] in only or not os.path.exists(job["seg_paths"][spec["idx"]]):
+                tasks.append((job, spec))
+
+    total = sum(len(job["specs"]) for job in jobs)
+    for job in jobs:
+        if job["ctx"].get("progressive"):
+            start_hls_preview(job, {spec["idx"] for j, spec in tasks if j is job})
+    print(f"⚡ 세그먼트 병렬 렌더링: {len(tasks)}/{total}개 장면, {len(jobs)}개 변형 (Workers: {workers})")
+
+    failed = []
+    for job in jobs: job["worker_peak_rss"] = None
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render_segment, spec, job["ctx"], job["seg_paths"][spec["idx"]]): (job, spec) for job, spec in tasks}
+        for fut in as_completed(futures):
+            job, spec = futures[fut]
+            result = fut.result()
+            if result["ok"]:
+                print(f"   ✅ [{job['name']}] Scene {result['idx']} 세그먼트 완료")
+                if result.get("peak_rss") is not None: job["worker_peak_rss"] = max(job["worker_peak_rss"] or 0.0, result["peak_rss"])
+                if job["ctx"].get("progressive"): publish_hls_segment(job, result["idx"], result["duration"])
+            else:
+                print(f"   ⚠️ [{job['name']}] Scene {result['idx']} 세그먼트 실패: {result['error']}")
+                failed.append((job, spec))
+
+    results = {job["name"]: True for job in jobs}
+    # 실패한 장면만 단독으로 재시도
+    for job, spec in failed:
+        print(f"   🔁 [{job['name']}] Scene {spec['idx']} 단독 재렌더링...")
+        result = render_segment(spec, job["ctx"], job["seg_paths"][spec["idx"]])
+        if not result["ok"]:
+            print(f"❌ [{job['name']}] Scene {spec['idx']} 렌더링 실패: {result['error']}")
+            print(f"   👉 'python editor.py {job['ctx']['mode']} --parallel --scenes={spec['idx']}' 로 해당 장면만 다시 렌더링할 수 있습니다.")
+            results[job["name"]] = False
+        elif job["ctx"].get("progressive"):
+            publish_hls_segment(job, result["idx"], result["duration"])
+
+    for job in jobs:
+        if not results[job["name"]]: continue
+        ordered = [job["seg_paths"][s["idx"]] for s in job["specs"] if os.path.exists(job["seg_paths"][s["idx"]])]
+        if not ordered:
+            print(f"❌ [{job['name']}] 본문 클립 생성 실패"); results[job["name"]] = False; continue
+        print(f"🎞️ [{job['name']}] 세그먼트 병합 중... ({len(ordered)}개)")
+        concat_segments(ordered, job["output_path"])
+        if job["ctx"].get("progressive"): write_hls_playlist(job, ended=True)
+    return results
+
+# --- 배경음악(BGM) 믹싱 ---
+# 렌더링이 끝난 영상의 내레이션 트랙을 PCM으로 꺼내 BGM과 한 번에(NumPy 벡터 연산) 섞고,
+# 내레이션 구간에서는 BGM을 낮추고(ducking) 전체 라우드니스를 목표 LUFS로 맞춘 뒤 비디오는 -c:v copy로 다시 묶음.
+BGM_PATH = os.path.join("assets", "bgm.mp3")
+BGM_TARGET_LUFS = -14.0   # 최종 믹스 목표 (YouTube 기준)
+BGM_BED_LU = -18.0        # 내레이션 대비 BGM 기본 레벨
+BGM_DUCK_DB = -10.0       # 내레이션이 나오는 동안 추가 감쇠
+BGM_FADE_SEC = 1.5
+DUCK_FRAME_SEC = 0.05     # 음성 구간 검출 단위
+DUCK_ATTACK_SEC = 0.15    # 말 시작 전 미리 낮추는 시간
+DUCK_RELEASE_SEC = 0.4    # 말이 끝난 뒤 유지 시간
+
+def decode_pcm(path, fps=AUDIO_FPS, channels=2):
+    """오디오(또는 영상의 오디오 트랙)를 float32 PCM (samples, channels) 배열로 디코딩"""
+    raw = run_ffmpeg(["-i", path, "-vn", "-f", "f32le", "-acodec", "pcm_f32le", "-ac", str(channels), "-ar", str(fps), "pipe:1"], capture=True)
+    return np.frombuffer(raw, dtype=np.float32).reshape(-1, channels)
+
+def _biquad_response(b, a, freqs, fps):
+    z = np.exp(-1j * 2 * np.pi * freqs / fps)
+    return (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+
+def k_weighting_gain(freqs, fps):
+    """ITU-R BS.1770 K-weighting(하이 셸프 + 하이패스)의 주파수별 전력 이득 |H|^2"""
+    # 1단: 하이 셸프 (+4dB @ ~1.7kHz)
+    A = 10 ** (3.999843853973347 / 40); w0 = 2 * np.pi * 1681.974450955533 / fps
+    alpha = np.sin(w0) / (2 * 0.7071752369554196); cos = np.cos(w0); sq = 2 * np.sqrt(A) * alpha
+    shelf = _biquad_response([A * ((A + 1) + (A - 1) * cos + sq), -2 * A * ((A - 1) + (A + 1) * cos), A * ((A + 1) + (A - 1) * cos - sq)],
+                             [(A + 1) - (A - 1) * cos + sq, 2 * ((A - 1) - (A + 1) * cos), (A + 1) - (A - 1) * cos - sq], freqs, fps)
+    # 2단: 하이패스 (~38Hz)
+    w0 = 2 * np.pi * 38.13547087602444 / fps
+    alpha = np.sin(w0) / (2 * 0.5003270373238773); cos = np.cos(w0)
+    highpass = _biquad_response([(1 + cos) / 2, -(1 + cos), (1 + cos) / 2], [1 + alpha, -2 * cos, 1 - alpha], freqs, fps)
+    return np.abs(shelf * highpass) ** 2
+
+def integrated_loudness(pcm, fps=AUDIO_FPS):
+    """BS.1770 통합 라우드니스(LUFS). 100ms 블록별 K-가중 에너지를 FFT 한 번으로 구하고
+    400ms 게이팅 블록(75% 겹침)은 인접 4블록 합으로 계산"""
+    step = int(fps * 0.1)
+    n = (len(pcm) // step) * step
+    if n < step * 4: return None
+    blocks = pcm[:n].reshape(-1, step, pcm.shape[1])
+    spectrum = np.fft.rfft(blocks, axis=1)
+    weight = k_weighting_gain(np.fft.rfftfreq(step, 1 / fps), fps)
+    # Parseval: 블록 에너지 = 가중 전력 스펙트럼 합 (실수 FFT 양쪽 대칭 보정)
+    power = np.abs(spectrum) ** 2 * weight[None, :, None]
+    power[:, 1:-1 if step % 2 == 0 else None] *= 2
+    # 채널별 제곱합 -> 채널 합(G=1) 후 블록 평균 제곱
+    energy = power.sum(axis=(1, 2)) / step / step
+    gate = np.convolve(energy, np.ones(4) / 4, mode="valid")
+    loudness = -0.691 + 10 * np.log10(np.maximum(gate, 1e-12))
+    gated = gate[loudness > -70]
+    if not len(gated): return None
+    relative = -0.691 + 10 * np.log10(gated.mean()) - 10
+    gated = gated[-0.691 + 10 * np.log10(gated) > relative]
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+def duck_envelope(narration, fps=AUDIO_FPS, duck_db=BGM_DUCK_DB):
+    """내레이션 타임라인에서 음성 구간을 찾아 샘플 단위 BGM 이득 곡선 생성"""
+    frame = int(fps * DUCK_FRAME_SEC)
+    n_frames = max(1, len(narration) // frame)
+    rms = np.sqrt((narration[:n_frames * frame] ** 2).mean(axis=1).reshape(n_frames, frame).mean(axis=1))
+    loud = np.percentile(rms, 90) if rms.any() else 0.0
+    active = rms > max(1e-4, loud * 0.1)   # 상위 레벨 대비 -20dB 이상이면 음성
+    # 말 시작 전(attack)/끝난 뒤(release)까지 확장해 단어 사이에서 BGM이 출렁이지 않게 함
+    attack = int(DUCK_ATTACK_SEC / DUCK_FRAME_SEC); release = int(DUCK_RELEASE_SEC / DUCK_FRAME_SEC)
+    kernel = np.ones(attack + release + 1)
+    spread = np.convolve(active.astype(np.float32), kernel, mode="full")[attack:attack + n_frames] > 0
+    target = np.where(spread, 10 ** (duck_db / 20), 1.0)
+    # 이득 변화를 부드럽게 (attack 길이 이동 평균)
+    smooth = np.ones(attack + 1) / (attack + 1)
+    target = np.convolve(np.pad(target, (attack // 2, attack - attack // 2), mode="edge"), smooth, mode="valid")
+    centers = (np.arange(n_frames) + 0.5) * frame
+    return np.interp(np.arange(len(narration)), centers, target).astype(np.float32)
+
+def mix_background_music(video_path, bgm_path, target_lufs=BGM_TARGET_LUFS, fps=AUDIO_FPS):
+    """완성 영상에 BGM을 깔아 하나의 프리믹스 트랙으로 교체 (비디오 스트림은 재인코딩 없음)"""
+    narration = decode_pcm(video_path, fps)
+    if not len(narration): return False
+    music = decode_pcm(bgm_path, fps)
+    if not len(music): return False
+
+    # 영상 길이에 맞춰 반복 후 시작/끝 페이드
+    music = np.resize(music, narration.shape)
+    fade = min(int(BGM_FADE_SEC * fps), len(music) // 2)
+    if fade:
+        ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)[:, None]
+        music[:fade] *= ramp; music[-fade:] *= ramp[::-1]
+
+    narration_lufs = integrated_loudness(narration, fps)
+    music_lufs = integrated_loudness(music, fps)
+    bed_gain = 1.0
+    if narration_lufs is not None and music_lufs is not None:
+        bed_gain = 10 ** ((narration_lufs + BGM_BED_LU - music_lufs) / 20)
+
+    mix = narration + music * (bed_gain * duck_envelope(narration, fps))[:, None]
+    mix_lufs = integrated_loudness(mix, fps)
+    if mix_lufs is not None: mix *= 10 ** ((target_lufs - mix_lufs) / 20)
+    peak = np.abs(mix).max()
+    if peak > 0.98: mix *= 0.98 / peak   # 클리핑 방지 (목표보다 조금 작아질 수 있음)
+
+    tmp_path = video_path + ".bgm.mp4"
+    run_ffmpeg(["-i", video_path, "-f", "f32le", "-ar", str(fps), "-ac", str(mix.shape[1]), "-i", "pipe:0",
+                "-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", AUDIO_CODEC, "-b:a", "192k", "-shortest"] + FASTSTART_MOVFLAGS + [tmp_path],
+               input=mix.astype(np.float32).tobytes())
+    os.replace(tmp_path, video_path)
+    print(f"   🎵 BGM 믹싱 완료 ({os.path.basename(bgm_path)}, 최종 {target_lufs:.1f} LUFS)")
+    return True
+
+def resolve_bgm(flags):
+    """--bgm=경로 로 지정하거나 assets/bgm.mp3 가 있으면 사용, --no-bgm 이면 끔"""
+    if flags.get("no-bgm"): return None
+    path = flags.get("bgm") if flags.get("bgm") not in (None, True) else BGM_PATH
+    if os.path.exists(path): return path
+    if flags.get("bgm"): print(f"⚠️ BGM 파일 없음: {path}")
+    return None
+
+def build_context(mode, title_text, image_sources, flags, profile_name="final"):
+    is_shorts = "shorts" in mode
+    is_news = "news" in mode
+    profile = OUTPUT_PROFILES[profile_name]
+    design_size = (720, 1280) if is_shorts else (1280, 720)
+    # libx264 yuv420p는 짝수 해상도만 허용
+    final_size = tuple(int(round(v * profile["scale"] / 2)) * 2 for v in design_size)
+    return {
+        "mode": mode,
+        "is_shorts": is_shorts,
+        "is_news": is_news,
+        "profile": profile_name,
+        "scale": profile["scale"],
+        "fps": profile["fps"],
+        "preset": profile["preset"],
+        "crf": profile["crf"],
+        "final_size": final_size,
+        "title": title_text,
+        "show_title": is_shorts and is_news,
+        "image_sources": image_sources,
+        "flatten": not flags.get("no-flatten"),
+        "motion": flags.get("motion") if flags.get("motion") not in (None, True) else ("auto" if flags.get("motion") else None),
+        "progressive": bool(flags.get("progressive")),
+        "captions": flags.get("captions") if flags.get("captions") in CAPTION_STYLES else ("karaoke" if flags.get("captions") is True else "static"),
+    }
+
+def timeline_path(output_dir, base_name):
+    return os.path.join(output_dir, f"timeline_{base_name}.json")
+
+def save_timeline(path, ctx, specs):
+    """draft -> final 승격 시 재사용할 타임라인 저장"""
+    data = {"mode": ctx["mode"], "title": ctx["title"], "image_sources": ctx["image_sources"],
+            "flatten": ctx["flatten"], "motion": ctx["motion"], "captions": ctx["captions"], "specs": specs}
+    with open(path, "w", encoding="utf-8") as f: json.dump(data, f, ensure_ascii=False, indent=2)
+
+def prepare_job(mode, base_name, story_path, image_dir, audio_dir, flags, profile_name, output_dir):
+    """렌더링 작업(장면 명세 + 컨텍스트) 준비. --promote면 저장된 draft 타임라인을 사용"""
+    if flags.get("promote"):
+        # 직전 draft의 타임라인(장면 구성/모션/출처)을 그대로 final 프로필로 렌더링
+        saved_path = timeline_path(output_dir, base_name)
+        if not os.path.exists(saved_path): print(f"❌ 승격할 draft 타임라인 없음: {saved_path}"); return None
+        with open(saved_path, "r", encoding="utf-8") as f: saved = json.load(f)
+        job_flags = dict(flags)
+        if not saved["flatten"]: job_flags["no-flatten"] = True
+        job_flags["motion"] = saved["motion"]
+        job_flags["captions"] = saved.get("captions", "static")
+        ctx = build_context(saved["mode"], saved["title"], saved["image_sources"], job_flags, "final")
+        specs = saved["specs"]
+        print(f"⏫ Draft 타임라인을 Final로 승격합니다. ({base_name}, Scenes: {len(specs)})")
+    else:
+        if not os.path.exists(story_path): print(f"❌ 오류: {story_path} 없음"); return None
+
+        try: scenes, title_text = load_story(story_path)
+        except: print("❌ JSON 로드 실패"); return None
+
+        print(f"✅ 편집할 Scene 개수: {len(scenes)} ({base_name})")
+
+        image_sources = {}
+        sources_path = os.path.join(image_dir, "sources.json")
+        if os.path.exists(sources_path):
+            try:
+                with open(sources_path, "r", encoding="utf-8") as f: image_sources = json.load(f)
+            except: pass
+
+        ctx = build_context(mode, title_text, image_sources, flags, profile_name)
+        specs = plan_scenes(scenes, ctx, image_dir, audio_dir)
+        save_timeline(timeline_path(output_dir, base_name), ctx, specs)
+
+    if ctx["profile"] != "final": base_name = f"{base_name}_{ctx['profile']}"
+    time_tag = datetime.now().strftime("%m%d_%H%M")
+    return {
+        "name": base_name,
+        "specs": specs,
+        "ctx": ctx,
+        "output_path": os.path.join(output_dir, f"{base_name}_{time_tag}.mp4"),
+        "alias_path": os.path.join(output_dir, f"{base_name}.mp4"),
+        "segment_dir": os.path.join(output_dir, "segments", base_name),
+    }
+
+def publish_alias(output_path, alias_path):
+    """'최신' 별칭(results/final_*.mp4)을 임시 파일로 복사한 뒤 원자적 rename으로 게시 (재생 중인 별칭이 반쯤 쓰인 상태로 보이지 않음).
+    하드링크는 쓰지 않음 - 같은 분에 다시 렌더링하면 같은 타임스탬프 경로를 덮어써 이미 게시한 별칭의 내용까지 바뀜"""
+    tmp_path = f"{alias_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path): os.remove(tmp_path)
+    shutil.copy2(output_path, tmp_path)
+    os.replace(tmp_path, alias_path)
+
+def create_video():
+    args, flags = parse_flags(sys.argv[1:])
+    mode = "video"
+    if len(args) > 0: mode = args[0]
+
+    profile_name = flags.get("profile") if flags.get("profile") not in (None, True) else "final"
+    if flags.get("draft"): profile_name = "draft"
+    if profile_name not in OUTPUT_PROFILES:
+        print(f"❌ 알 수 없는 출력 프로필: {profile_name} (사용 가능: {', '.join(OUTPUT_PROFILES)})"); return
+
+    output_dir = "results"; os.makedirs(output_dir, exist_ok=True)
+
+    # 멀티 변형: 모드 x 언어 조합마다 story/이미지/오디오 경로를 달리해 한 번에 렌더링
+    job_variants = variants.parse_variants(flags["variants"]) if flags.get("variants") not in (None, True) else []
+    jobs = []
+    if job_variants:
+        for v in job_variants:
+            job = prepare_job(v["mode"], f"final_{variants.variant_tag(v)}", variants.story_path(v["language"], job_variants),
+                              variants.image_dir(v["mode"], job_variants), variants.audio_dir(v["language"], job_variants),
+                              flags, profile_name, output_dir)
+            if job: jobs.append(job)
+    else:
+        base_name = "final_shorts" if "shorts" in mode else "final_video"
+        job = prepare_job(mode, base_name, "story.json", "images", "audio", flags, profile_name, output_dir)
+        if job: jobs.append(job)
+    if not jobs: return
+
+    for job in jobs:
+        ctx = job["ctx"]
+        print(f"=== 편집(Editor) 시작 (Mode: {ctx['mode']} | Profile: {ctx['profile']} {ctx['final_size'][0]}x{ctx['final_size'][1]}@{ctx['fps']}) ===")
+
+    if flags.get("parallel"):
+        workers = int(flags["workers"]) if flags.get("workers") not in (None, True) else None
+        only = None
+        if flags.get("scenes") not in (None, True):
+            only = {int(x) for x in str(flags["scenes"]).split(",") if x.strip()}
+        for job in jobs: print(f"🚀 렌더링 시작: {job['output_path']}")
+        with RssMonitor() as monitor:
+            results = render_segments(jobs, workers=workers, only=only)
+        # 실제 인코딩은 풀 작업자가 하므로 작업자 최대 RSS도 함께 보고 (보고값이 없으면 종료된 자식 프로세스 기준)
+        worker_peaks = [job["worker_peak_rss"] for job in jobs if job.get("worker_peak_rss") is not None]
+        worker_peak = max(worker_peaks) if worker_peaks else peak_rss_mb(children=True)
+    elif flags.get("streaming") or flags.get("memory-budget"):
+        budget = int(flags["memory-budget"]) if flags.get("memory-budget") not in (None, True) else None
+        with RssMonitor() as monitor:
+            results = {job["name"]: render_streaming(job["specs"], job["ctx"], job["output_path"], budget) for job in jobs}
+        worker_peak = None
+    else:
+        with RssMonitor() as monitor:
+            results = {job["name"]: render_sequential(job["specs"], job["ctx"], job["output_path"]) for job in jobs}
+        worker_peak = None
+
+    # 현재 RSS를 읽을 수 없는 환경이면 프로세스 수명 전체의 최댓값으로 대체
+    peak = monitor.peak if monitor.peak is not None else peak_rss_mb()
+    if peak is not None:
+        workers_note = f", 세그먼트 작업자 {worker_peak:.0f}MB" if worker_peak is not None else ""
+        print(f"📈 최대 메모리 사용량(Peak RSS): {peak:.0f}MB{workers_note}")
+        tracing.event("render.peak_rss", mb=round(peak, 1), worker_mb=round(worker_peak, 1) if worker_peak is not None else None)
+
+    bgm_path = resolve_bgm(flags)
+    for job in jobs:
+        if not results.get(job["name"]): continue
+        if bgm_path:
+            try:
+                with tracing.span("audio.bgm_mix", job=job["name"]):
+                    mix_background_music(job["output_path"], bgm_path)
+            except Exception as e: print(f"   ⚠️ BGM 믹싱 실패 (내레이션만 사용): {e}")
+        publish_alias(job["output_path"], job["alias_path"])
+        print(f"✨ 편집 완료! (저장: {job['output_path']})")
+    if profile_name == "draft":
+        print(f"   👉 확인 후 같은 인자에 '--promote' 를 붙여 최종본을 렌더링하세요.")
 
 if __name__ == "__main__":
-    create_video()
\ No newline at end of file
+    with tracing.span("editor.main", args=" ".join(sys.argv[1:])):
+        create_video()
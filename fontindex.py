@@ -0,0 +1,196 @@
+import os
+import re
+import sys
+import json
+import struct
+
+# 시스템 폰트 인덱스: 폰트 디렉터리를 한 번 스캔해 cmap(문자 매핑)으로 한글/라틴 지원 여부를 기록하고
+# .cache/font_index.json 에 저장. 이후에는 문자열의 스크립트 조합으로 바로 폰트를 찾음.
+
+INDEX_PATH = os.path.join(".cache", "font_index.json")
+INDEX_VERSION = 1
+FONT_EXTS = (".ttf", ".otf", ".ttc")
+
+# 스크립트별 대표 문자 (모두 매핑되어 있어야 지원으로 판단)
+SCRIPT_PROBES = {
+    "hangul": "가각나다한글힣ㄱㅏ",
+    "latin": "AZaz09.,!?",
+}
+SCRIPT_PATTERNS = {
+    "hangul": re.compile("[가-힣ㄱ-ㅎㅏ-ㅣ]"),
+    "latin": re.compile("[A-Za-z0-9]"),
+}
+
+# 같은 조건이면 앞쪽 폰트 우선 (기존 Windows 설정: 맑은 고딕 볼드 / Arial 볼드)
+PREFERRED_FONTS = [
+    "malgunbd", "malgun", "applesdgothicneo", "nanumgothicbold", "nanumbarungothicbold",
+    "notosanscjk-bold", "notosanskr-bold", "notosanscjkkr-bold", "nanumgothic", "notosanscjk-regular",
+    "notosanskr-regular", "gulim", "arialbd", "arial", "helvetica", "dejavusans-bold", "liberationsans-bold",
+    "dejavusans", "liberationsans-regular",
+]
+
+def font_dirs():
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        windir = os.environ.get("WINDIR", "C:/Windows")
+        dirs = [os.path.join(windir, "Fonts")]
+        local = os.environ.get("LOCALAPPDATA")
+        if local: dirs.append(os.path.join(local, "Microsoft", "Windows", "Fonts"))
+    elif sys.platform == "darwin":
+        dirs = ["/System/Library/Fonts", "/System/Library/Fonts/Supplemental", "/Library/Fonts", os.path.join(home, "Library/Fonts")]
+    else:
+        dirs = ["/usr/share/fonts", "/usr/local/share/fonts", os.path.join(home, ".fonts"), os.path.join(home, ".local/share/fonts")]
+    extra = os.environ.get("VF_FONT_DIRS")
+    if extra: dirs = extra.split(os.pathsep) + dirs
+    return [d for d in dirs if os.path.isdir(d)]
+
+def _read_tables(f):
+    """sfnt 테이블 디렉터리 읽기 (TTC는 첫 번째 face 기준)"""
+    head = f.read(12)
+    if len(head) < 12: return {}
+    base = 0
+    if head[:4] == b"ttcf":
+        f.seek(12)
+        base = struct.unpack(">I", f.read(4))[0]
+        f.seek(base)
+        head = f.read(12)
+    num_tables = struct.unpack(">H", head[4:6])[0]
+    records = f.read(16 * num_tables)
+    tables = {}
+    for i in range(num_tables):
+        tag, _, offset, length = struct.unpack(">4sIII", records[i * 16:(i + 1) * 16])
+        tables[tag.decode("latin-1")] = (offset, length)
+    return tables
+
+def _cmap_lookup(data):
+    """cmap 테이블에서 유니코드 서브테이블을 골라 '코드포인트 지원 여부' 함수 반환"""
+    num = struct.unpack(">H", data[2:4])[0]
+    subtables = {}
+    for i in range(num):
+        pid, eid, off = struct.unpack(">HHI", data[4 + i * 8:12 + i * 8])
+        fmt = struct.unpack(">H", data[off:off + 2])[0]
+        subtables.setdefault(fmt, (pid, eid, off))
+
+    if 12 in subtables:
+        off = subtables[12][2]
+        n_groups = struct.unpack(">I", data[off + 12:off + 16])[0]
+        groups = [struct.unpack(">III", data[off + 16 + g * 12:off + 28 + g * 12]) for g in range(n_groups)]
+        return lambda c: any(start <= c <= end for start, end, _ in groups)
+
+    if 4 in subtables:
+        off = subtables[4][2]
+        seg_count = struct.unpack(">H", data[off + 6:off + 8])[0] // 2
+        ends_at = off + 14
+        starts_at = ends_at + seg_count * 2 + 2
+        deltas_at = starts_at + seg_count * 2
+        ranges_at = deltas_at + seg_count * 2
+        ends = struct.unpack(f">{seg_count}H", data[ends_at:ends_at + seg_count * 2])
+        starts = struct.unpack(f">{seg_count}H", data[starts_at:starts_at + seg_count * 2])
+        deltas = struct.unpack(f">{seg_count}h", data[deltas_at:deltas_at + seg_count * 2])
+        ranges = struct.unpack(f">{seg_count}H", data[ranges_at:ranges_at + seg_count * 2])
+
+        def covers(c):
+            for i in range(seg_count):
+                if starts[i] <= c <= ends[i]:
+                    if ranges[i] == 0: return (c + deltas[i]) & 0xFFFF != 0
+                    pos = ranges_at + i * 2 + ranges[i] + 2 * (c - starts[i])
+                    return struct.unpack(">H", data[pos:pos + 2])[0] != 0
+            return False
+        return covers
+    return None
+
+def inspect_font(path):
+    """폰트 파일 하나의 지원 스크립트와 굵기(OS/2 usWeightClass) 조사"""
+    with open(path, "rb") as f:
+        tables = _read_tables(f)
+        if "cmap" not in tables: return None
+        offset, length = tables["cmap"]
+        f.seek(offset)
+        covers = _cmap_lookup(f.read(length))
+        if covers is None: return None
+        weight = 400
+        if "OS/2" in tables:
+            f.seek(tables["OS/2"][0] + 4)
+            weight = struct.unpack(">H", f.read(2))[0]
+    scripts = [name for name, probe in SCRIPT_PROBES.items() if all(covers(ord(ch)) for ch in probe)]
+    return {"path": path, "scripts": scripts, "weight": weight}
+
+def _dir_signature(dirs):
+    """디렉터리별 [경로, 하위 디렉터리 포함 최신 mtime, 파일 수].
+    Linux는 폰트를 하위 폴더(/usr/share/fonts/truetype/nanum)에 설치해 최상위 mtime이 바뀌지 않으므로 전체를 훑음"""
+    signature = []
+    for d in dirs:
+        latest = 0; count = 0
+        for root, _, files in os.walk(d):
+            try: latest = max(latest, int(os.path.getmtime(root)))
+            except OSError: continue
+            count += len(files)
+        signature.append([d, latest, count])
+    return signature
+
+def _rank(entry):
+    name = os.path.splitext(os.path.basename(entry["path"]))[0].lower().replace(" ", "")
+    pref = next((i for i, p in enumerate(PREFERRED_FONTS) if name == p or name.startswith(p)), len(PREFERRED_FONTS))
+    # 자막용이므로 볼드(700)에 가까운 폰트 우선
+    return (pref, abs(entry["weight"] - 700), len(name))
+
+def build_index(dirs=None):
+    dirs = dirs if dirs is not None else font_dirs()
+    fonts = []
+    for d in dirs:
+        for root, _, files in os.walk(d):
+            for name in files:
+                if not name.lower().endswith(FONT_EXTS): continue
+                try:
+                    entry = inspect_font(os.path.join(root, name))
+                    if entry and entry["scripts"]: fonts.append(entry)
+                except Exception: continue
+
+    # 스크립트 조합별 최적 폰트를 미리 계산 (조회는 dict 한 번)
+    best = {}
+    combos = {"hangul+latin": {"hangul", "latin"}, "hangul": {"hangul"}, "latin": {"latin"}}
+    for key, needed in combos.items():
+        candidates = [e for e in fonts if needed <= set(e["scripts"])]
+        if candidates: best[key] = min(candidates, key=_rank)["path"]
+    if "hangul+latin" not in best and "hangul" in best: best["hangul+latin"] = best["hangul"]
+    return {"version": INDEX_VERSION, "platform": sys.platform, "dirs": _dir_signature(dirs), "fonts": fonts, "best": best}
+
+_INDEX = None
+
+def load_index(rebuild=False):
+    """디스크 인덱스를 읽고, 폰트 디렉터리가 바뀌었으면 다시 스캔"""
+    global _INDEX
+    if _INDEX is not None and not rebuild: return _INDEX
+    dirs = font_dirs()
+    if not rebuild and os.path.exists(INDEX_PATH):
+        try:
+            with open(INDEX_PATH, "r", encoding="utf-8") as f: cached = json.load(f)
+            if cached.get("version") == INDEX_VERSION and cached.get("dirs") == _dir_signature(dirs):
+                _INDEX = cached
+                return _INDEX
+        except Exception: pass
+
+    print("🔤 시스템 폰트 인덱스 생성 중...")
+    _INDEX = build_index(dirs)
+    try:
+        os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+        tmp_path = f"{INDEX_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f: json.dump(_INDEX, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, INDEX_PATH)
+    except OSError: pass
+    print(f"   ✅ 폰트 {len(_INDEX['fonts'])}개 인덱싱 완료")
+    return _INDEX
+
+def text_scripts(text):
+    return [name for name, pattern in SCRIPT_PATTERNS.items() if pattern.search(text)]
+
+def resolve_font(text, default=None):
+    """문자열에 포함된 스크립트 조합으로 폰트 경로 조회"""
+    scripts = text_scripts(text)
+    key = "+".join(sorted(scripts)) if scripts else "latin"
+    best = load_index()["best"]
+    return best.get(key) or best.get("hangul+latin" if "hangul" in scripts else "latin") or best.get("latin") or default
+
+if __name__ == "__main__":
+    index = load_index(rebuild=True)
+    for key, path in index["best"].items(): print(f"{key:<14} -> {path}")
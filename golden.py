@@ -0,0 +1,285 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import numpy as np
+from PIL import Image, ImageDraw
+import editor
+
+# 렌더링 엔진 회귀 검사: 고정된 합성(synthetic) 작업을 모든 엔진으로 렌더링하고 저장된 골든 출력과 비교.
+# 샘플 시각마다 프레임 PSNR / 지각 해시(dHash) 거리, 오디오 정렬(상호상관 지연), 전체 길이를 비교해 엔진별 소요 시간과 함께 보고.
+#
+#   python golden.py --update                       # 기준 엔진(moviepy 레이어 합성)으로 골든 출력 생성/갱신
+#   python golden.py                                # 모든 엔진을 골든과 비교 (실패가 있으면 종료 코드 1)
+#   python golden.py --engines=sequential,parallel --jobs=news_shorts --profile=final
+
+GOLDEN_DIR = "golden"
+REFERENCE_ENGINE = "reference"
+# 엔진 이름 -> editor.py 옵션 (reference는 기존 moviepy 레이어 합성 경로)
+ENGINES = {
+    "reference": {"no-flatten": True},
+    "sequential": {},
+    "parallel": {"parallel": True},
+    "streaming": {"streaming": True},
+}
+
+# 합성 작업: 쇼츠 뉴스(타이틀/자막/출처/Intro·Outro freeze)와 일반 영상(Ken Burns 모션)
+JOBS = {
+    "news_shorts": {"mode": "news_shorts", "title": "Golden *Regression* Briefing", "scenes": 4, "intro": True, "flags": {}},
+    "video_motion": {"mode": "video", "title": "Golden Video", "scenes": 3, "intro": False, "flags": {"motion": "auto"}},
+}
+NARRATIONS = [
+    "오늘의 *주요 뉴스*를 전해드립니다.",
+    "The *market* closed higher on strong earnings reports today.",
+    "기상청은 이번 주말 *전국에 비*가 내릴 것으로 예보했습니다.",
+    "Scientists announced a *breakthrough* in battery research.",
+    "지금까지 *골든 테스트* 뉴스였습니다.",
+]
+
+# 합격 기준 (엔진마다 따로 인코딩하므로 손실 압축 오차는 허용)
+MIN_PSNR = 30.0
+MAX_HASH_DISTANCE = 6
+MAX_AUDIO_LAG_MS = 30.0
+MAX_DURATION_DIFF = 0.1
+
+def scene_duration(i):
+    return round(1.6 + 0.4 * i, 2)
+
+def synth_image(path, size, seed):
+    """고정 시드 그라디언트 + 도형 이미지 (프레임 비교가 의미 있도록 구조가 있는 그림)"""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    yy, xx = np.mgrid[0:h, 0:w]
+    base = rng.integers(40, 200, 3)
+    arr = np.stack([(base[c] + 55 * np.sin(xx / (40 + 15 * c) + seed) * np.cos(yy / 60)) for c in range(3)], axis=2)
+    img = Image.fromarray(np.clip(arr, 0, 255).astype(np.uint8))
+    draw = ImageDraw.Draw(img)
+    for _ in range(6):
+        x0, y0 = int(rng.integers(0, w - 200)), int(rng.integers(0, h - 200))
+        color = tuple(int(v) for v in rng.integers(0, 255, 3))
+        draw.rectangle([x0, y0, x0 + int(rng.integers(80, 200)), y0 + int(rng.integers(80, 200))], fill=color)
+    img.save(path)
+
+def synth_audio(path, duration, freq, fps=editor.AUDIO_FPS):
+    """음절처럼 끊기는 사인파 (오디오 정렬을 상호상관으로 잴 수 있도록 장면마다 주파수가 다름)"""
+    t = np.arange(int(duration * fps)) / fps
+    envelope = (np.sin(2 * np.pi * 3.0 * t) > -0.3).astype(np.float32) * np.minimum(1.0, t * 20) * np.minimum(1.0, (duration - t) * 20)
+    tone = (0.3 * np.sin(2 * np.pi * freq * t) * envelope).astype(np.float32)
+    pcm = np.stack([tone, tone], axis=1)
+    editor.run_ffmpeg(["-f", "f32le", "-ar", str(fps), "-ac", "2", "-i", "pipe:0", "-c:a", "libmp3lame", "-b:a", "128k", path],
+                      input=pcm.tobytes())
+
+def synth_asset(path, size, seconds=1.0, fps=24):
+    """Intro/Outro용 짧은 영상 (움직이는 막대 -> 마지막 프레임 freeze 검증)"""
+    w, h = size
+    frames = []
+    for k in range(int(seconds * fps)):
+        frame = np.full((h, w, 3), (20, 30, 60), dtype=np.uint8)
+        x = int((w - 80) * k / max(1, seconds * fps - 1))
+        frame[h // 3:h // 3 * 2, x:x + 80] = (240, 200, 40)
+        frames.append(frame)
+    editor.run_ffmpeg(["-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{w}x{h}", "-r", str(fps), "-i", "pipe:0",
+                       "-c:v", "libx264", "-pix_fmt", "yuv420p", path], input=np.stack(frames).tobytes())
+
+def build_fixture(job_name, job, workdir):
+    """작업 폴더에 story.json / images / audio / assets 생성. 장면 길이 목록 반환
+    (MP3 인코더 패딩이 장면마다 붙으므로 명목 길이가 아니라 실제 오디오 파일 길이)"""
+    is_shorts = "shorts" in job["mode"]
+    image_dir = os.path.join(workdir, job_name, "images"); audio_dir = os.path.join(workdir, job_name, "audio")
+    os.makedirs(image_dir, exist_ok=True); os.makedirs(audio_dir, exist_ok=True)
+    os.makedirs(os.path.join(workdir, "assets"), exist_ok=True)
+    image_size = (1080, 1440) if is_shorts and "news" in job["mode"] else ((1080, 1920) if is_shorts else (1920, 1080))
+    scenes = []; durations = []; sources = {}
+    for i in range(job["scenes"]):
+        idx = i + 1
+        scenes.append({"narration": NARRATIONS[i % len(NARRATIONS)], "image_prompt": f"synthetic {idx}"})
+        synth_image(os.path.join(image_dir, f"image_{idx}.png"), image_size, seed=idx)
+        audio_path = os.path.join(audio_dir, f"audio_{idx}.mp3")
+        synth_audio(audio_path, scene_duration(i), freq=330 + 110 * i)
+        durations.append(round(editor.probe_duration(audio_path), 3))
+        if i % 2 == 0: sources[f"image_{idx}.png"] = f"news{idx}.example.com"
+    with open(os.path.join(image_dir, "sources.json"), "w", encoding="utf-8") as f: json.dump(sources, f)
+    story = [{"title": job["title"], "scenes": scenes}]
+    with open(os.path.join(workdir, job_name, "story.json"), "w", encoding="utf-8") as f: json.dump(story, f, ensure_ascii=False)
+    if job["intro"]:
+        size = (720, 1280) if is_shorts else (1280, 720)
+        for name in ("intro", "outro"):
+            path = os.path.join(workdir, "assets", f"{name}.mp4")
+            if not os.path.exists(path): synth_asset(path, size)
+    return durations
+
+def sample_times(durations, fps):
+    """장면마다 시작 직후 / 중간 / 끝 직전 (Intro freeze 구간 포함)"""
+    times = []; start = 0.0
+    for d in durations:
+        times += [start + 1.5 / fps, start + d / 2, start + d - 1.5 / fps]
+        start += d
+    return [round(t, 3) for t in times]
+
+def render(engine, job_name, job, profile, workdir, out_dir):
+    """엔진 하나로 작업 렌더링. (출력 경로, 소요 시간, ctx)"""
+    flags = dict(job["flags"], **ENGINES[engine])
+    job_dir = os.path.join(workdir, job_name)
+    scenes, title = editor.load_story(os.path.join(job_dir, "story.json"))
+    with open(os.path.join(job_dir, "images", "sources.json"), "r", encoding="utf-8") as f: sources = json.load(f)
+    ctx = editor.build_context(job["mode"], title, sources, flags, profile)
+    specs = editor.plan_scenes(scenes, ctx, os.path.join(job_dir, "images"), os.path.join(job_dir, "audio"))
+    output_path = os.path.join(out_dir, f"{job_name}_{engine}.mp4")
+    t0 = time.time()
+    if flags.get("parallel"):
+        seg_dir = os.path.join(out_dir, "segments", f"{job_name}_{engine}")
+        if os.path.isdir(seg_dir): shutil.rmtree(seg_dir)
+        render_job = {"name": f"{job_name}_{engine}", "specs": specs, "ctx": ctx, "output_path": output_path, "segment_dir": seg_dir}
+        ok = editor.render_segments([render_job])[render_job["name"]]
+    elif flags.get("streaming"):
+        ok = editor.render_streaming(specs, ctx, output_path)
+    else:
+        ok = editor.render_sequential(specs, ctx, output_path)
+    elapsed = time.time() - t0
+    return (output_path if ok else None), elapsed, ctx
+
+def grab_frame(path, t, size):
+    raw = editor.run_ffmpeg(["-ss", f"{t:.3f}", "-i", path, "-frames:v", "1", "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"], capture=True)
+    w, h = size
+    if len(raw) < w * h * 3: return None
+    return np.frombuffer(raw[:w * h * 3], dtype=np.uint8).reshape(h, w, 3)
+
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return float("inf") if mse == 0 else float(10 * np.log10(255.0 ** 2 / mse))
+
+def dhash(frame, size=8):
+    gray = Image.fromarray(frame).convert("L").resize((size + 1, size), Image.LANCZOS)
+    px = np.asarray(gray, dtype=np.int16)
+    return (px[:, 1:] > px[:, :-1]).flatten()
+
+def audio_lag_ms(golden_path, candidate_path, fps=8000):
+    """모노 8kHz로 디코딩해 FFT 상호상관으로 지연 측정 (양수면 후보가 늦음). (지연ms, 길이 초)"""
+    a = editor.decode_pcm(golden_path, fps, channels=1)[:, 0]
+    b = editor.decode_pcm(candidate_path, fps, channels=1)[:, 0]
+    n = min(len(a), len(b))
+    if n == 0: return None, len(b) / fps
+    size = 1 << int(np.ceil(np.log2(2 * n)))
+    corr = np.fft.irfft(np.fft.rfft(b[:n], size) * np.conj(np.fft.rfft(a[:n], size)), size)
+    max_lag = int(0.5 * fps)
+    window = np.concatenate([corr[:max_lag + 1], corr[-max_lag:]])
+    lags = np.concatenate([np.arange(max_lag + 1), np.arange(-max_lag, 0)])
+    return float(lags[int(np.argmax(window))] * 1000.0 / fps), len(b) / fps
+
+def media_duration(path, fps=8000):
+    """디코딩한 오디오 트랙 길이(초) - 후보 길이(audio_lag_ms)와 같은 방식으로 측정"""
+    return len(editor.decode_pcm(path, fps, channels=1)) / fps
+
+def compare(golden_path, meta, candidate_path):
+    size = tuple(meta["size"])
+    frames = []
+    for t in meta["timestamps"]:
+        g = grab_frame(golden_path, t, size); c = grab_frame(candidate_path, t, size)
+        if g is None or c is None:
+            frames.append({"t": t, "psnr": None, "hash_distance": None}); continue
+        frames.append({"t": t, "psnr": round(psnr(g, c), 2), "hash_distance": int(np.count_nonzero(dhash(g) != dhash(c)))})
+    lag, duration = audio_lag_ms(golden_path, candidate_path)
+    valid = [f for f in frames if f["psnr"] is not None]
+    worst = min(valid, key=lambda f: f["psnr"]) if valid else None
+    result = {
+        "frames": frames,
+        "min_psnr": worst["psnr"] if worst else None,
+        "worst_t": worst["t"] if worst else None,
+        "max_hash_distance": max((f["hash_distance"] for f in valid), default=None),
+        "audio_lag_ms": lag,
+        "duration": round(duration, 3),
+        "duration_diff": round(duration - meta["duration"], 3),
+    }
+    failures = []
+    if len(valid) < len(frames): failures.append("missing frames")
+    if worst and worst["psnr"] < MIN_PSNR: failures.append(f"psnr {worst['psnr']}dB @ {worst['t']}s")
+    if result["max_hash_distance"] is not None and result["max_hash_distance"] > MAX_HASH_DISTANCE:
+        failures.append(f"hash distance {result['max_hash_distance']}")
+    if lag is None or abs(lag) > MAX_AUDIO_LAG_MS: failures.append(f"audio lag {lag}ms")
+    if abs(result["duration_diff"]) > MAX_DURATION_DIFF: failures.append(f"duration {result['duration_diff']:+.3f}s")
+    result["failures"] = failures
+    return result
+
+def golden_paths(job_name, profile):
+    base = os.path.join(GOLDEN_DIR, f"{job_name}_{profile}")
+    return base + ".mp4", base + ".json"
+
+def main():
+    _, flags = editor.parse_flags(sys.argv[1:])
+    profile = flags.get("profile") if flags.get("profile") not in (None, True) else "draft"
+    engines = str(flags["engines"]).split(",") if flags.get("engines") not in (None, True) else list(ENGINES)
+    jobs = str(flags["jobs"]).split(",") if flags.get("jobs") not in (None, True) else list(JOBS)
+    update = bool(flags.get("update"))
+    unknown = [e for e in engines if e not in ENGINES] + [j for j in jobs if j not in JOBS]
+    if unknown: print(f"❌ 알 수 없는 엔진/작업: {', '.join(unknown)}"); return 1
+
+    root = os.getcwd()
+    global GOLDEN_DIR
+    GOLDEN_DIR = os.path.abspath(GOLDEN_DIR)
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix="vf_golden_")
+    out_dir = os.path.join(workdir, "out"); os.makedirs(out_dir, exist_ok=True)
+    # editor.py는 assets/, .cache/ 등 상대 경로를 쓰므로 합성 작업 폴더에서 실행
+    os.chdir(workdir)
+    report = {"profile": profile, "created": time.strftime("%Y-%m-%d %H:%M:%S"), "results": []}
+    failed = False
+    try:
+        for job_name in jobs:
+            job = JOBS[job_name]
+            print(f"\n🧪 [{job_name}] 합성 작업 생성...")
+            durations = build_fixture(job_name, job, workdir)
+            golden_mp4, golden_json = golden_paths(job_name, profile)
+
+            if update:
+                path, elapsed, ctx = render(REFERENCE_ENGINE, job_name, job, profile, workdir, out_dir)
+                if not path: print(f"❌ [{job_name}] 기준 렌더링 실패"); failed = True; continue
+                shutil.copy2(path, golden_mp4)
+                meta = {"job": job_name, "profile": profile, "engine": REFERENCE_ENGINE, "size": list(ctx["final_size"]),
+                        "fps": ctx["fps"], "durations": durations, "duration": round(media_duration(golden_mp4), 3),
+                        "timestamps": sample_times(durations, ctx["fps"]), "render_seconds": round(elapsed, 2)}
+                with open(golden_json, "w", encoding="utf-8") as f: json.dump(meta, f, indent=2)
+                print(f"🏅 [{job_name}] 골든 저장: {golden_mp4} ({elapsed:.1f}초)")
+                continue
+
+            if not os.path.exists(golden_mp4):
+                print(f"❌ [{job_name}] 골든 없음 - 먼저 'python golden.py --update --profile={profile}' 실행"); failed = True; continue
+            with open(golden_json, "r", encoding="utf-8") as f: meta = json.load(f)
+
+            for engine in engines:
+                print(f"\n⚙️ [{job_name}] 엔진: {engine}")
+                try:
+                    path, elapsed, _ = render(engine, job_name, job, profile, workdir, out_dir)
+                except Exception as e:
+                    path, elapsed = None, 0.0
+                    print(f"   ❌ 렌더링 예외: {e}")
+                entry = {"job": job_name, "engine": engine, "render_seconds": round(elapsed, 2)}
+                if path:
+                    entry.update(compare(golden_mp4, meta, path))
+                else:
+                    entry["failures"] = ["render failed"]
+                entry["ok"] = not entry["failures"]
+                failed = failed or not entry["ok"]
+                report["results"].append(entry)
+    finally:
+        os.chdir(root)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if update: return 1 if failed else 0
+
+    print("\n" + "=" * 96)
+    print(f"{'job':<14} {'engine':<11} {'time':>7} {'minPSNR':>8} {'hash':>5} {'lag(ms)':>8} {'dur±':>7}  result")
+    print("-" * 96)
+    for r in report["results"]:
+        fmt = lambda v, spec: format(v, spec) if isinstance(v, (int, float)) else "-"
+        print(f"{r['job']:<14} {r['engine']:<11} {r['render_seconds']:>6.1f}s {fmt(r.get('min_psnr'), '>8.2f')} "
+              f"{fmt(r.get('max_hash_distance'), '>5d')} {fmt(r.get('audio_lag_ms'), '>8.1f')} {fmt(r.get('duration_diff'), '>+7.3f')}  "
+              f"{'PASS' if r['ok'] else 'FAIL: ' + '; '.join(r['failures'])}")
+    report_path = os.path.join(GOLDEN_DIR, f"report_{profile}_{time.strftime('%m%d_%H%M%S')}.json")
+    with open(report_path, "w", encoding="utf-8") as f: json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n📄 상세 보고서: {report_path}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
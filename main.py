@@ -2,8 +2,13 @@ import os
 import sys
 import subprocess
 import json
-# [수정] Config 모듈 추가
-from newspaper import Article, Config
+import urllib.request
+import http.client
+import tracing
+import deadline
+
+# 상주 워커(worker.py)가 떠 있으면 작업을 넘기고 진행 상황만 받아서 출력
+WORKER_URL = "http://{}:{}".format(os.environ.get("VF_WORKER_HOST", "127.0.0.1"), os.environ.get("VF_WORKER_PORT", "8765"))
 
 def get_user_input(prompt):
     try:
@@ -18,15 +23,72 @@ def run_step(script_name, args=[]):
     print(f"==================================================\n")
     
     cmd = [sys.executable, script_name] + args
+    # 남은 작업 예산 중 이 단계 몫을 하위 프로세스에 전달 (VF_STAGE_DEADLINE)
+    deadline.enter_stage(os.path.splitext(script_name)[0])
+    with tracing.span(f"stage.{os.path.splitext(script_name)[0]}", args=" ".join(args)) as sp:
+        try:
+            subprocess.run(cmd, check=True, env=tracing.child_env())
+            print(f"\n✅ [Step: {script_name}] 완료!")
+            return True
+        except subprocess.CalledProcessError as e:
+            sp.set(exit_code=e.returncode, failed=True)
+            print(f"\n❌ [Step: {script_name}] 에러 발생! (Exit Code: 1)")
+            return False
+
+def worker_available():
     try:
-        subprocess.run(cmd, check=True)
-        print(f"\n✅ [Step: {script_name}] 완료!")
+        with urllib.request.urlopen(f"{WORKER_URL}/status", timeout=0.5) as res:
+            status = json.loads(res.read())
+        print(f"🏭 상주 워커 연결됨 (대기열: {status['queue_depth']}개)")
         return True
-    except subprocess.CalledProcessError:
-        print(f"\n❌ [Step: {script_name}] 에러 발생! (Exit Code: 1)")
+    except Exception:
         return False
 
+def run_on_worker(topic, mode, language, gender, variant_spec):
+    """워커에 작업 제출 후 진행 이벤트 스트림을 출력. 성공 여부 반환.
+    제출 자체가 실패하면 None (워커가 작업을 받지 않았으므로 로컬 실행으로 대체 가능)"""
+    payload = json.dumps({"topic": topic, "mode": mode, "language": language, "gender": gender,
+                          "variants": variant_spec}).encode("utf-8")
+    req = urllib.request.Request(f"{WORKER_URL}/jobs", data=payload, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as res:
+            job = json.loads(res.read())
+    except (OSError, ValueError, http.client.HTTPException) as e:
+        print(f"⚠️ 워커 작업 제출 실패: {e}")
+        return None
+    print(f"📮 작업 제출: {job['id']} (대기열: {job['queue_depth']}개)")
+    try:
+        return follow_worker_events(job["id"])
+    except (OSError, ValueError, http.client.HTTPException) as e:
+        # 이미 제출된 작업은 워커에서 계속 진행될 수 있으므로 로컬에서 다시 돌리지 않음
+        print(f"\n❌ 워커 연결 끊김: {e}")
+        print(f"   👉 워커가 살아 있다면 {WORKER_URL}/jobs/{job['id']} 에서 상태를 확인하세요.")
+        return False
+
+def follow_worker_events(job_id):
+    ok = False
+    with urllib.request.urlopen(f"{WORKER_URL}/jobs/{job_id}/events") as stream:
+        for raw in stream:
+            event = json.loads(raw)
+            if event["type"] == "log": print(event["line"])
+            elif event["type"] == "stage" and event["status"] == "start":
+                print(f"\n==================================================")
+                print(f"🎬 [Step: {event['stage']}] 시작합니다... (워커)")
+                print(f"==================================================\n")
+            elif event["type"] == "stage":
+                mark = "✅" if event["status"] == "done" else "❌"
+                print(f"\n{mark} [Step: {event['stage']}] {event['status']} ({event['seconds']}초)")
+            elif event["type"] == "end":
+                ok = event["ok"]
+                if event.get("trace"): print(f"   👉 트레이스: {event['trace']}")
+                break
+        else:
+            print("\n❌ 워커 이벤트 스트림이 작업 종료 전에 끊겼습니다.")
+    return ok
+
 def crawl_url_and_save(url):
+    # newspaper는 무거운 모듈이라 URL 모드에서만 로드
+    from newspaper import Article, Config
     print(f"🔗 URL 크롤링 시작: {url}")
     
     # [핵심 수정] 403 에러 방지를 위한 브라우저 위장 설정
@@ -34,35 +96,44 @@ def crawl_url_and_save(url):
     
     config = Config()
     config.browser_user_agent = user_agent
-    config.request_timeout = 15  # 타임아웃 넉넉하게
     
     try:
-        # config 설정 추가하여 Article 객체 생성
-        article = Article(url, config=config)
-        article.download()
-        article.parse()
+        config.request_timeout = deadline.timeout(15)  # 타임아웃 넉넉하게 (작업 예산 안에서)
+        with tracing.span("http.article", url=url):
+            # config 설정 추가하여 Article 객체 생성
+            article = Article(url, config=config)
+            article.download()
+            article.parse()
         
-        # 제목이나 본문이 비어있으면 실패로 간주
-        if not article.text or len(article.text) < 50:
-            raise Exception("본문을 가져오지 못했습니다 (보안 차단 또는 빈 페이지)")
-
-        data = {
-            "title": article.title,
-            "text": article.text,
-            "images": list(article.images),
-            "top_image": article.top_image,
-            "url": url
-        }
+            # 제목이나 본문이 비어있으면 실패로 간주
+            if not article.text or len(article.text) < 50:
+                raise Exception("본문을 가져오지 못했습니다 (보안 차단 또는 빈 페이지)")
+
+            data = {
+                "title": article.title,
+                "text": article.text,
+                "images": list(article.images),
+                "top_image": article.top_image,
+                "url": url
+            }
         
-        with open("article_cache.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+            with open("article_cache.json", "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
             
-        print(f"✅ 기사 추출 완료: {article.title[:30]}...")
-        return True
+            print(f"✅ 기사 추출 완료: {article.title[:30]}...")
+            return True
     except Exception as e:
         print(f"❌ 크롤링 실패: {e}")
         return False
 
+def run_pipeline(topic, mode, language, gender, extra):
+    with tracing.span("job", topic=topic, mode=mode, language=language, gender=gender, variants=" ".join(extra)):
+        if not run_step("writer.py", [topic, mode, language] + extra): return False
+        if not run_step("artist.py", [mode] + extra): return False
+        if not run_step("narrator.py", [language, gender] + extra): return False
+        if not run_step("editor.py", [mode] + extra): return False
+    return True
+
 def main():
     while True:
         print("\n========================================")
@@ -73,18 +144,24 @@ def main():
         print("3. 📰 뉴스 영상 (일반 - 주제 검색)")
         print("4. 📰 뉴스 쇼츠 (Shorts - 주제 검색)")
         print("5. 🔗 뉴스 URL 쇼츠 (기사 링크 변환)")
+        print("6. 🎞️ 멀티 변형 뉴스 (쇼츠+일반 / 다국어 동시 제작)")
         print("q. 종료")
         print("----------------------------------------")
         
-        choice = get_user_input("메뉴를 선택하세요 (1-5/q): ")
+        choice = get_user_input("메뉴를 선택하세요 (1-6/q): ")
         
         if choice.lower() == 'q':
             print("👋 프로그램을 종료합니다.")
             break
 
+        # 작업마다 새 트레이스 (하위 단계 프로세스가 VF_TRACE_ID로 이어받음)
+        tracing.start_trace()
+        deadline.start_job()
+
         topic = ""
         mode = "video"
         language = "ko"
+        variant_spec = ""
         
         if choice == '1':
             mode = "video"
@@ -117,17 +194,28 @@ def main():
                 continue
                 
             topic = "URL_ARTICLE"
+
+        elif choice == '6':
+            topic = get_user_input("검색할 뉴스 키워드 (Enter = Today's Top News): ")
+            if not topic: topic = "Today's Top News"
+            print("\n🎞️ 출력 변형 (모드:언어, 쉼표 구분) - 첫 번째 항목의 언어로 대본을 쓰고 나머지는 번역합니다.")
+            variant_spec = get_user_input("변형 (Enter = news_shorts:ko,news_video:ko,news_shorts:en): ")
+            if not variant_spec: variant_spec = "news_shorts:ko,news_video:ko,news_shorts:en"
+            first = variant_spec.split(",")[0].split(":")
+            mode = first[0].strip()
+            language = first[1].strip() if len(first) > 1 and first[1].strip() else "ko"
             
         else:
             print("⚠️ 잘못된 입력입니다.")
             continue
 
-        # 언어 선택
-        print("\n🌐 언어 선택")
-        print("1. 한국어 (Korean) [기본]")
-        print("2. 영어 (English)")
-        lang_choice = get_user_input("선택 (1/2): ")
-        language = "en" if lang_choice == '2' else "ko"
+        # 언어 선택 (멀티 변형은 변형 목록에 언어가 포함됨)
+        if not variant_spec:
+            print("\n🌐 언어 선택")
+            print("1. 한국어 (Korean) [기본]")
+            print("2. 영어 (English)")
+            lang_choice = get_user_input("선택 (1/2): ")
+            language = "en" if lang_choice == '2' else "ko"
 
         # 성우 성별 선택
         print("\n🎙️ 성우 목소리 선택")
@@ -138,12 +226,18 @@ def main():
 
         print(f"\n🚀 작업 시작! [Mode: {mode} | Topic: {topic[:30]}... | Lang: {language} | Voice: {gender}]")
 
-        if not run_step("writer.py", [topic, mode, language]): continue
-        if not run_step("artist.py", [mode]): continue
-        if not run_step("narrator.py", [language, gender]): continue
-        if not run_step("editor.py", [mode]): continue
-        
-        print("\n✨ 모든 작업이 성공적으로 완료되었습니다!")
+        if worker_available():
+            ok = run_on_worker(topic, mode, language, gender, variant_spec)
+            if ok is not None:
+                if ok: print("\n✨ 모든 작업이 성공적으로 완료되었습니다!")
+                continue
+            print("↩️ 워커 대신 로컬에서 실행합니다.")
+
+        extra = [f"--variants={variant_spec}"] if variant_spec else []
+        ok = run_pipeline(topic, mode, language, gender, extra)
+        print(f"\n⏱️ 단계별 소요 시간:\n{tracing.summarize()}")
+        print(f"   👉 트레이스: {tracing.trace_path()} (Chrome/Perfetto: {tracing.export_chrome()})")
+        if ok: print("\n✨ 모든 작업이 성공적으로 완료되었습니다!")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+import re
 import json
 import sys
 import asyncio
@@ -8,6 +9,9 @@ import edge_tts
 import imageio_ffmpeg
 from dotenv import load_dotenv
 import time
+import variants
+import tracing
+import deadline
 
 load_dotenv()
 GEMINI_KEYS = []
@@ -25,6 +29,9 @@ if len(sys.argv) > 2: gender = sys.argv[2]
 if language not in VOICE_DB: language = "ko"
 selected_edge_voice = VOICE_DB[language][gender]
 
+# 멀티 변형 작업: 변형에 포함된 언어마다 각자의 story/audio 경로로 녹음
+VARIANTS = variants.get_variants_flag(sys.argv)
+
 print(f"🎙️ 성우 설정: 언어={language}, 성별={gender}")
 print(f"   👉 [Main] Edge TTS (Microsoft): {selected_edge_voice}")
 
@@ -41,25 +48,68 @@ def speed_up_audio(input_file, output_file, speed=1.1):
         if sys.platform == 'win32':
              startupinfo = subprocess.STARTUPINFO()
              startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, startupinfo=startupinfo)
+        with tracing.span("ffmpeg.atempo", speed=speed):
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, startupinfo=startupinfo)
         return True
     except Exception as e:
         print(f"      ⚠️ FFmpeg 속도 변환 실패: {e}")
         try: shutil.copy2(input_file, output_file); return True
         except: return False
 
-async def generate_audio_edge(text, output_file):
+def make_communicate(text, voice):
+    # edge-tts 7.x부터는 단어 경계(WordBoundary)를 명시적으로 요청해야 함 (구버전은 기본값)
+    try: return edge_tts.Communicate(text, voice, boundary="WordBoundary")
+    except TypeError: return edge_tts.Communicate(text, voice)
+
+async def generate_audio_edge(text, output_file, voice=None, words=None):
+    """음성 저장. words 리스트가 주어지면 단어 경계 {'text', 'start', 'end'}(초)를 채움"""
+    async def stream():
+        communicate = make_communicate(text, voice or selected_edge_voice)
+        with open(output_file, "wb") as f:
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    f.write(chunk["data"])
+                elif chunk["type"] == "WordBoundary" and words is not None:
+                    # offset/duration 단위는 100ns
+                    start = chunk["offset"] / 1e7
+                    words.append({"text": chunk["text"], "start": start, "end": start + chunk["duration"] / 1e7})
     try:
-        communicate = edge_tts.Communicate(text, selected_edge_voice)
-        await communicate.save(output_file)
+        with tracing.span("api.edge_tts", voice=voice or selected_edge_voice, chars=len(text)) as sp:
+            # 응답이 멈춘 연결이 작업 전체를 붙잡지 않도록 남은 예산 안에서만 대기
+            await asyncio.wait_for(stream(), timeout=deadline.timeout(60))
+            sp.set(bytes=os.path.getsize(output_file), words=len(words or []))
         return True
     except Exception as e:
         print(f"   ❌ Edge TTS 실패: {e}")
         return False
 
+def save_word_timings(words, path, speed=1.0):
+    """자막 동기화용 단어 경계를 속도 변환(atempo) 후 시간으로 저장 (편집기가 audio_N.words.json을 읽음)"""
+    if not words:
+        if os.path.exists(path): os.remove(path)
+        return
+    scaled = [{"text": w["text"], "start": round(w["start"] / speed, 3), "end": round(w["end"] / speed, 3)} for w in words]
+    with open(path, "w", encoding="utf-8") as f: json.dump(scaled, f, ensure_ascii=False)
+
+def clear_stale_audio(audio_dir):
+    """이전 작업의 audio_N.mp3 / audio_N.words.json 삭제.
+    이번 작업에서 녹음하지 못한(실패/예산 초과) 장면에 지난 작업의 내레이션이 붙지 않도록 녹음 전에 비움"""
+    removed = 0
+    for name in os.listdir(audio_dir):
+        if re.fullmatch(r"(audio|temp)_\d+(\.words\.json|\.mp3)", name):
+            os.remove(os.path.join(audio_dir, name))
+            removed += 1
+    if removed: print(f"🧹 이전 오디오 파일 {removed}개 삭제 ({audio_dir})")
+
 def main():
-    story_path = "story.json"
-    audio_dir = "audio"
+    if not VARIANTS:
+        return narrate_story("story.json", "audio", selected_edge_voice)
+    for lang in variants.languages(VARIANTS):
+        voice = VOICE_DB.get(lang, VOICE_DB["ko"])[gender]
+        print(f"\n🌐 [{lang}] 녹음 시작 (Voice: {voice})")
+        narrate_story(variants.story_path(lang, VARIANTS), variants.audio_dir(lang, VARIANTS), voice)
+
+def narrate_story(story_path, audio_dir, voice):
     if not os.path.exists(story_path):
         print(f"오류: '{story_path}' 없음.")
         sys.exit(1)
@@ -87,12 +137,18 @@ def main():
         return
 
     print(f"=== 성우 에이전트 시작 (Edge TTS Mode) ===")
+    clear_stale_audio(audio_dir)
     failed_count = 0
     
     for i, scene in enumerate(scenes):
         idx = i + 1
         text = scene.get("narration")
         if not text: continue
+        if deadline.expired():
+            # 남은 장면은 녹음하지 않음 -> 편집기는 오디오가 없는 장면을 건너뜀
+            print(f"   ⏰ 시간 예산 초과 - Scene {idx} 이후 녹음 생략")
+            failed_count += len(scenes) - i
+            break
         clean_text = text.replace("*", "").replace("\"", "").replace("'", "")
         if not clean_text: continue
              
@@ -102,17 +158,24 @@ def main():
         
         print(f"🎤 [{idx}/{len(scenes)}] 녹음: {clean_text[:20]}...")
         
-        if asyncio.run(generate_audio_edge(clean_text, temp_mp3)):
-            if speed_up_audio(temp_mp3, final_path, speed=1.15):
-                print(f"   ✅ 저장 완료: {file_name}")
-            else: failed_count += 1
-            if os.path.exists(temp_mp3): os.remove(temp_mp3)
-        else:
-             print(f"   ❌ 녹음 실패")
-             failed_count += 1
+        words = []
+        with tracing.span("scene", idx=idx, audio_dir=audio_dir):
+            if asyncio.run(generate_audio_edge(clean_text, temp_mp3, voice, words)):
+                if speed_up_audio(temp_mp3, final_path, speed=1.15):
+                    save_word_timings(words, os.path.join(audio_dir, f"audio_{idx}.words.json"), speed=1.15)
+                    print(f"   ✅ 저장 완료: {file_name}")
+                else:
+                    # 변환 도중 남은 불완전한 파일은 지움 (편집기가 오디오 없는 장면으로 건너뛰게)
+                    if os.path.exists(final_path): os.remove(final_path)
+                    failed_count += 1
+                if os.path.exists(temp_mp3): os.remove(temp_mp3)
+            else:
+                 print(f"   ❌ 녹음 실패")
+                 failed_count += 1
 
     if failed_count > 0: print(f"\n❌ {failed_count}개 실패.")
     else: print("\n=== 모든 녹음 완료 ===")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with tracing.span("narrator.main", language=language, gender=gender):
+        main()
\ No newline at end of file
@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+
+# 구조화 트레이싱: 단계/장면/API 호출/ffmpeg/렌더링 구간을 span으로 기록.
+# 모든 프로세스(main -> writer/artist/narrator/editor -> 렌더링 작업자)가 같은 VF_TRACE_ID를 공유하며
+# traces/<trace_id>.jsonl 에 한 줄씩 추가하고, export_chrome()으로 Chrome trace-event(JSON) 변환.
+# VF_TRACE_ID 또는 VF_TRACE=1 이 없으면 기록하지 않음 (오버헤드 없음).
+
+TRACE_DIR = os.environ.get("VF_TRACE_DIR", "traces")
+
+_local = threading.local()
+_write_lock = threading.Lock()
+_trace_id = None
+
+def trace_id():
+    global _trace_id
+    if _trace_id is None:
+        _trace_id = os.environ.get("VF_TRACE_ID")
+        if not _trace_id and os.environ.get("VF_TRACE") == "1":
+            _trace_id = new_trace_id()
+            os.environ["VF_TRACE_ID"] = _trace_id
+    return _trace_id
+
+def new_trace_id():
+    return time.strftime("%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:6]
+
+def start_trace(tid=None):
+    """새 트레이스 시작 - 하위 프로세스가 환경 변수로 이어받음"""
+    global _trace_id
+    _trace_id = tid or new_trace_id()
+    os.environ["VF_TRACE_ID"] = _trace_id
+    return _trace_id
+
+def enabled():
+    return bool(trace_id())
+
+def trace_path(tid=None):
+    return os.path.join(TRACE_DIR, f"{tid or trace_id()}.jsonl")
+
+def _emit(record):
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _write_lock:
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        with open(trace_path(), "a", encoding="utf-8") as f: f.write(line)
+
+def _stack():
+    if not hasattr(_local, "stack"): _local.stack = []
+    return _local.stack
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = dict(attrs)
+        self.id = uuid.uuid4().hex[:12]
+        stack = _stack()
+        self.parent = stack[-1].id if stack else os.environ.get("VF_PARENT_SPAN")
+        self.start = time.time()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+class _NoopSpan:
+    def set(self, **attrs): return self
+
+_NOOP = _NoopSpan()
+
+@contextmanager
+def span(name, **attrs):
+    """with tracing.span("http.download", url=url) as sp: ... sp.set(status=200, bytes=n)"""
+    if not enabled():
+        yield _NOOP
+        return
+    sp = Span(name, attrs)
+    _stack().append(sp)
+    status = "ok"
+    try:
+        yield sp
+    except BaseException as e:
+        status = "error"
+        sp.attrs.setdefault("error", f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _stack().pop()
+        end = time.time()
+        _emit({"type": "span", "name": name, "id": sp.id, "parent": sp.parent, "start": sp.start,
+               "dur": end - sp.start, "status": status, "pid": os.getpid(),
+               "tid": threading.get_ident(), "proc": os.path.basename(sys.argv[0]) if sys.argv else "", "attrs": sp.attrs})
+
+def event(name, **attrs):
+    """순간 이벤트 (429 재시도, 키 교체, 대체 이미지 사용 등)"""
+    if not enabled(): return
+    stack = _stack()
+    _emit({"type": "event", "name": name, "parent": stack[-1].id if stack else None, "start": time.time(),
+           "pid": os.getpid(), "tid": threading.get_ident(), "attrs": attrs})
+
+def traced(name):
+    """함수 전체를 span으로 감싸는 데코레이터"""
+    def wrap(fn):
+        def inner(*args, **kwargs):
+            with span(name): return fn(*args, **kwargs)
+        inner.__name__ = fn.__name__; inner.__doc__ = fn.__doc__
+        return inner
+    return wrap
+
+def child_env(env=None):
+    """하위 프로세스용 환경 변수 (현재 span을 부모로 연결)"""
+    env = dict(os.environ if env is None else env)
+    if enabled():
+        env["VF_TRACE_ID"] = trace_id()
+        stack = _stack()
+        if stack: env["VF_PARENT_SPAN"] = stack[-1].id
+    return env
+
+def load(tid=None):
+    path = trace_path(tid)
+    records = []
+    if not os.path.exists(path): return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try: records.append(json.loads(line))
+            except ValueError: continue
+    return records
+
+def export_chrome(tid=None, out_path=None):
+    """JSON-lines 트레이스를 Chrome trace-event 형식으로 변환 (chrome://tracing, Perfetto에서 열기)"""
+    tid = tid or trace_id()
+    records = load(tid)
+    if not records: return None
+    t0 = min(r["start"] for r in records)
+    events = []
+    for r in records:
+        ev = {"name": r["name"], "cat": r["name"].split(".")[0], "pid": r["pid"], "tid": r["tid"],
+              "ts": int((r["start"] - t0) * 1e6), "args": r.get("attrs", {})}
+        if r["type"] == "span":
+            ev.update(ph="X", dur=int(r["dur"] * 1e6))
+            ev["args"] = dict(ev["args"], status=r.get("status"))
+        else:
+            ev.update(ph="i", s="t")
+        events.append(ev)
+    procs = {}
+    for r in records:
+        if r.get("proc"): procs[r["pid"]] = r["proc"]
+    for pid, proc in procs.items():
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": proc}})
+    out_path = out_path or os.path.join(TRACE_DIR, f"{tid}.trace.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+    return out_path
+
+def summarize(tid=None, top=15):
+    """가장 오래 걸린 span 이름별 합계 출력"""
+    totals = {}
+    counts = {}
+    for r in load(tid):
+        if r["type"] == "span":
+            totals[r["name"]] = totals.get(r["name"], 0.0) + r["dur"]
+            counts[r["name"]] = counts.get(r["name"], 0) + 1
+        else:
+            counts[r["name"]] = counts.get(r["name"], 0) + 1
+    lines = []
+    for name, total in sorted(totals.items(), key=lambda kv: -kv[1])[:top]:
+        lines.append(f"{name:<28} {total:8.2f}s  x{counts[name]}")
+    for name, n in sorted(counts.items()):
+        if name not in totals: lines.append(f"{name:<28} {'event':>9}  x{n}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    # python tracing.py <trace_id> : Chrome 트레이스 변환 + 요약 출력
+    tid = sys.argv[1] if len(sys.argv) > 1 else None
+    if not tid:
+        files = sorted(f for f in os.listdir(TRACE_DIR) if f.endswith(".jsonl")) if os.path.isdir(TRACE_DIR) else []
+        if not files: print("트레이스 없음"); sys.exit(1)
+        tid = files[-1][:-len(".jsonl")]
+    print(summarize(tid))
+    print(f"Chrome trace: {export_chrome(tid)}")
@@ -0,0 +1,60 @@
+import os
+
+# 하나의 작업에서 여러 출력 변형(모드 x 언어)을 만들 때 쓰는 공통 규칙.
+# 형식: "news_shorts:ko,news_video:en" - 첫 번째 변형이 기본(primary) 변형.
+# 기본 변형은 기존 경로(story.json / images / audio)를 그대로 쓰고, 나머지는 하위 경로를 사용.
+
+def parse_variants(spec, default_language="ko"):
+    variants = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item: continue
+        mode, _, language = item.partition(":")
+        variant = {"mode": mode.strip(), "language": (language.strip() or default_language)}
+        if variant not in variants: variants.append(variant)
+    return variants
+
+def get_variants_flag(argv):
+    """sys.argv에서 --variants=... 값을 찾아 파싱 (없으면 빈 목록)"""
+    for arg in argv:
+        if arg.startswith("--variants="): return parse_variants(arg.split("=", 1)[1])
+    return []
+
+def target_ratio(mode):
+    is_shorts = "shorts" in mode
+    if is_shorts and "news" in mode: return 4/3
+    return (9/16) if is_shorts else (16/9)
+
+def ratio_tag(ratio):
+    for w, h in [(9, 16), (16, 9), (4, 3), (3, 4), (1, 1)]:
+        if abs(ratio - w / h) < 1e-6: return f"{w}x{h}"
+    return f"{ratio:.3f}"
+
+def languages(variants):
+    out = []
+    for v in variants:
+        if v["language"] not in out: out.append(v["language"])
+    return out
+
+def ratios(variants):
+    out = []
+    for v in variants:
+        r = target_ratio(v["mode"])
+        if r not in out: out.append(r)
+    return out
+
+def story_path(language, variants):
+    if not variants or language == variants[0]["language"]: return "story.json"
+    return f"story_{language}.json"
+
+def image_dir(mode, variants):
+    ratio = target_ratio(mode)
+    if not variants or ratio == target_ratio(variants[0]["mode"]): return "images"
+    return os.path.join("images", ratio_tag(ratio))
+
+def audio_dir(language, variants):
+    if not variants or language == variants[0]["language"]: return "audio"
+    return os.path.join("audio", language)
+
+def variant_tag(variant):
+    return f"{variant['mode']}_{variant['language']}"
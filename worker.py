@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import uuid
+import runpy
+import importlib
+import threading
+import traceback
+import contextlib
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import tracing
+import deadline
+
+# 상주 워커: 무거운 라이브러리(moviepy, genai, edge_tts, newspaper)와 폰트/에셋 캐시를 한 번만 올려두고
+# 로컬 HTTP API로 작업을 받아 순서대로 처리. main.py는 워커가 떠 있으면 작업만 넘기는 얇은 클라이언트가 됨.
+#
+#   python worker.py                   # 127.0.0.1:8765 에서 대기
+#   POST /jobs                         {"topic", "mode", "language", "gender", "variants", "budget"(초)} -> {"id", "queue_depth"}
+#   GET  /jobs/<id>                    작업 상태 (끝난 작업은 최근 VF_WORKER_KEEP_JOBS개, VF_WORKER_JOB_TTL초까지만 보관)
+#   GET  /jobs/<id>/events?since=N     진행 이벤트 NDJSON 스트림 (작업이 끝나면 종료)
+#   GET  /status                       대기열 길이, 실행 중 작업, 가동 시간
+
+HOST = os.environ.get("VF_WORKER_HOST", "127.0.0.1")
+PORT = int(os.environ.get("VF_WORKER_PORT", "8765"))
+
+# 끝난 작업(상태 + 로그 이벤트)은 최근 MAX_FINISHED_JOBS개, FINISHED_JOB_TTL초 동안만 보관
+MAX_FINISHED_JOBS = int(os.environ.get("VF_WORKER_KEEP_JOBS", "50"))
+FINISHED_JOB_TTL = float(os.environ.get("VF_WORKER_JOB_TTL", "3600"))
+
+WARM_MODULES = ["numpy", "PIL.Image", "requests", "imageio_ffmpeg", "moviepy.editor",
+                "google.generativeai", "edge_tts", "newspaper", "dotenv"]
+
+STAGES = [
+    ("writer", lambda job: [job["topic"], job["mode"], job["language"]]),
+    ("artist", lambda job: [job["mode"]]),
+    ("narrator", lambda job: [job["language"], job["gender"]]),
+    ("editor", lambda job: [job["mode"]] + job.get("editor_flags", [])),
+]
+
+class Job:
+    def __init__(self, payload):
+        self.id = uuid.uuid4().hex[:10]
+        self.payload = {
+            "topic": payload.get("topic") or "Today's Top News",
+            "mode": payload.get("mode") or "news_shorts",
+            "language": payload.get("language") or "ko",
+            "gender": payload.get("gender") or "f",
+            "variants": payload.get("variants") or "",
+            "editor_flags": list(payload.get("editor_flags") or []),
+            "budget": float(payload["budget"]) if payload.get("budget") else None,
+        }
+        self.status = "queued"
+        self.created = time.time()
+        self.finished = None
+        self.events = []
+        self.cond = threading.Condition()
+
+    def emit(self, **event):
+        event.setdefault("ts", round(time.time(), 3))
+        with self.cond:
+            event["seq"] = len(self.events)
+            self.events.append(event)
+            self.cond.notify_all()
+
+    def info(self):
+        return {"id": self.id, "status": self.status, "created": self.created, "events": len(self.events), **self.payload}
+
+class _EventStream:
+    """print 출력을 줄 단위로 작업 이벤트로 전달 (콘솔에도 그대로 출력)"""
+    def __init__(self, job, console):
+        self.job = job; self.console = console; self.buf = ""
+
+    def write(self, text):
+        self.console.write(text)
+        self.buf += text
+        while "\n" in self.buf:
+            line, self.buf = self.buf.split("\n", 1)
+            if line.strip(): self.job.emit(type="log", line=line)
+        return len(text)
+
+    def flush(self):
+        self.console.flush()
+
+class Worker:
+    def __init__(self):
+        self.jobs = {}
+        self.queue = deque()
+        self.queue_cond = threading.Condition()
+        self.running = None
+        self.started = time.time()
+        self.modules = {}
+
+    def warm_up(self):
+        t0 = time.time()
+        for name in WARM_MODULES:
+            try: importlib.import_module(name)
+            except Exception as e: print(f"   ⚠️ 모듈 로드 실패 ({name}): {e}")
+        # 상태(캐시)를 유지할 단계 모듈: editor(폰트/캡션/에셋 캐시), artist
+        for name in ("editor", "artist"):
+            try: self.modules[name] = importlib.import_module(name)
+            except BaseException as e: print(f"   ⚠️ {name} 모듈 로드 실패: {e}")
+        try:
+            import fontindex
+            fontindex.load_index()
+        except Exception: pass
+        print(f"🔥 워커 예열 완료 ({time.time() - t0:.1f}초)")
+
+    def submit(self, payload):
+        job = Job(payload)
+        self.jobs[job.id] = job
+        with self.queue_cond:
+            self.queue.append(job)
+            self.queue_cond.notify()
+        job.emit(type="queued", queue_depth=len(self.queue))
+        return job
+
+    def queue_depth(self):
+        return len(self.queue)
+
+    def run_stage(self, name, args):
+        """단계 실행: 캐시를 유지하는 모듈은 함수 호출, 나머지는 이미 로드된 라이브러리 위에서 스크립트 재실행"""
+        saved_argv = sys.argv
+        sys.argv = [f"{name}.py"] + args
+        try:
+            if name == "editor" and "editor" in self.modules: self.modules["editor"].create_video()
+            elif name == "artist" and "artist" in self.modules: self.modules["artist"].main()
+            else: runpy.run_path(f"{name}.py", run_name="__main__")
+            return True
+        except SystemExit as e:
+            return e.code in (None, 0)
+        except Exception:
+            traceback.print_exc(file=sys.stdout)
+            return False
+        finally:
+            sys.argv = saved_argv
+
+    def run_job(self, job):
+        self.running = job
+        job.status = "running"
+        tracing.start_trace(f"worker_{job.id}")
+        deadline.start_job(job.payload.get("budget"))
+        extra = [f"--variants={job.payload['variants']}"] if job.payload["variants"] else []
+        ok = True
+        console = sys.stdout
+        with contextlib.redirect_stdout(_EventStream(job, console)):
+            with tracing.span("job", worker=True, **{k: v for k, v in job.payload.items() if isinstance(v, str)}):
+                for name, make_args in STAGES:
+                    job.emit(type="stage", stage=name, status="start")
+                    t0 = time.time()
+                    deadline.enter_stage(name)
+                    with tracing.span(f"stage.{name}"):
+                        stage_ok = self.run_stage(name, make_args(job.payload) + extra)
+                    job.emit(type="stage", stage=name, status="done" if stage_ok else "failed", seconds=round(time.time() - t0, 2))
+                    if not stage_ok:
+                        ok = False
+                        break
+        job.status = "done" if ok else "failed"
+        job.emit(type="end", ok=ok, trace=tracing.export_chrome())
+        self.running = None
+
+    def after_job(self, job):
+        """작업 사이 정리: 작업마다 늘어나는 메모리 캐시(캡션 래스터/단어 폭)와 오래된 작업 기록 삭제.
+        폰트/에셋 캐시는 작업 간 재사용하므로 유지"""
+        job.finished = time.time()
+        if "editor" in self.modules:
+            freed = self.modules["editor"].clear_render_caches()
+            tracing.event("worker.cache_clear", raster_mb=round(freed / 2**20, 1))
+        finished = sorted((j for j in list(self.jobs.values()) if j.finished), key=lambda j: j.finished)
+        expired = [j for j in finished if time.time() - j.finished > FINISHED_JOB_TTL]
+        expired += [j for j in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)] if j not in expired]
+        for j in expired: self.jobs.pop(j.id, None)
+
+    def loop(self):
+        while True:
+            with self.queue_cond:
+                while not self.queue: self.queue_cond.wait()
+                job = self.queue.popleft()
+            try: self.run_job(job)
+            except Exception as e:
+                job.status = "failed"
+                job.emit(type="end", ok=False, error=str(e))
+                self.running = None
+            self.after_job(job)
+
+def validate_payload(payload):
+    """작업 요청 검사: 문제가 있으면 오류 메시지, 없으면 None"""
+    if not isinstance(payload, dict): return "payload must be a JSON object"
+    for key in ("topic", "mode", "language", "gender", "variants"):
+        if payload.get(key) is not None and not isinstance(payload[key], str): return f"{key} must be a string"
+    if payload.get("editor_flags") is not None and not isinstance(payload["editor_flags"], list):
+        return "editor_flags must be a list"
+    if payload.get("budget"):
+        try: budget = float(payload["budget"])
+        except (TypeError, ValueError): return "budget must be a number (seconds)"
+        if not budget > 0: return "budget must be positive"
+    return None
+
+WORKER = None
+
+class Handler(BaseHTTPRequestHandler):
+    def _json(self, code, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        parts = [p for p in path.split("/") if p]
+        if parts == ["status"]:
+            running = WORKER.running.id if WORKER.running else None
+            return self._json(200, {"queue_depth": WORKER.queue_depth(), "running": running,
+                                    "uptime": round(time.time() - WORKER.started, 1), "jobs": len(WORKER.jobs)})
+        if len(parts) >= 2 and parts[0] == "jobs":
+            job = WORKER.jobs.get(parts[1])
+            if not job: return self._json(404, {"error": "job not found"})
+            if len(parts) == 2: return self._json(200, job.info())
+            if parts[2] == "events": return self._stream(job, query)
+        return self._json(404, {"error": "not found"})
+
+    def _stream(self, job, query):
+        since = 0
+        for kv in query.split("&"):
+            if kv.startswith("since="): since = int(kv.split("=", 1)[1] or 0)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.end_headers()
+        while True:
+            with job.cond:
+                while since >= len(job.events): job.cond.wait(timeout=15)
+                pending = job.events[since:]
+            for event in pending:
+                self.wfile.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+                since += 1
+            self.wfile.flush()
+            if pending and pending[-1]["type"] == "end": return
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs": return self._json(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length") or 0)
+        try: payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError: return self._json(400, {"error": "invalid json"})
+        error = validate_payload(payload)
+        if error: return self._json(400, {"error": error})
+        job = WORKER.submit(payload)
+        return self._json(202, {"id": job.id, "queue_depth": WORKER.queue_depth()})
+
+def serve():
+    global WORKER
+    WORKER = Worker()
+    WORKER.warm_up()
+    threading.Thread(target=WORKER.loop, daemon=True).start()
+    server = ThreadingHTTPServer((HOST, PORT), Handler)
+    server.daemon_threads = True
+    print(f"🏭 VideoFactory 워커 대기 중: http://{HOST}:{PORT}")
+    try: server.serve_forever()
+    except KeyboardInterrupt: print("👋 워커 종료")
+
+if __name__ == "__main__":
+    serve()
@@ -6,7 +6,12 @@ import google.generativeai as genai
 import sys
 from datetime import date, datetime
 import re
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import variants
+import tracing
+import deadline
+import check_models
 
 # 1. 설정 및 변수
 load_dotenv()
@@ -26,15 +31,22 @@ if not GEMINI_KEYS:
 current_key_index = 0
 print(f"🔑 [Writer] 로드된 Gemini API 키 개수: {len(GEMINI_KEYS)}개")
 
-# 인자 받기
-if len(sys.argv) > 1: topic = sys.argv[1]
+# 인자 받기 (--옵션은 위치 인자에서 제외)
+ARGS = [a for a in sys.argv[1:] if not a.startswith("--")]
+if len(ARGS) > 0: topic = ARGS[0]
 else: topic = "News"
 
 mode = "video"
-if len(sys.argv) > 2: mode = sys.argv[2]
+if len(ARGS) > 1: mode = ARGS[1]
 
 language = "ko"
-if len(sys.argv) > 3: language = sys.argv[3]
+if len(ARGS) > 2: language = ARGS[2]
+
+# 멀티 변형 작업 (--variants=news_shorts:ko,news_video:en): 첫 변형의 언어로 작성 후 나머지 언어는 번역
+VARIANTS = variants.get_variants_flag(sys.argv)
+if VARIANTS:
+    mode = VARIANTS[0]["mode"]
+    language = VARIANTS[0]["language"]
 
 def search_news_serper(query):
     url = "https://google.serper.dev/news"
@@ -42,8 +54,12 @@ def search_news_serper(query):
     if not serper_key: return ""
     payload = json.dumps({"q": query, "gl": "us", "hl": "en", "num": 20})
     headers = {'X-API-KEY': serper_key, 'Content-Type': 'application/json'}
+    def post(attempt):
+        return requests.request("POST", url, headers=headers, data=payload, timeout=deadline.timeout(10))
     try:
-        response = requests.request("POST", url, headers=headers, data=payload)
+        with tracing.span("http.serper_news", query=query[:80]) as sp:
+            response = deadline.hedged("serper", post)
+            sp.set(http_status=response.status_code, bytes=len(response.content))
         data = response.json()
         news_list = []
         if "news" in data:
@@ -52,15 +68,35 @@ def search_news_serper(query):
         return "\n".join(news_list)
     except: return ""
 
+def language_instruction(language):
+    if language == "en": return "Write narration in English."
+    return "대본(narration)은 반드시 **한국어**로 작성."
+
+def news_query(topic, today_str):
+    if topic == "Today's Top News":
+        return f"Top essential breaking news headlines U.S. and World {today_str} summary"
+    return f"{topic} news updates {today_str}"
+
+def news_format(mode):
+    """(형식 설명, 장면 수 지시)"""
+    if "shorts" in mode: return "**Shorts** script (45-60s)", "Structure into **6-10 short, snappy scenes**."
+    return "**Video** script (approx 3-4 mins)", "Structure into 15-25 scenes."
+
+def article_context(path="article_cache.json"):
+    """크롤링한 기사(article_cache.json 형식)를 프롬프트 입력으로 변환"""
+    with open(path, "r", encoding="utf-8") as f:
+        article_data = json.load(f)
+    article_text = article_data.get('text', '')
+    # 너무 긴 기사는 자르기 (토큰 절약)
+    if len(article_text) > 15000: article_text = article_text[:15000] + "..."
+    return f"Title: {article_data.get('title','')}\nContent:\n{article_text}"
+
 def generate_story():
     global current_key_index
     today_str = date.today().strftime("%Y-%m-%d")
 
     # 언어 설정
-    if language == "en":
-        lang_instruction = "Write narration in English."
-    else:
-        lang_instruction = "대본(narration)은 반드시 **한국어**로 작성."
+    lang_instruction = language_instruction(language)
 
     # 프롬프트 작성
     if "news" in mode:
@@ -72,34 +108,17 @@ def generate_story():
             if not os.path.exists("article_cache.json"):
                 print("❌ article_cache.json 파일이 없습니다.")
                 return
-            with open("article_cache.json", "r", encoding="utf-8") as f:
-                article_data = json.load(f)
-            article_text = article_data.get('text', '')
-            # 너무 긴 기사는 자르기 (토큰 절약)
-            if len(article_text) > 15000: article_text = article_text[:15000] + "..."
-            news_context = f"Title: {article_data.get('title','')}\nContent:\n{article_text}"
+            news_context = article_context("article_cache.json")
             source_type = "Single Article"
             
         else:
             print(f"📰 최신 뉴스 검색 중... (Serper: {topic})")
-            if topic == "Today's Top News":
-                news_query = f"Top essential breaking news headlines U.S. and World {today_str} summary"
-            else:
-                news_query = f"{topic} news updates {today_str}"
-            
-            news_context_raw = search_news_serper(news_query)
+            news_context_raw = search_news_serper(news_query(topic, today_str))
             if not news_context_raw: news_context_raw = "No specific news found. Create a general news summary."
             news_context = f"[Serper Search Results]\n{news_context_raw}"
             source_type = "News Search Results"
 
-        is_shorts = "shorts" in mode
-        
-        if is_shorts:
-            format_type = "**Shorts** script (45-60s)"
-            length_cons = "Structure into **6-10 short, snappy scenes**."
-        else:
-            format_type = "**Video** script (approx 3-4 mins)"
-            length_cons = "Structure into 15-25 scenes."
+        format_type, length_cons = news_format(mode)
 
         prompt = f"""
         Role: Professional News Editor.
@@ -139,88 +158,278 @@ def generate_story():
         Task: Create a video script.
         Language: {lang_instruction}
         Length: {duration_instruction}
-        Output: JSON with 'scenes' list.
+        Output: JSON with 'scenes' list. Each scene: {{ "narration": "...", "image_prompt": "Visual description..." }}
         """
 
-    # [핵심 수정] 안전 필터 해제 설정 (정치/사회 이슈 허용)
-    safety_settings = [
-        {
-            "category": "HARM_CATEGORY_HARASSMENT",
-            "threshold": "BLOCK_NONE"
-        },
-        {
-            "category": "HARM_CATEGORY_HATE_SPEECH",
-            "threshold": "BLOCK_NONE"
-        },
-        {
-            "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-            "threshold": "BLOCK_NONE"
-        },
-        {
-            "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-            "threshold": "BLOCK_NONE"
-        },
-    ]
-
-    # 모델 실행 (2.0 Flash)
-    MODEL_NAME = "gemini-2.0-flash"
     print(f"🤖 Gemini 모델 호출 중... (Model: {MODEL_NAME})")
-    
+
+    final_data = generate_story_data(prompt, lang_instruction)
+    if final_data is None:
+        print("❌ 모든 시도 실패. story.json 생성 불가.")
+        sys.exit(1)
+
+    scenes = final_data[0]["scenes"]
+    with open("story.json", "w", encoding="utf-8") as f:
+        json.dump(final_data, f, ensure_ascii=False, indent=2)
+    print(f"✅ story.json 저장 완료 (Scenes: {len(scenes)})")
+
+    # 메타데이터 저장 (뉴스인 경우)
+    if "news" in mode:
+        save_metadata(final_data[0])
+
+    # 멀티 변형: 같은 장면 구조를 다른 언어로 번역
+    for extra_language in variants.languages(VARIANTS)[1:]:
+        translate_story(final_data, extra_language)
+
+# [핵심 수정] 안전 필터 해제 설정 (정치/사회 이슈 허용) - check_models.py 측정과 같은 설정을 사용
+SAFETY_SETTINGS = check_models.SAFETY_SETTINGS
+
+# 모델 실행: check_models.py 측정 결과가 있으면 가장 빠른 정상 텍스트 모델, 없으면 2.0 Flash
+MODEL_NAME = check_models.pick_model("text", "gemini-2.0-flash")
+
+def call_gemini(prompt):
+    """Gemini JSON 모드 호출 -> 응답 텍스트. 쿼터 초과 시 키를 교체하고 오류 시 재시도. 모두 실패하면 None"""
+    global current_key_index
     attempts = 0
     max_attempts = len(GEMINI_KEYS) * 2
-    
+
     while attempts < max_attempts:
+        if deadline.expired():
+            print("⏰ 작업 시간 예산 초과 - 생성 중단")
+            break
         current_key = GEMINI_KEYS[current_key_index]
         try:
-            genai.configure(api_key=current_key)
-            model = genai.GenerativeModel(
-                model_name=MODEL_NAME, 
-                generation_config={"response_mime_type": "application/json"},
-                safety_settings=safety_settings # <--- [중요] 안전 설정 적용
-            )
-            
-            response = model.generate_content(prompt)
-            
-            # 응답 검증
-            text = response.text
-            parsed = json.loads(text)
-            final_data = parsed if isinstance(parsed, list) else [parsed]
-            scenes = final_data[0].get("scenes", [])
-            
-            if not scenes:
-                print(f"⚠️ [Key #{current_key_index+1}] 생성된 장면이 0개입니다. (재시도 중...)")
-                raise Exception("Generated 0 scenes.")
+            with tracing.span("api.gemini_generate", model=MODEL_NAME, key_index=current_key_index, attempt=attempts) as sp:
+                genai.configure(api_key=current_key)
+                model = genai.GenerativeModel(
+                    model_name=MODEL_NAME, 
+                    generation_config={"response_mime_type": "application/json"},
+                    safety_settings=SAFETY_SETTINGS # <--- [중요] 안전 설정 적용
+                )
                 
-            with open("story.json", "w", encoding="utf-8") as f:
-                json.dump(final_data, f, ensure_ascii=False, indent=2)
-            print(f"✅ story.json 저장 완료 (Scenes: {len(scenes)})")
-            
-            # 메타데이터 저장 (뉴스인 경우)
-            if "news" in mode:
-                save_metadata(final_data[0])
-            return
+                # 대본 생성은 요청 하나가 비싸므로 헤지하지 않고 남은 예산 안에서만 대기
+                response = model.generate_content(prompt, request_options={"timeout": deadline.timeout(120)})
+                sp.set(chars=len(response.text))
+                return response.text
 
+        except deadline.DeadlineExceeded:
+            print("⏰ 작업 시간 예산 초과 - 생성 중단")
+            break
         except Exception as e:
             error_msg = str(e)
             if "429" in error_msg or "RESOURCE" in error_msg:
                 print(f"⚠️ [Key #{current_key_index+1}] 쿼터 초과. 교체 중...")
+                tracing.event("gemini.quota_429", key_index=current_key_index)
+                tracing.event("gemini.key_rotate", from_key=current_key_index, to_key=(current_key_index + 1) % len(GEMINI_KEYS))
                 current_key_index = (current_key_index + 1) % len(GEMINI_KEYS)
                 attempts += 1
-                time.sleep(2)
-            elif "Generated 0 scenes" in error_msg:
-                # 0개 생성은 쿼터 문제가 아니므로 키를 바꾸지 않고 재시도하거나 로그 남김
-                print(f"❌ 내용 생성 실패 (안전 필터 또는 내용 없음). 재시도...")
-                attempts += 1
-                time.sleep(1)
+                deadline.sleep(2)
             else:
                 print(f"❌ 생성 오류: {e}")
+                tracing.event("gemini.retry", reason=error_msg[:200])
                 attempts += 1
-                time.sleep(1)
+                deadline.sleep(1)
+    return None
 
-    print("❌ 모든 시도 실패. story.json 생성 불가.")
-    sys.exit(1)
+def _closing_brackets(text):
+    """text 끝에서 열려 있는 괄호를 닫는 문자열. 문자열 리터럴 안에서 끝나면 None"""
+    stack = []; in_string = False; escape = False
+    for ch in text:
+        if in_string:
+            if escape: escape = False
+            elif ch == "\\": escape = True
+            elif ch == '"': in_string = False
+        elif ch == '"': in_string = True
+        elif ch in "{[": stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack: stack.pop()
+    return None if in_string else "".join(reversed(stack))
+
+def parse_json_response(text):
+    """응답 JSON 파싱. 코드 펜스를 벗기고, 출력이 중간에 잘렸으면 마지막으로 완전히 닫힌 객체까지 살려서 복구"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = re.sub(r"^```(?:json)?\s*", "", text)
+        text = re.sub(r"\s*```$", "", text)
+    try: return json.loads(text)
+    except ValueError: pass
+
+    # 뒤에서부터 '}' 경계로 잘라가며 열린 괄호를 닫아 봄 (잘린 장면 하나만 버리고 나머지는 유지)
+    cut = len(text)
+    for _ in range(200):
+        cut = text.rfind("}", 0, cut)
+        if cut < 0: return None
+        candidate = text[:cut + 1]
+        closers = _closing_brackets(candidate)
+        if closers is not None:
+            try:
+                repaired = json.loads(candidate + closers)
+                tracing.event("writer.json_repaired", kept_chars=len(candidate), dropped_chars=len(text) - len(candidate))
+                print(f"🩹 잘린 JSON 복구 ({len(text) - len(candidate)}자 버림)")
+                return repaired
+            except ValueError: pass
+    return None
+
+def generate_json(prompt, validate, max_tries=3):
+    """Gemini JSON 호출 + 로컬 복구 + validate. validate가 예외를 던지면 (대기 없이) 다시 요청"""
+    for _ in range(max_tries):
+        text = call_gemini(prompt)
+        if text is None: return None
+        parsed = parse_json_response(text)
+        if parsed is None:
+            print("❌ JSON 파싱 실패. 재시도...")
+            tracing.event("gemini.retry", reason="invalid_json")
+            continue
+        try: return validate(parsed)
+        except Exception as e:
+            print(f"⚠️ [Key #{current_key_index+1}] 응답 검증 실패: {e} (재시도...)")
+            tracing.event("gemini.retry", reason=str(e)[:200])
+    return None
+
+# 모드별 최소 장면 수 (프롬프트에서 요청한 범위의 하한)
+def min_scenes(mode):
+    is_shorts = "shorts" in mode
+    if "news" in mode: return 6 if is_shorts else 15
+    return 8 if is_shorts else 10
+
+def scene_problems(scene):
+    if not isinstance(scene, dict): return ["narration", "image_prompt"]
+    return [field for field in ("narration", "image_prompt") if not isinstance(scene.get(field), str) or not scene[field].strip()]
+
+def check_story(parsed, mode):
+    """스키마 검사: (story dict, 필드가 빠진 장면 인덱스, 부족한 장면 수). 구조 자체가 틀리면 story는 None"""
+    if isinstance(parsed, list):
+        if parsed and isinstance(parsed[0], dict) and "scenes" in parsed[0]: parsed = parsed[0]
+        else: parsed = {"scenes": parsed}
+    if not isinstance(parsed, dict) or not isinstance(parsed.get("scenes"), list): return None, [], 0
+    parsed["scenes"] = [scene for scene in parsed["scenes"] if isinstance(scene, dict)]
+    bad = [i for i, scene in enumerate(parsed["scenes"]) if scene_problems(scene)]
+    missing = max(0, min_scenes(mode) - len(parsed["scenes"]))
+    return parsed, bad, missing
+
+def repair_story(story, bad, missing, source_prompt, lang_instruction):
+    """정상 장면은 그대로 두고, 필드가 빠진 장면과 부족한 장면만 추가 요청 (작은 후속 호출 1회)"""
+    scenes = story["scenes"]
+    print(f"🩹 부분 보완 요청: 불완전한 장면 {len(bad)}개, 추가 장면 {missing}개 (정상 장면 {len(scenes) - len(bad)}개 유지)")
+    prompt = f"""
+        Role: Script editor.
+        Task: The video script below is incomplete. Fix ONLY what is listed; do not rewrite other scenes.
+
+        [Original Request]
+        {source_prompt}
+
+        [Current Scenes (0-based index)]
+        {json.dumps([{"index": i, **scene} for i, scene in enumerate(scenes)], ensure_ascii=False)}
+
+        [To Fix]
+        1. Scenes at indexes {bad} are missing "narration" and/or "image_prompt" - write the missing fields.
+        2. Write {missing} NEW scenes that continue the story after the last scene.
+        3. Language: {lang_instruction}
+        4. Output MUST be valid JSON.
+
+        [Output JSON Structure]
+        {{
+            "fixed": [{{ "index": 0, "narration": "...", "image_prompt": "..." }}],
+            "new_scenes": [{{ "narration": "...", "image_prompt": "..." }}]
+        }}
+        """
+    with tracing.span("writer.repair", bad=len(bad), missing=missing):
+        text = call_gemini(prompt)
+    patch = parse_json_response(text) if text else None
+    if isinstance(patch, list) and patch: patch = patch[0]
+    if not isinstance(patch, dict): return None
+
+    for fix in patch.get("fixed") or []:
+        if not isinstance(fix, dict) or fix.get("index") not in bad: continue
+        scene = scenes[fix["index"]]
+        for field in scene_problems(scene):
+            if isinstance(fix.get(field), str) and fix[field].strip(): scene[field] = fix[field]
+    new_scenes = [scene for scene in (patch.get("new_scenes") or []) if not scene_problems(scene)]
+    scenes.extend(new_scenes[:missing])
+    return story
+
+REPAIR_ROUNDS = 2   # 부분 보완 요청 최대 횟수 (남은 문제만 다시 요청)
+
+def repair_until_valid(story, bad, missing, source_prompt, lang_instruction, story_mode):
+    """부분 보완을 남은 문제가 없어질 때까지(최대 REPAIR_ROUNDS회) 반복. 끝까지 불완전한 장면은 버림"""
+    for _ in range(REPAIR_ROUNDS):
+        if not bad and not missing: break
+        repaired = repair_story(story, bad, missing, source_prompt, lang_instruction)
+        if not repaired: break
+        story, bad, missing = check_story(repaired, story_mode)
+    story["scenes"] = [scene for scene in story["scenes"] if not scene_problems(scene)]
+    return story
+
+def generate_story_data(prompt, lang_instruction, max_tries=3):
+    """대본 생성: 잘린 JSON은 로컬 복구, 일부만 부족하면 부족한 장면만 후속 요청.
+    장면이 하나도 없을 때만 전체 재생성하고, 보완으로도 최소 장면 수를 못 채우면 전체 재생성은 한 번만"""
+    best = None
+    regenerated = False
+    for _ in range(max_tries):
+        text = call_gemini(prompt)
+        if text is None: break
+        story, bad, missing = check_story(parse_json_response(text) or {}, mode)
+        if story is None or len(story["scenes"]) - len(bad) == 0:
+            print(f"❌ 내용 생성 실패 (안전 필터 또는 내용 없음). 재시도...")
+            tracing.event("gemini.retry", reason="empty_scenes")
+            continue
+        story = repair_until_valid(story, bad, missing, prompt, lang_instruction, mode)
+        if len(story["scenes"]) >= min_scenes(mode): return [story]
+        if best is None or len(story["scenes"]) > len(best["scenes"]): best = story
+        if regenerated: break
+        regenerated = True
+        print(f"⚠️ 보완 후에도 장면 수 부족 ({len(story['scenes'])}/{min_scenes(mode)}). 전체 재생성 1회...")
+        tracing.event("gemini.retry", reason="short_after_repair")
+    if best:
+        print(f"⚠️ 최소 장면 수에 못 미치지만 확보한 {len(best['scenes'])}개 장면으로 진행합니다.")
+        return [best]
+    return None
+
+LANGUAGE_NAMES = {"ko": "Korean", "en": "English"}
 
-def save_metadata(data):
+def translate_story(final_data, target_language):
+    """기존 story의 장면 구조(장면 수, image_prompt)를 유지한 채 텍스트만 번역해 story_{lang}.json 저장"""
+    lang_name = LANGUAGE_NAMES.get(target_language, target_language)
+    source = final_data[0]
+    print(f"🌐 [{target_language}] 번역본 생성 중... (Scenes: {len(source['scenes'])})")
+    prompt = f"""
+        Role: Professional news translator.
+        Task: Translate the following video script JSON into {lang_name}.
+
+        [Rules]
+        1. Keep EXACTLY the same JSON structure and the same number of scenes ({len(source['scenes'])}), in the same order.
+        2. Translate only "title", "hashtags", "narration" and "social_posts" values.
+        3. Copy every "image_prompt" unchanged.
+        4. Keep '*' highlight markers around the translated equivalent words.
+        5. Output MUST be valid JSON.
+
+        [Input JSON]
+        {json.dumps(source, ensure_ascii=False)}
+        """
+
+    def validate(parsed):
+        translated = parsed[0] if isinstance(parsed, list) else parsed
+        scenes = translated.get("scenes", [])
+        if len(scenes) != len(source["scenes"]):
+            raise Exception(f"Scene count mismatch ({len(scenes)} != {len(source['scenes'])})")
+        # 이미지 프롬프트는 원본 그대로 유지 (이미지 재사용)
+        for src_scene, dst_scene in zip(source["scenes"], scenes):
+            if "image_prompt" in src_scene: dst_scene["image_prompt"] = src_scene["image_prompt"]
+        return [translated]
+
+    with tracing.span("writer.translate", language=target_language, scenes=len(source["scenes"])):
+        translated = generate_json(prompt, validate)
+    if translated is None:
+        print(f"❌ [{target_language}] 번역 실패.")
+        sys.exit(1)
+
+    out_path = variants.story_path(target_language, VARIANTS)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(translated, f, ensure_ascii=False, indent=2)
+    print(f"✅ {out_path} 저장 완료")
+    if "news" in mode:
+        save_metadata(translated[0], suffix=f"_{target_language}")
+
+def save_metadata(data, suffix=""):
     try:
         output_dir = "results"
         os.makedirs(output_dir, exist_ok=True)
@@ -237,10 +446,247 @@ def save_metadata(data):
 {data.get('hashtags', '')}
         """
         time_tag = datetime.now().strftime("%m%d_%H%M")
-        with open(os.path.join(output_dir, f"metadata_{time_tag}.txt"), "w", encoding="utf-8") as f:
+        with open(os.path.join(output_dir, f"metadata_{time_tag}{suffix}.txt"), "w", encoding="utf-8") as f:
             f.write(meta_content)
         print(f"✅ 메타데이터 저장 완료")
     except: pass
 
+# --- 배치 모드: 주제/기사 목록을 한 번에 작성 ---
+# 여러 작업을 입력/출력 예산에 맞게 한 요청으로 묶고(first-fit), 묶음들은 키 풀 전체에 나눠 동시에 요청한 뒤
+# 응답을 job_id별로 나눠 <out>/<job_id>/story.json 으로 저장.
+#
+#   python writer.py --batch=topics.txt [--mode=news_shorts --language=ko --out=batch]
+#   python writer.py --batch=jobs.json        # ["주제", {"topic", "article"(기사 캐시 경로), "mode", "language", "id"}, ...]
+BATCH_INPUT_CHARS = 40000       # 요청 하나에 넣을 입력(기사/검색 결과) 글자 수 상한
+BATCH_OUTPUT_TOKENS = 7000      # 요청 하나의 예상 출력 토큰 합 상한 (MAX_OUTPUT_TOKENS보다 여유 있게)
+MAX_OUTPUT_TOKENS = 8192
+GEMINI_REST_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+
+def expected_output_tokens(mode):
+    return 1500 if "shorts" in mode else 4000
+
+def load_batch_jobs(path, default_mode, default_language):
+    """.txt: 한 줄에 주제 하나 / .json: 주제 문자열 또는 작업 dict 목록"""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"): entries = json.load(f)
+        else: entries = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    jobs = []
+    for i, entry in enumerate(entries):
+        if isinstance(entry, str): entry = {"topic": entry}
+        topic_name = entry.get("topic") or (os.path.splitext(os.path.basename(entry["article"]))[0] if entry.get("article") else "News")
+        job_id = str(entry.get("id") or f"{i + 1:03d}_{re.sub(r'[^0-9A-Za-z가-힣]+', '_', topic_name).strip('_')[:30]}")
+        if any(job["id"] == job_id for job in jobs): job_id = f"{job_id}_{i + 1}"
+        jobs.append({"id": job_id, "topic": topic_name, "article": entry.get("article"),
+                     "mode": entry.get("mode") or default_mode, "language": entry.get("language") or default_language})
+    return jobs
+
+def job_brief(job, today_str):
+    """작업 하나의 요청 본문 (배치 프롬프트의 한 항목, 보완 요청의 원본 요청으로도 사용).
+    기사 파일을 읽지 못하면 job["error"]를 남기고 None (나머지 작업은 계속 진행)"""
+    lang_instruction = language_instruction(job["language"])
+    if job["article"] or "news" in job["mode"]:
+        if job["article"]:
+            source_type = "Single Article"
+            try: news_context = article_context(job["article"])
+            except (OSError, ValueError) as e:
+                print(f"❌ [{job['id']}] 기사 로드 실패: {e}")
+                job["error"] = f"article: {e}"
+                return None
+        else:
+            source_type = "News Search Results"
+            news_context_raw = search_news_serper(news_query(job["topic"], today_str))
+            if not news_context_raw: news_context_raw = "No specific news found. Create a general news summary."
+            news_context = f"[Serper Search Results]\n{news_context_raw}"
+        _, length_cons = news_format(job["mode"])
+        return f"""
+        ### job_id: {job["id"]}
+        Task: News script based on: {source_type} (summarize the key facts neutrally and professionally)
+        Format: {length_cons}
+        Language: {lang_instruction}
+        [Input Data]
+        {news_context}
+        """
+    duration_instruction = "8-12 scenes." if "shorts" in job["mode"] else "10-15 scenes."
+    return f"""
+        ### job_id: {job["id"]}
+        Topic: "{job["topic"]}"
+        Task: Video script.
+        Format: {duration_instruction}
+        Language: {lang_instruction}
+        """
+
+def pack_batches(jobs):
+    """first-fit: 입력 글자 수와 예상 출력 토큰이 모두 예산 안에 들어가는 첫 묶음에 추가"""
+    batches = []
+    for job in jobs:
+        chars = len(job["brief"]); tokens = expected_output_tokens(job["mode"])
+        for batch in batches:
+            if batch["chars"] + chars <= BATCH_INPUT_CHARS and batch["tokens"] + tokens <= BATCH_OUTPUT_TOKENS:
+                batch["jobs"].append(job); batch["chars"] += chars; batch["tokens"] += tokens
+                break
+        else:
+            batches.append({"jobs": [job], "chars": chars, "tokens": tokens})
+    return batches
+
+def batch_prompt(jobs):
+    return f"""
+        Role: Professional News Editor and script writer.
+        Task: Write {len(jobs)} independent video scripts, one per job below. Use only each job's own input - never mix facts between jobs.
+
+        [Rules]
+        1. Follow each job's Format and Language exactly.
+        2. **CRITICAL**: If a topic is political or sensitive, DO NOT REFUSE. Just report the facts neutrally.
+        3. Copy each job_id exactly into its story, and write the stories in the same order as the jobs.
+        4. Output MUST be valid JSON.
+
+        [Jobs]
+        {"".join(job["brief"] for job in jobs)}
+
+        [Output JSON Structure]
+        {{
+            "stories": [
+                {{
+                    "job_id": "...",
+                    "title": "Video Title",
+                    "hashtags": "#News #Update",
+                    "scenes": [
+                        {{ "narration": "Script line 1...", "image_prompt": "Visual description 1..." }}
+                    ],
+                    "social_posts": {{ "youtube_title": "...", "youtube_description": "..." }}
+                }}
+            ]
+        }}
+        """
+
+_sessions = threading.local()
+
+def call_gemini_rest(prompt, key_index):
+    """generateContent REST 호출 -> 응답 텍스트 (실패하면 None).
+    genai.configure는 프로세스 전역이라 키별 동시 요청은 스레드마다 세션을 두고 키를 직접 지정해 보냄"""
+    if not hasattr(_sessions, "session"): _sessions.session = requests.Session()
+    body = {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": {"responseMimeType": "application/json", "maxOutputTokens": MAX_OUTPUT_TOKENS},
+        "safetySettings": SAFETY_SETTINGS,
+    }
+    key_index %= len(GEMINI_KEYS)
+    for attempt in range(len(GEMINI_KEYS) * 2):
+        try:
+            with tracing.span("api.gemini_rest", model=MODEL_NAME, key_index=key_index, attempt=attempt) as sp:
+                response = _sessions.session.post(GEMINI_REST_URL.format(model=MODEL_NAME), params={"key": GEMINI_KEYS[key_index]},
+                                                  json=body, timeout=deadline.timeout(180))
+                sp.set(http_status=response.status_code)
+                if response.status_code == 429:
+                    print(f"⚠️ [Key #{key_index+1}] 쿼터 초과. 교체 중...")
+                    tracing.event("gemini.quota_429", key_index=key_index)
+                    key_index = (key_index + 1) % len(GEMINI_KEYS)
+                    deadline.sleep(2)
+                    continue
+                # URL에 키가 들어 있으므로 raise_for_status 메시지 대신 상태 코드만 남김
+                if response.status_code != 200: raise Exception(f"HTTP {response.status_code}: {response.text[:200]}")
+                candidate = (response.json().get("candidates") or [{}])[0]
+                text = "".join(part.get("text", "") for part in candidate.get("content", {}).get("parts", []))
+                sp.set(chars=len(text), finish_reason=candidate.get("finishReason"))
+                if not text: raise Exception(f"empty response ({candidate.get('finishReason')})")
+                return text
+        except deadline.DeadlineExceeded:
+            print("⏰ 작업 시간 예산 초과 - 생성 중단")
+            return None
+        except Exception as e:
+            print(f"❌ 생성 오류: {e}")
+            tracing.event("gemini.retry", reason=str(e)[:200])
+            deadline.sleep(1)
+    return None
+
+def split_stories(parsed, jobs):
+    """배치 응답 -> {job_id: story}. job_id가 없으면 순서로 매칭"""
+    if isinstance(parsed, dict): parsed = parsed.get("stories")
+    if not isinstance(parsed, list): return {}
+    ids = [job["id"] for job in jobs]
+    stories = {}; unmatched = []
+    for story in parsed:
+        if not isinstance(story, dict): continue
+        job_id = str(story.pop("job_id", "") or "")
+        if job_id in ids and job_id not in stories: stories[job_id] = story
+        else: unmatched.append(story)
+    # job_id가 없거나 틀린 story는 아직 비어 있는 작업에 순서대로 배정
+    for job_id, story in zip([i for i in ids if i not in stories], unmatched): stories[job_id] = story
+    return stories
+
+def run_batch(path, default_mode, default_language, out_dir="batch"):
+    today_str = date.today().strftime("%Y-%m-%d")
+    jobs = load_batch_jobs(path, default_mode, default_language)
+    if not jobs:
+        print(f"❌ {path}에 작업이 없습니다.")
+        sys.exit(1)
+    print(f"📦 배치 작업 {len(jobs)}개 (키 {len(GEMINI_KEYS)}개, Model: {MODEL_NAME})")
+
+    # 검색/기사 로드는 서로 독립이므로 동시에
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for job, brief in zip(jobs, pool.map(lambda job: job_brief(job, today_str), jobs)): job["brief"] = brief
+    ready = [job for job in jobs if job["brief"]]
+
+    results = {}
+    pending = ready
+    # 1회차: 묶어서 요청 / 2회차: 응답에서 빠지거나 실패한 작업만 하나씩 다시 요청
+    for round_no, batches in enumerate([pack_batches(ready), None]):
+        if batches is None: batches = [{"jobs": [job]} for job in pending]
+        if not batches: break
+        print(f"🤖 {round_no + 1}회차: 요청 {len(batches)}개 (작업 {sum(len(b['jobs']) for b in batches)}개)")
+        # 묶음 i는 키 i에서 시작 -> 키 풀 전체에 고르게 분산
+        with tracing.span("writer.batch_round", round=round_no + 1, requests=len(batches)):
+            with ThreadPoolExecutor(max_workers=min(len(batches), len(GEMINI_KEYS))) as pool:
+                texts = list(pool.map(lambda ib: call_gemini_rest(batch_prompt(ib[1]["jobs"]), ib[0]), enumerate(batches)))
+
+        pending = []
+        for batch, text in zip(batches, texts):
+            stories = split_stories(parse_json_response(text) if text else None, batch["jobs"])
+            for job in batch["jobs"]:
+                story, bad, missing = check_story(stories.get(job["id"]) or {}, job["mode"])
+                if story is None or len(story["scenes"]) - len(bad) == 0:
+                    pending.append(job)
+                    continue
+                # 부분 보완은 기존 단일 경로(call_gemini)로 순차 처리
+                story = repair_until_valid(story, bad, missing, job["brief"], language_instruction(job["language"]), job["mode"])
+                if len(story["scenes"]) < min_scenes(job["mode"]) and round_no == 0:
+                    results[job["id"]] = story   # 다시 요청해도 못 채우면 이 결과 사용
+                    pending.append(job)
+                    continue
+                if job["id"] not in results or len(story["scenes"]) >= len(results[job["id"]]["scenes"]): results[job["id"]] = story
+        if not pending: break
+
+    # 작업별 story 파일 저장
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = []
+    for job in jobs:
+        entry = {k: job[k] for k in ("id", "topic", "article", "mode", "language")}
+        story = results.get(job["id"])
+        if story is None:
+            print(f"❌ [{job['id']}] 생성 실패")
+            manifest.append({**entry, "status": "failed", "error": job.get("error", "generation failed")})
+            continue
+        job_dir = os.path.join(out_dir, job["id"])
+        os.makedirs(job_dir, exist_ok=True)
+        story_path = os.path.join(job_dir, "story.json")
+        with open(story_path, "w", encoding="utf-8") as f:
+            json.dump([story], f, ensure_ascii=False, indent=2)
+        status = "ok" if len(story["scenes"]) >= min_scenes(job["mode"]) else "short"
+        print(f"✅ {story_path} 저장 완료 (Scenes: {len(story['scenes'])}{', 최소 장면 수 미달' if status == 'short' else ''})")
+        if job["article"] or "news" in job["mode"]: save_metadata(story, suffix=f"_{job['id']}")
+        manifest.append({**entry, "status": status, "story": story_path, "scenes": len(story["scenes"])})
+
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    failed = sum(1 for entry in manifest if entry["status"] == "failed")
+    print(f"📦 배치 완료: 성공 {len(jobs) - failed}/{len(jobs)} -> {manifest_path}")
+    if failed == len(jobs): sys.exit(1)
+
 if __name__ == "__main__":
-    generate_story()
\ No newline at end of file
+    FLAGS = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    if FLAGS.get("batch"):
+        with tracing.span("writer.batch", source=FLAGS["batch"]):
+            run_batch(FLAGS["batch"], FLAGS.get("mode", mode), FLAGS.get("language", language), FLAGS.get("out", "batch"))
+    else:
+        with tracing.span("writer.generate_story", topic=topic[:80], mode=mode, language=language):
+            generate_story()
\ No newline at end of file